@@ -1,11 +1,28 @@
 import os
 import uuid
 import time
+import logging
+import shutil
+import threading
 import pandas as pd
 import streamlit as st
 
-from cleaning_engine.service import run_cleaning_job
+from cleaning_engine.service import run_cleaning_job, build_output, preview_cleaning_job
+from cleaning_engine.writers import head_output, gzip_copy, read_output
+from cleaning_engine.readers import INPUT_EXTENSIONS
+from cleaning_engine.job_service import JobClient, QueueFull
+from cleaning_engine.progress import JobCancelled
+from cleaning_engine import reference_store
+from cleaning_engine.reference_store import REFERENCE_DB_PATH
+from cleaning_engine.output_store import (
+    OutputStore, QuotaExceeded, OUTPUT_ROOT, SESSION_QUOTA_MB, TOTAL_QUOTA_MB, TTL_HOURS,
+)
 
+# engine progress messages; set CLEANING_LOG_LEVEL=WARNING to silence them
+logging.basicConfig(
+    level=os.environ.get("CLEANING_LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
 
 # =====================================================
 # PAGE CONFIG
@@ -90,21 +107,11 @@ div.stDownloadButton > button {
 # PATHS
 # =====================================================
 
-REF_DIR = "datasets/reference"
-os.makedirs(REF_DIR, exist_ok=True)
-
-MASTER_PATH = os.path.join(REF_DIR, "company_master.csv")
-ADD_PATH = os.path.join(REF_DIR, "company_master_additions.csv")
-REVIEW_PATH = os.path.join(REF_DIR, "importer_needs_review.csv")
-
-if not os.path.exists(MASTER_PATH):
-    pd.DataFrame(columns=["core_name","standardized_name"]).to_csv(MASTER_PATH,index=False)
-
-
-def load_csv_safe(path, cols):
-    if os.path.exists(path):
-        return pd.read_csv(path)
-    return pd.DataFrame(columns=cols)
+# master, additions and review queue; seeded from the CSVs in
+# datasets/reference the first time (see cleaning_engine.reference_store)
+REFERENCE_PATH = REFERENCE_DB_PATH
+# review queue entries shown in the Reference Manager
+REVIEW_ROWS = 200
 
 
 # -----------------------------
@@ -142,7 +149,33 @@ if not sid:
     sid = str(uuid.uuid4())[:8]
     st.session_state["sid"] = sid
 
-output_dir = os.path.join("outputs", sid)
+# per-session folders under a shared quota; idle artifacts are gzipped,
+# then evicted (python -m cleaning_engine.output_store shows usage)
+store = OutputStore(
+    OUTPUT_ROOT,
+    session_quota_mb=float(os.environ.get("CLEANING_SESSION_QUOTA_MB", SESSION_QUOTA_MB)),
+    total_quota_mb=float(os.environ.get("CLEANING_OUTPUT_QUOTA_MB", TOTAL_QUOTA_MB)),
+    ttl_hours=float(os.environ.get("CLEANING_OUTPUT_TTL_HOURS", TTL_HOURS)),
+)
+store.maybe_sweep()
+
+output_dir = store.session_dir(sid)
+
+# server-wide memory budget per run; larger files are cleaned in chunks
+MEMORY_BUDGET_MB = os.environ.get("CLEANING_MEMORY_BUDGET_MB")
+MEMORY_BUDGET_MB = float(MEMORY_BUDGET_MB) if MEMORY_BUDGET_MB else None
+
+# with a job service (python -m cleaning_engine.job_service) runs are queued
+# on its shared worker pool instead of a background thread of this app
+JOB_SERVICE_URL = os.environ.get("CLEANING_JOB_SERVICE_URL")
+JOB_POLL_SECONDS = 1.0
+
+# nothing large is held per session: uploads go to disk in blocks, results
+# are previewed from disk and downloads are only read when asked for
+UPLOAD_BLOCK = 1024 * 1024
+PREVIEW_ROWS = 25
+# larger outputs are gzipped on disk first and offered as .gz
+DIRECT_DOWNLOAD_MB = 20
 
 
 # =====================================================
@@ -181,9 +214,14 @@ st.sidebar.header(" Reference Manager")
 
 if st.sidebar.checkbox("Open Manager"):
 
-    master_df = load_csv_safe(MASTER_PATH, ["core_name","standardized_name"])
-    add_df = load_csv_safe(ADD_PATH, ["core_name","standardized_name"])
-    review_df = load_csv_safe(REVIEW_PATH, ["unmapped_core_name"])
+    master_df = reference_store.load_master(REFERENCE_PATH)
+    add_df = reference_store.load_table("additions", REFERENCE_PATH)[["core_name","standardized_name","cluster","confidence"]]
+    # highest impact first: resolving the top names matches the most rows
+    review_df = (
+        reference_store.review_queue(REFERENCE_PATH, limit=REVIEW_ROWS)
+        [["core_name","rows","cif_usd","cumulative_share","last_seen"]]
+        .rename(columns={"core_name":"unmapped_core_name"})
+    )
 
     # ---------- MASTER ----------
     st.sidebar.subheader("Company Master")
@@ -196,8 +234,11 @@ if st.sidebar.checkbox("Open Manager"):
     )
 
     if st.sidebar.button("Save Master"):
-        edited_master.drop_duplicates("core_name").to_csv(MASTER_PATH,index=False)
-        st.sidebar.success("Saved")
+        # only edited rows are written; rows removed in the editor are deleted
+        removed = set(master_df["core_name"]) - set(edited_master["core_name"].dropna())
+        changed = reference_store.upsert_master(edited_master, REFERENCE_PATH)
+        changed += reference_store.remove("master", removed, REFERENCE_PATH)
+        st.sidebar.success(f"Saved ({changed} changes)")
 
 
     # ---------- ADDITIONS ----------
@@ -207,44 +248,206 @@ if st.sidebar.checkbox("Open Manager"):
         add_df = add_df[~add_df["core_name"].isin(master_df["core_name"])]
         add_df["add"] = False
 
-        add_sel = st.sidebar.data_editor(add_df, key="add_editor")
+        # one cluster's names together, the least certain last
+        add_df = add_df.sort_values(["cluster","confidence"], ascending=[True, False])
+
+        add_sel = st.sidebar.data_editor(
+            add_df,
+            disabled=["cluster","confidence"],
+            key="add_editor"
+        )
 
         if st.sidebar.button("Add → Master"):
             rows = add_sel[add_sel["add"]][["core_name","standardized_name"]]
             if not rows.empty:
-                new = pd.concat([master_df, rows]).drop_duplicates("core_name")
-                new.to_csv(MASTER_PATH,index=False)
+                reference_store.upsert_master(rows, REFERENCE_PATH, source="additions")
+                reference_store.remove("additions", rows["core_name"], REFERENCE_PATH)
                 st.sidebar.success(f"Added {len(rows)}")
 
 
     # ---------- REVIEW ----------
     if not review_df.empty:
         st.sidebar.subheader("Needs Review")
+        top = min(10, len(review_df))
+        st.sidebar.caption(
+            f"Unmatched names by rows covered; the first {top} account for "
+            f"{review_df['cumulative_share'].iloc[top - 1]:.0%} of unmatched rows"
+        )
 
         review_df["standardized_name"] = ""
         review_df["add"] = False
 
-        rev_sel = st.sidebar.data_editor(review_df, key="review_editor")
+        rev_sel = st.sidebar.data_editor(
+            review_df,
+            key="review_editor",
+            disabled=["unmapped_core_name","rows","cif_usd","cumulative_share","last_seen"]
+        )
 
         if st.sidebar.button("Review → Master"):
             rows = rev_sel[rev_sel["add"]]
             if not rows.empty:
                 rows = rows.rename(columns={"unmapped_core_name":"core_name"})
                 rows = rows[["core_name","standardized_name"]]
-                new = pd.concat([master_df, rows]).drop_duplicates("core_name")
-                new.to_csv(MASTER_PATH,index=False)
+                rows = rows[rows["standardized_name"].fillna("").str.strip() != ""]
+                reference_store.upsert_master(rows, REFERENCE_PATH, source="review")
+                # reviewed names leave the queue
+                reference_store.remove("review", rows["core_name"], REFERENCE_PATH)
                 st.sidebar.success(f"Added {len(rows)}")
 
 
+def run_in_background(run, config, requested_outputs):
+    """Worker thread: never touches st.*, only the shared `run` dict."""
+    try:
+        run["result"] = run_cleaning_job(
+            input_csv_path=run["input_path"],
+            output_dir=run["output_dir"],
+            config=config,
+            memory_budget_mb=MEMORY_BUDGET_MB,
+            requested_outputs=requested_outputs,
+            # the session's upload path is reused; the review queue keys on content
+            review_source=reference_store.content_key(run["input_path"]),
+            progress=lambda event: run.__setitem__("progress", event),
+            cancel=run["cancel"].is_set
+        )
+    except Exception as e:
+        run["error"] = e
+    finally:
+        store.release(run["sid"])
+
+
 # =====================================================
 # MAIN — UPLOAD
 # =====================================================
 
 st.subheader("1️⃣ Upload Data")
 
-uploaded_file = st.file_uploader("Upload CSV", type=["csv"])
+# a new key after each run drops the previous upload from server memory
+upload_key = st.session_state.setdefault("upload_key", 0)
+
+uploaded_file = st.file_uploader(
+    "Upload data (CSV, CSV.GZ, ZIP of CSVs, XLSX, Parquet)",
+    type=list(INPUT_EXTENSIONS),
+    key=f"upload_{upload_key}"
+)
+
+# only build what the user asked for; the rest can be generated later
+requested_outputs = ["cleaned_file"]
+if export_powerbi:
+    requested_outputs.append("powerbi_file")
+if generate_report:
+    requested_outputs.append("comparison_report")
 
-run_clicked = st.button("Run Cleaning", use_container_width=True)
+busy = "active_run" in st.session_state
+
+col_preview, col_run = st.columns(2)
+preview_clicked = col_preview.button(
+    "Preview (sample)",
+    use_container_width=True,
+    disabled=busy
+)
+run_clicked = col_run.button(
+    "Run Cleaning",
+    use_container_width=True,
+    disabled=busy
+)
+
+
+def save_upload(uploaded_file, requested_outputs) -> str | None:
+    """The upload on disk in a fresh session folder, or None if over quota."""
+    with store.lease(sid):
+        # a new upload replaces the session's previous run
+        store.clear_session(sid)
+        st.session_state.pop("last_run", None)
+
+        try:
+            # room for the raw file and each output at about its size
+            store.check_quota(sid, uploaded_file.size * (1 + len(requested_outputs)))
+        except QuotaExceeded as e:
+            st.error(f"Not enough space for this file: {e}.")
+            return None
+
+        # keep the upload as delivered; the engine reads it without unpacking
+        suffix = uploaded_file.name[uploaded_file.name.find("."):] if "." in uploaded_file.name else ".csv"
+        input_path = os.path.join(output_dir,"raw" + suffix.lower())
+
+        with open(input_path,"wb") as f:
+            shutil.copyfileobj(uploaded_file, f, UPLOAD_BLOCK)
+
+    st.session_state["upload_key"] += 1
+    return input_path
+
+
+def start_run(input_path, config, requested_outputs):
+    if input_path is None:
+        return
+
+    if store.resolve(input_path) != input_path:
+        st.error("The uploaded file has expired; please upload it again.")
+        return
+
+    if JOB_SERVICE_URL:
+        client = JobClient(JOB_SERVICE_URL)
+        try:
+            job = client.submit(
+                input_path,
+                config=config,
+                requested_outputs=requested_outputs,
+                job_options={"memory_budget_mb": MEMORY_BUDGET_MB}
+            )
+            # survives a rerun / reconnect of this session
+            st.session_state["active_run"] = {"job_id": job["id"], "input_path": input_path}
+        except QueueFull as e:
+            st.error(f"The cleaning service is busy, try again shortly ({e}).")
+    else:
+        # the job runs on a worker thread; this script only polls it, so the
+        # page stays live and the run can be cancelled between stages
+        run = {
+            "sid": sid,
+            "input_path": input_path,
+            "output_dir": output_dir,
+            "start": time.time(),
+            "cancel": threading.Event(),
+            "progress": None,
+        }
+        run["thread"] = threading.Thread(
+            target=run_in_background,
+            args=(run, config, requested_outputs),
+            daemon=True
+        )
+        # released by the worker thread when the job ends
+        store.acquire(sid)
+        run["thread"].start()
+        st.session_state["active_run"] = run
+
+    if "active_run" in st.session_state:
+        st.session_state.pop("preview", None)
+        st.rerun()
+
+
+# =====================================================
+# PREVIEW (sampled dry run, nothing written)
+# =====================================================
+
+if uploaded_file and preview_clicked:
+
+    input_path = save_upload(uploaded_file, requested_outputs)
+
+    if input_path:
+        with st.spinner("Cleaning a sample..."), store.lease(sid):
+            # the sample is spread over the file; the full file is not read
+            sample_df, preview = preview_cleaning_job(
+                input_path, config=config, requested_outputs=requested_outputs
+            )
+
+        st.session_state["preview"] = {
+            "input_path": input_path,
+            "file_name": uploaded_file.name,
+            "config": dict(config),
+            "requested_outputs": list(requested_outputs),
+            "summary": preview,
+            "head": sample_df.head(PREVIEW_ROWS),
+        }
+        st.rerun()
 
 
 # =====================================================
@@ -252,43 +455,219 @@ run_clicked = st.button("Run Cleaning", use_container_width=True)
 # =====================================================
 
 if uploaded_file and run_clicked:
+    start_run(save_upload(uploaded_file, requested_outputs), config, requested_outputs)
+
+
+preview_state = st.session_state.get("preview")
+
+if preview_state and not busy:
+
+    preview = preview_state["summary"]
+
+    st.divider()
+    st.subheader(f"🔎 Preview · {preview_state['file_name']}")
+    st.caption(
+        f"{preview['sample_rows']:,} sampled rows ({preview['sample_method']}) "
+        f"of about {preview['estimated_source_rows']:,}, cleaned in {preview['preview_seconds']:.1f}s"
+    )
+
+    c1,c2,c3 = st.columns(3)
+    c1.metric("Rows kept", f"{preview['rows_kept_share']:.1%}" if preview["rows_kept_share"] is not None else "–")
+    c2.metric(
+        "Company match rate",
+        f"{preview['company_match_rate']:.1%}" if preview["company_match_rate"] is not None else "–"
+    )
+    c3.metric("Projected full run", f"{preview['projected_seconds']:,.0f}s")
+
+    st.dataframe(preview_state["head"], use_container_width=True)
+
+    with st.expander("Column types and projected stage times"):
+        st.dataframe(
+            pd.DataFrame({
+                "column": list(preview["column_types"]),
+                "type": list(preview["column_types"].values()),
+            }),
+            use_container_width=True
+        )
+        st.json(preview["projected_stage_seconds"])
 
-    os.makedirs(output_dir, exist_ok=True)
+    if preview_state["config"] != config or preview_state["requested_outputs"] != requested_outputs:
+        st.warning("The options changed since this preview; the full run uses the previewed ones.")
 
-    input_path = os.path.join(output_dir,"raw.csv")
+    if st.button("Confirm full run", use_container_width=True):
+        start_run(preview_state["input_path"], preview_state["config"], preview_state["requested_outputs"])
+
+
+# =====================================================
+# RUNNING JOB (progress + cancel)
+# =====================================================
 
-    with open(input_path,"wb") as f:
-        f.write(uploaded_file.getbuffer())
+def progress_text(event) -> str:
+    if not event:
+        return "Starting..."
+
+    text = f"{event['stage'] or 'finishing'}"
+    if event.get("rows_total"):
+        text += f" · {event['rows_read']:,} / {event['rows_total']:,} rows read"
+    if event.get("eta_seconds") is not None:
+        text += f" · about {event['eta_seconds']:.0f}s left"
+    return text
+
+
+active_run = st.session_state.get("active_run")
+
+if active_run:
+
+    finished = False
+
+    if "job_id" in active_run:
+        client = JobClient(JOB_SERVICE_URL)
+        job = client.status(active_run["job_id"])
+
+        if job["state"] == "queued":
+            st.info(f"Job {job['id']} queued (position {job.get('position')})")
+        elif job["state"] == "running":
+            event = job.get("progress") or {}
+            st.progress(event.get("fraction", 0.0), text=progress_text(event))
+        else:
+            finished = True
+
+        if not finished and st.button("Cancel run", use_container_width=True):
+            client.cancel(job["id"])
+            st.warning("Cancelling at the next stage...")
+
+        if job["state"] == "done":
+            # the service need not share this disk: the summary and the
+            # outputs come over HTTP into the session folder
+            with st.spinner("Fetching results..."), store.lease(sid):
+                job_summary = client.summary(job["id"])
+                job_outputs = {}
+                for name in job["result"]["outputs"]:
+                    job_outputs[name] = client.download(job["id"], name, output_dir)
+                    store.touch(job_outputs[name])
+
+            st.session_state["last_run"] = {
+                "summary": job_summary,
+                "outputs": job_outputs,
+                "input_path": active_run["input_path"],
+                "output_dir": output_dir,
+                "exec_time": job["result"]["seconds"],
+            }
+        elif finished:
+            st.error(f"Cleaning job {job['state']}: {job.get('error')}")
+
+    else:
+        if active_run["thread"].is_alive():
+            event = active_run["progress"] or {}
+            st.progress(event.get("fraction", 0.0), text=progress_text(event))
+
+            if active_run["cancel"].is_set():
+                st.warning("Cancelling at the next stage...")
+            elif st.button("Cancel run", use_container_width=True):
+                active_run["cancel"].set()
+                st.warning("Cancelling at the next stage...")
+        else:
+            finished = True
+
+            if "result" in active_run:
+                # the cleaned frame is not kept: results are read from disk
+                _, summary, outputs = active_run["result"]
+                st.session_state["last_run"] = {
+                    "summary": summary,
+                    "outputs": outputs,
+                    "input_path": active_run["input_path"],
+                    "output_dir": active_run["output_dir"],
+                    "exec_time": round(time.time() - active_run["start"], 2),
+                }
+            elif isinstance(active_run.get("error"), JobCancelled):
+                st.warning("Cleaning run cancelled.")
+            else:
+                st.error(f"Cleaning failed: {active_run.get('error')}")
+
+    if finished:
+        del st.session_state["active_run"]
+    else:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
 
-    start = time.time()
 
-    with st.spinner("Running cleaning pipeline..."):
-        cleaned_df, summary, outputs = run_cleaning_job(
-            input_csv_path=input_path,
-            output_dir=output_dir,
-            config=config
+# =====================================================
+# RESULTS (kept across reruns)
+# =====================================================
+
+def download_output(key, label, name, path):
+    """
+    Download button that reads the file only when it is offered. Large
+    outputs are first gzipped on disk (on request), and only one prepared
+    download is held by the session at a time. `path` may already be the
+    gzipped copy left by the output store.
+    """
+    size_mb = os.path.getsize(path) / 1024 / 1024
+
+    if size_mb > DIRECT_DOWNLOAD_MB and st.session_state.get("prepared_download") != key:
+        if st.button(f"Prepare {label} ({size_mb:,.0f} MB, gzipped)", use_container_width=True,
+                     key=f"prepare_{key}"):
+            st.session_state["prepared_download"] = key
+            st.rerun()
+        return
+
+    if size_mb > DIRECT_DOWNLOAD_MB:
+        with st.spinner(f"Compressing {label}..."):
+            path = gzip_copy(path)
+
+    if path.endswith(".gz"):
+        name += ".gz"
+
+    with open(path, "rb") as f:
+        downloaded = st.download_button(
+            f"Download {label}",
+            f,
+            file_name=name,
+            mime="application/gzip" if name.endswith(".gz") else "text/csv",
+            use_container_width=True,
+            key=f"download_{key}"
         )
 
-    exec_time = round(time.time()-start,2)
+    # downloads keep an artifact at the back of the eviction queue
+    if downloaded:
+        store.touch(path)
+
 
-    if not export_powerbi:
-        outputs.pop("powerbi_file",None)
+last_run = st.session_state.get("last_run")
 
-    if not generate_report:
-        outputs.pop("comparison_report",None)
+if last_run:
+
+    summary = last_run["summary"]
+    outputs = last_run["outputs"]
 
     # ---------- RESULTS ----------
     st.divider()
     st.subheader("2️⃣ Results")
 
     c1,c2,c3 = st.columns(3)
-    c1.metric("Rows", cleaned_df.shape[0])
-    c2.metric("Columns", cleaned_df.shape[1])
-    c3.metric("Time (s)", exec_time)
-
-    st.json(summary)
-
-    st.dataframe(cleaned_df.head(25), use_container_width=True)
+    c1.metric("Rows", summary["final_rows"])
+    c2.metric("Columns", summary["final_columns"])
+    c3.metric("Time (s)", last_run["exec_time"])
+
+    # ---------- STAGE TIMINGS ----------
+    profile = summary.get("profile", {})
+    if profile.get("stages"):
+        with st.expander("⏱ Stage timings"):
+            stages_df = pd.DataFrame(profile["stages"])
+            stages_df["columns_touched"] = stages_df["columns_touched"].map(len)
+            st.dataframe(
+                stages_df.drop(columns=["functions"], errors="ignore"),
+                use_container_width=True
+            )
+
+    st.json({k: v for k, v in summary.items() if k != "profile"})
+
+    # only the shown rows are read
+    cleaned_path = store.resolve(outputs["cleaned_file"])
+    if cleaned_path:
+        st.dataframe(head_output(cleaned_path, PREVIEW_ROWS), use_container_width=True)
+    else:
+        st.info("The outputs of this run have expired from the server.")
 
     # ---------- DOWNLOADS ----------
     st.subheader("3️⃣ Downloads")
@@ -298,15 +677,25 @@ if uploaded_file and run_clicked:
         ("powerbi_file","PowerBI File","cleaned_powerbi.csv"),
         ("comparison_report","Comparison Report","comparison.csv")
     ]:
-        if key in outputs and os.path.exists(outputs[key]):
-            with open(outputs[key],"rb") as f:
-                st.download_button(
-                    f"Download {label}",
-                    f.read(),
-                    file_name=name,
-                    mime="text/csv",
-                    use_container_width=True
-                )
+        if key not in outputs and cleaned_path:
+            # the comparison report is built against the raw upload
+            input_path = store.resolve(last_run["input_path"])
+            if key == "comparison_report" and input_path is None:
+                st.info(f"The source file has expired from the server; rerun to get the {label}.")
+            # skipped at run time → build from the retained result on demand
+            elif st.button(f"Generate {label}", use_container_width=True):
+                with st.spinner(f"Generating {label}..."), store.lease(sid):
+                    # reads the cleaned file back from the output folder
+                    outputs[key] = build_output(
+                        key,
+                        last_run.get("output_dir", output_dir),
+                        cleaned_df=read_output(cleaned_path),
+                        input_csv_path=input_path
+                    )
+
+        path = store.resolve(outputs[key]) if key in outputs else None
+        if path:
+            download_output(key, label, name, path)
 
     st.success("Cleaning completed successfully ")
 
@@ -1,49 +1,199 @@
+"""
+Distinct company names of a cleaned output, with how many rows carry each.
+
+    python -m cleaning_engine.analysis.analyze_company_names datasets/cleaned/cleaned_file.csv --column importer_name
+
+Only the name column is parsed, in chunks (pyarrow's CSV reader when it
+is installed, else pandas; Parquet / Arrow dataset directories through
+pyarrow.dataset), and only value counts are kept, so memory grows with
+the number of distinct names, not with the file. Malformed CSV rows are
+skipped and their number logged.
+Each distinct name is pre-cleaned and stripped of legal suffixes once;
+the two tables (preclean and core names, most rows first) are written to
+--out-dir and their top names printed.
+"""
+
+import argparse
+import logging
 import os
+import sys
+from collections import Counter
+
 import pandas as pd
+
 from cleaning_engine.operations.company_preclean import preclean_company_name
 from cleaning_engine.operations.company_suffix_cleaner import remove_legal_suffixes
+from cleaning_engine.readers import detect_format, input_encoding, read_input
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as ds
+except ImportError:  # pandas chunks instead
+    pacsv = None
+    ds = None
+
+
+logger = logging.getLogger(__name__)
+
+
+INPUT_PATH = "datasets/cleaned/cleaned_file.csv"
+OUTPUT_DIR = "datasets/reference"
+# named after the column: importer_name -> importer_core_names.csv
+PRECLEAN_FILE = "{prefix}_preclean_values.csv"
+CORE_FILE = "{prefix}_core_names.csv"
+
+NAME_COLUMN = "importer_name"
+CHUNK_ROWS = 500_000
+ARROW_BLOCK_BYTES = 64 << 20
+INVALID_CORE_NAMES = {"", "NAN"}
+
+
+# -------------------------
+# Counting
+# -------------------------
+def count_values(path: str, column: str = NAME_COLUMN, chunksize: int = CHUNK_ROWS) -> pd.Series:
+    """Rows per distinct value of one column, read chunk by chunk."""
+    # columnar outputs are dataset directories
+    fmt = "dataset" if os.path.isdir(path) else detect_format(path)
+
+    if fmt == "dataset":
+        counts = _dataset_counts(path, column, chunksize)
+    elif pacsv is not None and fmt in ("csv", "csv.gz"):
+        counts = _arrow_counts(path, fmt, column)
+    else:
+        counts = Counter()
+        # cleaned outputs are well-formed: the C parser is several times faster
+        chunks = read_input(path, chunksize=chunksize, usecols=[column], dtype=str, engine="c")
+        for chunk in chunks:
+            counts.update(chunk[column].value_counts().to_dict())
+
+    counts.pop("", None)
+    counts.pop(None, None)
+    return pd.Series(counts, dtype="int64", name="rows")
+
+
+def _update_counts(counts: Counter, values):
+    values = pc.value_counts(values)
+    counts.update(dict(zip(
+        values.field("values").to_pylist(),
+        values.field("counts").to_pylist(),
+    )))
+
+
+def _dataset_counts(path, column, chunksize) -> Counter:
+    """A Parquet / Arrow dataset directory (as the writers produce), reading only `column`."""
+    if ds is None:
+        raise ImportError("Parquet / Arrow outputs need the 'pyarrow' package")
+
+    fmt = "ipc" if any(name.endswith(".arrow") for _, _, files in os.walk(path) for name in files) else "parquet"
+    dataset = ds.dataset(path, format=fmt, partitioning="hive")
+
+    counts = Counter()
+    for batch in dataset.to_batches(columns=[column], batch_size=chunksize):
+        _update_counts(counts, batch.column(0))
+
+    return counts
+
+
+def _arrow_counts(path, fmt, column) -> Counter:
+    """Stream a CSV through pyarrow, parsing only `column`."""
+    encoding = input_encoding(path)[0]
+    counts = Counter()
+    skipped = 0
+
+    def skip(row):
+        nonlocal skipped
+        skipped += 1
+        return "skip"
+
+    with pa.input_stream(path, compression="gzip" if fmt == "csv.gz" else None) as f:
+        reader = pacsv.open_csv(
+            f,
+            read_options=pacsv.ReadOptions(encoding=encoding, block_size=ARROW_BLOCK_BYTES),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True, invalid_row_handler=skip),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=[column],
+                column_types={column: pa.string()},
+                strings_can_be_null=False,
+            ),
+        )
+        for batch in reader:
+            _update_counts(counts, batch.column(0))
+
+    if skipped:
+        logger.warning("%s: skipped %d malformed rows; counts exclude them", path, skipped)
+
+    return counts
+
+
+def name_tables(counts: pd.Series) -> tuple:
+    """(preclean, core) tables of names and rows, most rows first."""
+    raw = pd.Series(counts.index, dtype=object)
+    rows = counts.to_numpy()
+
+    preclean = preclean_company_name(raw)
+    preclean_df = _totals(preclean, rows, "preclean_name")
+
+    core = remove_legal_suffixes(preclean_df["preclean_name"]).str.strip()
+    core_df = _totals(core, preclean_df["rows"].to_numpy(), "core_name")
+    core_df = core_df[~core_df["core_name"].isin(INVALID_CORE_NAMES)]
+
+    return preclean_df, core_df.reset_index(drop=True)
+
+
+def _totals(names: pd.Series, rows, column: str) -> pd.DataFrame:
+    df = pd.DataFrame({column: names.to_numpy(), "rows": rows}).dropna(subset=[column])
+    return (
+        df.groupby(column, as_index=False)["rows"].sum()
+        .sort_values(["rows", column], ascending=[False, True])
+        .reset_index(drop=True)
+    )
 
-os.makedirs("datasets/reference", exist_ok=True)
 
-df = pd.read_csv("datasets/cleaned/cleaned_file.csv")
+# -------------------------
+# Entry point
+# -------------------------
+def analyze_company_names(
+    input_path: str = INPUT_PATH,
+    column: str = NAME_COLUMN,
+    out_dir: str = OUTPUT_DIR,
+    chunksize: int = CHUNK_ROWS,
+) -> tuple:
+    """Count the names of `column` and write the preclean and core-name tables."""
+    counts = count_values(input_path, column, chunksize)
+    preclean_df, core_df = name_tables(counts)
 
-df["importer_name_preclean"] = preclean_company_name(df["importer_name"])
+    prefix = column[:-len("_name")] if column.endswith("_name") else column
+    os.makedirs(out_dir, exist_ok=True)
+    preclean_df.to_csv(os.path.join(out_dir, PRECLEAN_FILE.format(prefix=prefix)), index=False)
+    core_df.to_csv(os.path.join(out_dir, CORE_FILE.format(prefix=prefix)), index=False)
 
-# STEP 1: Pre-clean analysis
-unique_preclean = (
-    df["importer_name_preclean"]
-    .dropna()
-    .sort_values()
-    .unique()
-)
+    return preclean_df, core_df
 
-print(f"Unique importer names (after pre-clean): {len(unique_preclean)}")
-for name in unique_preclean[:50]:
-    print(name)
 
-pd.DataFrame({"preclean_name": unique_preclean}) \
-    .to_csv("datasets/reference/importer_preclean_values.csv", index=False)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distinct company names of a cleaned output")
+    parser.add_argument("input", nargs="?", default=INPUT_PATH,
+                        help="cleaned CSV, or a Parquet / Arrow output directory")
+    parser.add_argument("--column", default=NAME_COLUMN, help="company name column")
+    parser.add_argument("--out-dir", default=OUTPUT_DIR, help="folder for the name tables")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="rows read at a time")
+    parser.add_argument("--top", type=int, default=20, help="names to print")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level="INFO", format="%(levelname)s %(name)s: %(message)s")
 
-# STEP 2: Legal suffix removal
-df["importer_core_name"] = remove_legal_suffixes(
-    df["importer_name_preclean"]
-)
+    preclean_df, core_df = analyze_company_names(args.input, args.column, args.out_dir, args.chunksize)
 
-invalid_values = {"", "NAN"}
+    print(f"Unique {args.column} values (after pre-clean): {len(preclean_df)}")
+    print(f"Unique {args.column} values (after suffix removal): {len(core_df)}")
+    with pd.option_context("display.width", 200, "display.max_colwidth", 60):
+        print(core_df.head(args.top).to_string(index=False))
+    print(f"Tables written to {args.out_dir}")
 
-unique_core = (
-    df["importer_core_name"]
-    .dropna()
-    .astype(str)
-    .str.strip()
-    .loc[~df["importer_core_name"].isin(invalid_values)]
-    .sort_values()
-    .unique()
-)
+    return 0
 
-print(f"\nUnique importer names (after suffix removal): {len(unique_core)}")
-for name in unique_core:
-    print(name)
 
-pd.DataFrame({"core_name": unique_core}) \
-    .to_csv("datasets/reference/importer_core_names.csv", index=False)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Clean many files at once.
+
+    python -m cleaning_engine.batch "vendors/*.csv" incoming/ --out-dir cleaned --workers 4
+
+Inputs are files, directories (every supported file directly inside) or
+glob patterns. Files are cleaned concurrently in a process pool; each gets
+its own output directory under --out-dir. A failing file is recorded and
+the batch carries on; batch_summary.json in --out-dir lists every file
+with its timings or error.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from cleaning_engine.service import DEFAULT_CONFIG, OUTPUT_FILES, run_cleaning_job
+from cleaning_engine.pipeline import COMPANY_MASTER_PATH
+from cleaning_engine.readers import INPUT_EXTENSIONS
+from cleaning_engine.run_history import RUN_HISTORY_PATH
+from cleaning_engine.operations.company_standardizer import load_master_index
+from cleaning_engine.progress import JobCancelled
+
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_NAME = "batch_summary.json"
+FILE_SUMMARY_NAME = "summary.json"
+
+
+# -------------------------------------------------
+# Inputs
+# -------------------------------------------------
+
+def _supported(path: str) -> bool:
+    return path.rsplit(".", 1)[-1].lower() in INPUT_EXTENSIONS
+
+
+def expand_inputs(patterns) -> list:
+    """Files for a mix of paths, directories and globs (sorted, no repeats)."""
+    found = {}
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = [
+                os.path.join(pattern, name)
+                for name in os.listdir(pattern)
+                if _supported(name)
+            ]
+        elif os.path.isfile(pattern):
+            # named explicitly: trust it even without a known extension
+            paths = [pattern]
+        else:
+            paths = [p for p in glob.glob(pattern, recursive=True) if _supported(p)]
+            if not paths:
+                logger.warning("No input files match %s", pattern)
+
+        for path in paths:
+            if os.path.isfile(path):
+                found.setdefault(os.path.abspath(path), path)
+
+    return sorted(found.values())
+
+
+def output_dirs(inputs, out_root: str) -> dict:
+    """One directory per input, named after the file (vendor_a.csv.gz -> vendor_a)."""
+    dirs = {}
+    taken = set()
+
+    for path in inputs:
+        name = os.path.basename(path)
+        while "." in name and name.rsplit(".", 1)[-1].lower() in INPUT_EXTENSIONS:
+            name = name.rsplit(".", 1)[0]
+
+        candidate, n = name, 2
+        while candidate in taken:
+            candidate, n = f"{name}_{n}", n + 1
+
+        taken.add(candidate)
+        dirs[path] = os.path.join(out_root, candidate)
+
+    return dirs
+
+
+def load_config(path: str | None) -> dict:
+    """DEFAULT_CONFIG overridden by a JSON file of pipeline options."""
+    config = dict(DEFAULT_CONFIG)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    return config
+
+
+# -------------------------------------------------
+# Worker
+# -------------------------------------------------
+
+def _init_worker(master_path: str, log_level: int):
+    logging.basicConfig(level=log_level, format="%(levelname)s %(name)s: %(message)s")
+
+    # parse the company master once; every job in this process reuses it
+    if master_path and os.path.exists(master_path):
+        load_master_index(master_path)
+
+
+def clean_file(input_path: str, output_dir: str, config: dict, job_options: dict,
+               progress=None, cancel=None) -> dict:
+    """
+    Clean one file. Never raises: failures come back as status "failed"
+    (a cancel() request as "cancelled") so the batch can report them with
+    the rest.
+    """
+    start = time.perf_counter()
+    result = {
+        "input": input_path,
+        "output_dir": output_dir,
+        "pid": os.getpid(),
+    }
+
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+
+        # the cleaned frame stays in the worker; outputs are on disk.
+        # Unmatched names of every file join the shared review queue.
+        _, summary, outputs = run_cleaning_job(
+            input_path, output_dir=output_dir, config=config,
+            progress=progress, cancel=cancel, **job_options
+        )
+
+        with open(os.path.join(output_dir, FILE_SUMMARY_NAME), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, default=str)
+
+        stages = summary.get("profile", {}).get("stages", [])
+        result.update({
+            "status": "ok",
+            "source_rows": sum(s["rows_out"] for s in stages if s["stage"] == "read_input"),
+            "final_rows": summary.get("final_rows"),
+            "peak_rss_mb": summary.get("memory", {}).get("peak_rss_mb"),
+            "run_id": summary.get("run_id"),
+            "stage_seconds": {s["stage"]: s["wall_seconds"] for s in stages},
+            "outputs": outputs,
+        })
+    except JobCancelled as e:
+        result.update({"status": "cancelled", "error": str(e)})
+    except Exception as e:
+        result.update({
+            "status": "failed",
+            "error": f"{type(e).__name__}: {e}",
+            "traceback": traceback.format_exc(),
+        })
+
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+# -------------------------------------------------
+# Batch
+# -------------------------------------------------
+
+def run_batch(
+    inputs,
+    out_root: str,
+    config: dict | None = None,
+    workers: int | None = None,
+    job_options: dict | None = None
+) -> dict:
+    """
+    Clean every input into its own directory under out_root with a pool of
+    `workers` processes (default: one per CPU, at most one per file;
+    1 runs in this process). Returns the consolidated batch summary.
+    """
+    config = config or DEFAULT_CONFIG
+    job_options = job_options or {}
+    dirs = output_dirs(inputs, out_root)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(inputs) or 1))
+
+    master_path = config.get("company_master_path", COMPANY_MASTER_PATH)
+    started_at = datetime.now().isoformat(timespec="seconds")
+    start = time.perf_counter()
+    results = []
+
+    def _done(result):
+        results.append(result)
+        if result["status"] == "ok":
+            logger.info("[%d/%d] %s: %s rows in %.1fs", len(results), len(inputs),
+                        result["input"], result["final_rows"], result["seconds"])
+        else:
+            logger.error("[%d/%d] %s failed: %s", len(results), len(inputs),
+                         result["input"], result["error"])
+
+    if workers == 1:
+        for path in inputs:
+            _done(clean_file(path, dirs[path], config, job_options))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(master_path, logging.getLogger().getEffectiveLevel())
+        ) as pool:
+            futures = {
+                pool.submit(clean_file, path, dirs[path], config, job_options): path
+                for path in inputs
+            }
+            for future in as_completed(futures):
+                try:
+                    _done(future.result())
+                except Exception as e:
+                    # the worker process itself died (e.g. killed for memory)
+                    path = futures[future]
+                    _done({
+                        "input": path,
+                        "output_dir": dirs[path],
+                        "status": "failed",
+                        "error": f"{type(e).__name__}: {e}",
+                        "seconds": None,
+                    })
+
+    order = {path: i for i, path in enumerate(inputs)}
+    results.sort(key=lambda r: order[r["input"]])
+
+    failed = [r for r in results if r["status"] != "ok"]
+    return {
+        "started_at": started_at,
+        "seconds": round(time.perf_counter() - start, 3),
+        "workers": workers,
+        "files": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "rows": sum(r.get("final_rows") or 0 for r in results),
+        "results": results,
+    }
+
+
+def write_batch_summary(batch: dict, out_root: str) -> str:
+    os.makedirs(out_root, exist_ok=True)
+    path = os.path.join(out_root, SUMMARY_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(batch, f, indent=2, default=str)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean a batch of trade files")
+    parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns")
+    parser.add_argument("--out-dir", default="outputs", help="one sub-directory per input")
+    parser.add_argument("--config", default=None, help="JSON file of pipeline options")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPUs)")
+    parser.add_argument("--outputs", nargs="+", choices=list(OUTPUT_FILES), default=None)
+    parser.add_argument("--format", dest="output_format", default="csv",
+                        choices=["csv", "parquet", "arrow"])
+    parser.add_argument("--compression", default=None)
+    parser.add_argument("--memory-budget-mb", type=float, default=None,
+                        help="per file; larger files are cleaned in chunks")
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--history", default=RUN_HISTORY_PATH,
+                        help="run history database ('' to skip)")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format="%(levelname)s %(name)s: %(message)s")
+
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        logger.error("No input files found")
+        return 2
+
+    batch = run_batch(
+        inputs,
+        args.out_dir,
+        config=load_config(args.config),
+        workers=args.workers,
+        job_options={
+            "requested_outputs": args.outputs,
+            "output_format": args.output_format,
+            "compression": args.compression,
+            "memory_budget_mb": args.memory_budget_mb,
+            "incremental": args.incremental,
+            "history_path": args.history or None,
+        }
+    )
+    path = write_batch_summary(batch, args.out_dir)
+
+    print(f"\n{'file':<40} {'status':<8} {'rows':>10} {'seconds':>9}")
+    for r in batch["results"]:
+        rows = r.get("final_rows")
+        print(f"{os.path.basename(r['input']):<40} {r['status']:<8} "
+              f"{'' if rows is None else rows:>10} {r['seconds'] or '':>9}")
+        if r["status"] != "ok":
+            print(f"    {r['error']}")
+
+    print(f"\n{batch['succeeded']}/{batch['files']} files, {batch['rows']:,} rows "
+          f"in {batch['seconds']:.1f}s with {batch['workers']} workers")
+    print(f"Summary: {path}")
+
+    return 1 if batch["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import codecs
+import re
+
+
+SAMPLE_BYTES = 64 * 1024
+
+# only cp1258 has combining tone marks (grave, hook, tilde, acute, dot
+# below), and they follow a vowel: a, e, i, o, u, y or Â Ă Ê Ô Ơ Ư.
+# In cp1252 the same bytes are Ì Ò Þ ì ò, which follow consonants
+# (Italian "però"); Ã ã Õ õ (Portuguese "São") are not evidence at all.
+TONE_MARK = re.compile(rb"[AEIOUYaeiouy\xc2\xc3\xca\xd4\xd5\xdd\xe2\xe3\xea\xf4\xf5\xfd][\xcc\xd2\xde\xec\xf2]")
+
+# Đ đ: only counted alongside tone marks (Ð ð in Icelandic cp1252)
+VIETNAMESE_D = frozenset(b"\xd0\xf0")
+
+# bytes cp1252 leaves undefined
+CP1252_UNDEFINED = frozenset(b"\x81\x8d\x8f\x90\x9d")
+
+# Cyrillic words are whole runs of high bytes; accented Latin text
+# has at most one or two high bytes in a row
+HIGH_RUN = re.compile(rb"[\xc0-\xff]{3,}")
+HIGH_BYTE = re.compile(rb"[\x80-\xff]")
+
+
+# -------------------------------------------------
+# Detection
+# -------------------------------------------------
+
+def _bom_encoding(sample: bytes):
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    return None
+
+
+def _is_utf8(sample: bytes, truncated: bool) -> bool:
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=not truncated)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(sample: bytes, truncated: bool = True) -> tuple:
+    """
+    (encoding, confidence) of a leading byte sample.
+
+    UTF-8 is confirmed by decoding; otherwise the single-byte code pages
+    are told apart by byte statistics: long runs of high bytes mean
+    Cyrillic (windows-1251), combining tone marks after vowels (with
+    Đ / đ alongside them) mean cp1258, anything else is Western cp1252. `truncated` means the sample may end
+    inside a multi-byte character.
+    """
+    bom = _bom_encoding(sample)
+    if bom:
+        return bom, 1.0
+
+    high = len(HIGH_BYTE.findall(sample))
+    if high == 0:
+        return "utf-8", 1.0
+
+    if _is_utf8(sample, truncated):
+        return "utf-8", 0.99
+
+    in_runs = sum(len(m) for m in HIGH_RUN.findall(sample))
+    cyrillic = in_runs / high
+    if cyrillic >= 0.5:
+        return "cp1251", round(min(0.99, 0.5 + cyrillic / 2), 2)
+
+    vietnamese = 0.0
+    tones = len(TONE_MARK.findall(sample))
+    if tones:
+        vietnamese = (tones + sum(sample.count(bytes([b])) for b in VIETNAMESE_D)) / high
+    if vietnamese >= 0.2:
+        return "cp1258", round(min(0.99, 0.5 + vietnamese), 2)
+
+    undefined = sum(sample.count(bytes([b])) for b in CP1252_UNDEFINED) / high
+    confidence = 1.0 - max(cyrillic, vietnamese, undefined)
+    return "cp1252", round(max(0.1, min(0.99, confidence)), 2)
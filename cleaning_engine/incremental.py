@@ -0,0 +1,178 @@
+import hashlib
+import io
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from cleaning_engine.operations.duplicates import FingerprintStore
+from cleaning_engine.readers import compose_text
+
+
+MANIFEST_NAME = "run_manifest.json"
+FINGERPRINTS_DIR = "fingerprints"
+MANIFEST_VERSION = 2
+
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+# -------------------------------------------------
+# Manifest helpers
+# -------------------------------------------------
+
+def manifest_path(output_dir: str) -> str:
+    return os.path.join(output_dir, MANIFEST_NAME)
+
+
+def load_manifest(output_dir: str):
+    path = manifest_path(output_dir)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+
+    return manifest
+
+
+def save_manifest(output_dir: str, manifest: dict):
+    """Replace the manifest atomically so a crashed run never leaves half a file."""
+    manifest = {
+        **manifest,
+        "version": MANIFEST_VERSION,
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+    path = manifest_path(output_dir)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def fingerprint_store(output_dir: str) -> FingerprintStore:
+    """Fingerprints of every row written so far (duplicate memory across runs)."""
+    return FingerprintStore(os.path.join(output_dir, FINGERPRINTS_DIR))
+
+
+# -------------------------------------------------
+# Prefix checksum
+# -------------------------------------------------
+
+def processed_length(path: str) -> int:
+    """
+    Number of bytes that form complete lines.
+    A trailing partial line is left for the next run.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(HASH_BLOCK_SIZE, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            idx = block.rfind(b"\n")
+            if idx != -1:
+                return pos - step + idx + 1
+            pos -= step
+
+    return 0
+
+
+def scan_input(path: str, previous_bytes: int = 0) -> dict:
+    """
+    Single pass over the complete lines of `path`.
+    Returns the processed length, the checksum of the first
+    `previous_bytes` bytes and the checksum of the whole processed length,
+    so the prefix check and the next manifest never read the file twice.
+    """
+    end = processed_length(path)
+    h = hashlib.blake2b(digest_size=20)
+    previous_checksum = None
+    pos = 0
+
+    with open(path, "rb") as f:
+        while pos < end:
+            limit = end
+            if previous_checksum is None and pos < previous_bytes <= end:
+                limit = previous_bytes
+
+            block = f.read(min(HASH_BLOCK_SIZE, limit - pos))
+            if not block:
+                break
+            h.update(block)
+            pos += len(block)
+
+            if pos == previous_bytes:
+                previous_checksum = h.hexdigest()
+
+    if previous_bytes == 0:
+        previous_checksum = hashlib.blake2b(digest_size=20).hexdigest()
+
+    return {
+        "processed_bytes": end,
+        "previous_checksum": previous_checksum,
+        "prefix_checksum": h.hexdigest(),
+    }
+
+
+def check_manifest(manifest, input_csv_path: str, config: dict, scan: dict, store: FingerprintStore):
+    """
+    Returns None when an incremental update is safe,
+    otherwise the reason a full run is required.
+    """
+    if manifest is None:
+        return "no_manifest"
+
+    if os.path.abspath(input_csv_path) != manifest.get("input_path"):
+        return "input_changed"
+
+    if manifest.get("config") != config:
+        return "config_changed"
+
+    if scan["processed_bytes"] < manifest.get("processed_bytes", 0):
+        return "file_truncated"
+
+    if scan["previous_checksum"] != manifest.get("prefix_checksum"):
+        return "prefix_changed"
+
+    # a run that died after updating the store but before the manifest
+    if store.segment_count != manifest.get("fingerprint_segments"):
+        return "fingerprints_out_of_sync"
+
+    return None
+
+
+# -------------------------------------------------
+# Reading the new tail of a growing file
+# -------------------------------------------------
+
+def read_new_rows(input_csv_path: str, start: int, end: int, encoding: str | None = None) -> pd.DataFrame:
+    """
+    Read only rows between byte offsets `start` and `end`,
+    re-using the header line of the file and the encoding
+    detected by the full run.
+    """
+    with open(input_csv_path, "rb") as f:
+        header = f.readline()
+        f.seek(start)
+        tail = f.read(end - start)
+
+    new_rows = pd.read_csv(
+        io.BytesIO(header + tail),
+        dtype=str,
+        keep_default_na=False,
+        engine="python",
+        on_bad_lines="warn",
+        encoding=encoding or "utf-8",
+        encoding_errors="replace"
+    )
+
+    return compose_text(new_rows) if encoding == "cp1258" else new_rows
+
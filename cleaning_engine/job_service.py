@@ -0,0 +1,729 @@
+"""
+Local job-queue service for cleaning jobs.
+
+    python -m cleaning_engine.job_service --port 8765 --workers 2 --max-queued 8
+
+Jobs are queued in this process and run on a bounded pool of worker
+processes; no external broker. Every job lives in its own directory under
+--jobs-dir (upload, outputs, job.json), so results survive a browser
+disconnect and outlive the request that submitted them. The jobs
+directory is an OutputStore: uploads and outputs expire after --ttl-hours
+and the least recently used go first past --quota-mb; a finished job
+with neither left is removed.
+
+    POST   /jobs?filename=trade.csv&outputs=cleaned_file,powerbi_file&config={...}&options={...}
+           body: the raw file. 202 with the job, 429 when the queue is full,
+           507 when the upload does not fit the quota,
+           400 for config / options keys a client may not set (paths).
+    GET    /jobs                      all jobs, newest first
+    GET    /jobs/<id>                 state, queue position, progress and result
+    GET    /jobs/<id>/summary         the finished job's run summary
+    GET    /jobs/<id>/outputs/<name>  download an output (a Parquet / Arrow
+                                      dataset or star folder as a .zip)
+    DELETE /jobs/<id>                 cancel a job (a running one stops at
+                                      its next stage or chunk boundary)
+    GET    /health                    pool size and queue depth
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cleaning_engine.batch import FILE_SUMMARY_NAME, clean_file, _init_worker
+from cleaning_engine.output_store import OutputStore, QuotaExceeded, TOTAL_QUOTA_MB, TTL_HOURS
+from cleaning_engine.pipeline import COMPANY_MASTER_PATH
+from cleaning_engine.reference_store import content_key
+from cleaning_engine.service import DEFAULT_CONFIG, OUTPUT_FILES
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = "outputs/jobs"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUED = 8
+
+JOB_FILE = "job.json"
+# written by the worker, read by status(); the cancel marker goes the other way
+PROGRESS_FILE = "progress.json"
+CANCEL_FILE = "cancel"
+UPLOAD_BLOCK = 1024 * 1024
+RETRY_AFTER_SECONDS = 30
+
+FINISHED_STATES = {"done", "failed", "cancelled"}
+
+# what a client may set: pipeline switches and output options. Paths
+# (company master, review queue, name cache, profile, run history,
+# duplicate store) stay the service's own and are refused.
+CLIENT_CONFIG_KEYS = set(DEFAULT_CONFIG) | {
+    "company_columns", "company_required_columns",
+    "duplicate_subset", "duplicate_exclude", "profile_mode",
+}
+CLIENT_JOB_OPTIONS = {
+    "compression", "output_format", "partition_cols",
+    "memory_budget_mb", "incremental", "profile_mode",
+}
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _safe_filename(name: str) -> str:
+    name = os.path.basename(name or "") or "upload.csv"
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name)
+
+
+def _check_keys(kind: str, values, allowed: set):
+    """ValueError (HTTP 400) unless `values` is a dict of allowed keys."""
+    if values is None:
+        return
+    if not isinstance(values, dict):
+        raise ValueError(f"{kind} must be a JSON object")
+    refused = set(values) - allowed
+    if refused:
+        raise ValueError(f"{kind} keys not allowed: {sorted(refused)}")
+
+
+# -------------------------------------------------
+# Worker side
+# -------------------------------------------------
+
+def _run_job(job_dir: str, input_path: str, output_dir: str, config: dict,
+             job_options: dict) -> dict:
+    """
+    clean_file in a pool worker. Progress events go to a file in the job
+    directory and a cancel marker there stops the job, so neither needs a
+    channel back to the service process.
+    """
+    progress_path = os.path.join(job_dir, PROGRESS_FILE)
+    cancel_path = os.path.join(job_dir, CANCEL_FILE)
+
+    def progress(event):
+        with open(progress_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(event, f)
+        os.replace(progress_path + ".tmp", progress_path)
+
+    def cancel():
+        return os.path.exists(cancel_path)
+
+    return clean_file(
+        input_path, output_dir, config, job_options, progress=progress, cancel=cancel
+    )
+
+
+# -------------------------------------------------
+# Job queue
+# -------------------------------------------------
+
+class JobService:
+    """
+    Bounded job queue in front of a process pool.
+
+    Jobs wait in the service's own FIFO and go to the pool only when a
+    worker is free, so a queued job can be cancelled and its position is
+    exact. At most `max_queued` jobs may be waiting or running at once;
+    further submissions raise QueueFull (HTTP 429) until one finishes.
+
+    Job directories are the sessions of an OutputStore on jobs_dir:
+    queued and running jobs hold its lease, finished ones are swept by its
+    TTL and LRU rules, and an upload must fit its quota (QuotaExceeded).
+    """
+
+    def __init__(self, jobs_dir: str = DEFAULT_JOBS_DIR, workers: int = DEFAULT_WORKERS,
+                 max_queued: int = DEFAULT_MAX_QUEUED, master_path: str = COMPANY_MASTER_PATH,
+                 total_quota_mb: float = TOTAL_QUOTA_MB, ttl_hours: float = TTL_HOURS):
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.max_queued = max_queued
+        self.jobs = {}
+        self._futures = {}
+        self._queue = deque()
+        self._order = []
+        self._lock = threading.Lock()
+
+        os.makedirs(jobs_dir, exist_ok=True)
+        # one job may use the whole quota; outputs are folders, not gzipped
+        self.store = OutputStore(
+            jobs_dir, session_quota_mb=total_quota_mb, total_quota_mb=total_quota_mb,
+            ttl_hours=ttl_hours, compress_after_hours=None
+        )
+        self._load_jobs()
+
+        # spawned, not forked: a forked worker would inherit the listening
+        # socket and the request threads' locks
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(master_path, logging.getLogger().getEffectiveLevel())
+        )
+
+    # -----------------------------
+    # persistence
+    # -----------------------------
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _save(self, job: dict):
+        path = os.path.join(self.job_dir(job["id"]), JOB_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(job, f, indent=2, default=str)
+        os.replace(path + ".tmp", path)
+
+    def _load_jobs(self):
+        """Jobs of earlier service runs; unfinished ones died with that process."""
+        for name in os.listdir(self.jobs_dir):
+            path = os.path.join(self.jobs_dir, name, JOB_FILE)
+            if not os.path.exists(path):
+                continue
+
+            with open(path, "r", encoding="utf-8") as f:
+                job = json.load(f)
+
+            if job["state"] not in FINISHED_STATES:
+                job.update(state="failed", error="interrupted: service restarted",
+                           finished_at=_now())
+                self._save(job)
+                self.store.release(job["id"])
+
+            self.jobs[job["id"]] = job
+
+        self._order = sorted(self.jobs, key=lambda i: self.jobs[i]["submitted_at"])
+
+    # -----------------------------
+    # queue
+    # -----------------------------
+    def pending(self) -> int:
+        return len(self._queue) + len(self._futures)
+
+    def check_capacity(self):
+        if self.pending() >= self.max_queued:
+            raise QueueFull(f"{self.max_queued} jobs already queued or running")
+
+    def submit(self, filename: str, stream, length: int, config: dict | None = None,
+               requested_outputs=None, job_options: dict | None = None) -> dict:
+        """
+        Queue a job for `length` bytes read from `stream`. The upload is
+        copied to disk in blocks, never held in memory whole, and hashed on
+        the way as its review source. config and
+        job_options may only hold CLIENT_CONFIG_KEYS / CLIENT_JOB_OPTIONS.
+        """
+        with self._lock:
+            self.check_capacity()
+
+        unknown = set(requested_outputs or []) - set(OUTPUT_FILES)
+        if unknown:
+            raise ValueError(f"Unknown outputs requested: {sorted(unknown)}")
+
+        _check_keys("config", config, CLIENT_CONFIG_KEYS)
+        _check_keys("options", job_options, CLIENT_JOB_OPTIONS)
+
+        self.sweep()
+        job_id = uuid.uuid4().hex[:12]
+        self.store.check_quota(job_id, length)
+
+        # held until the job finishes: sweeps skip the directory
+        self.store.acquire(job_id)
+        job_dir = self.job_dir(job_id)
+        os.makedirs(job_dir)
+
+        input_path = os.path.join(job_dir, "input_" + _safe_filename(filename))
+        hasher = hashlib.blake2b(digest_size=16)
+        remaining = length
+        with open(input_path, "wb") as f:
+            while remaining > 0:
+                block = stream.read(min(UPLOAD_BLOCK, remaining))
+                if not block:
+                    break
+                f.write(block)
+                hasher.update(block)
+                remaining -= len(block)
+
+        if remaining:
+            self._discard(job_id)
+            raise ValueError("Upload ended before Content-Length bytes")
+
+        job = {
+            "id": job_id,
+            "state": "queued",
+            "filename": filename,
+            "input_path": input_path,
+            "output_dir": os.path.join(job_dir, "outputs"),
+            "submitted_at": _now(),
+            "config": {**DEFAULT_CONFIG, **(config or {})},
+            "job_options": {
+                **(job_options or {}),
+                "requested_outputs": requested_outputs,
+                # every upload gets a new path: the review queue knows it by content
+                "review_source": content_key(hasher=hasher),
+            },
+        }
+
+        with self._lock:
+            # the upload took time; capacity is checked again before queueing
+            try:
+                self.check_capacity()
+            except QueueFull:
+                self._discard(job_id)
+                raise
+
+            self.jobs[job_id] = job
+            self._order.append(job_id)
+            self._queue.append(job_id)
+            self._save(job)
+
+        logger.info("Job %s queued (%s)", job_id, filename)
+        self._dispatch()
+
+        return self.status(job_id)
+
+    def _dispatch(self):
+        """Hand queued jobs to the pool while a worker is free."""
+        started = []
+        with self._lock:
+            while self._queue and len(self._futures) < self.workers:
+                job = self.jobs[self._queue.popleft()]
+                job.update(state="running", started_at=_now())
+                # a fresh lease for the run itself
+                self.store.acquire(job["id"])
+                self._save(job)
+
+                self._futures[job["id"]] = self._pool.submit(
+                    _run_job, self.job_dir(job["id"]), job["input_path"],
+                    job["output_dir"], job["config"], job["job_options"]
+                )
+                started.append(job["id"])
+
+        # outside the lock: an already finished future calls back at once
+        for job_id in started:
+            self._futures[job_id].add_done_callback(
+                lambda f, job_id=job_id: self._finished(job_id, f)
+            )
+
+    def _finished(self, job_id: str, future):
+        with self._lock:
+            del self._futures[job_id]
+            job = self.jobs[job_id]
+            job["finished_at"] = _now()
+
+            if future.exception() is not None:
+                # the worker process died
+                job["state"] = "failed"
+                job["error"] = f"{type(future.exception()).__name__}: {future.exception()}"
+            else:
+                result = future.result()
+                job["result"] = result
+                job["state"] = {"ok": "done", "cancelled": "cancelled"}.get(
+                    result["status"], "failed"
+                )
+                job["error"] = result.get("error")
+
+            self._save(job)
+            self._release(job)
+
+        logger.info("Job %s %s", job_id, job["state"])
+        self._dispatch()
+        self.sweep()
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a waiting job at once, or ask a running one to stop at its
+        next stage boundary (it then finishes as "cancelled").
+        """
+        with self._lock:
+            if job_id in self._futures:
+                open(os.path.join(self.job_dir(job_id), CANCEL_FILE), "w").close()
+                return True
+
+            if job_id not in self._queue:
+                return False
+
+            self._queue.remove(job_id)
+            job = self.jobs[job_id]
+            job.update(state="cancelled", finished_at=_now())
+            self._save(job)
+            self._release(job)
+            return True
+
+    # -----------------------------
+    # disk
+    # -----------------------------
+    def _release(self, job: dict):
+        """A finished job's files start ageing from now."""
+        for path in (job["output_dir"], os.path.join(self.job_dir(job["id"]), JOB_FILE)):
+            if os.path.exists(path):
+                self.store.touch(path)
+        self.store.release(job["id"])
+
+    def _discard(self, job_id: str):
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        self.store.release(job_id)
+
+    def sweep(self) -> dict | None:
+        """
+        OutputStore.maybe_sweep() over the job directories, then forget
+        finished jobs whose upload and outputs are both gone.
+        """
+        report = self.store.maybe_sweep()
+
+        with self._lock:
+            for job_id in list(self.jobs):
+                job = self.jobs[job_id]
+                if job["state"] not in FINISHED_STATES:
+                    continue
+                if self.store.resolve(job["input_path"]) or os.path.exists(job["output_dir"]):
+                    continue
+
+                shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+                del self.jobs[job_id]
+                self._order.remove(job_id)
+
+        return report
+
+    # -----------------------------
+    # status
+    # -----------------------------
+    def status(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+
+            job = dict(job)
+            if job["state"] == "queued":
+                job["position"] = self._queue.index(job_id) + 1
+
+        if job["state"] == "running":
+            job["progress"] = self._progress(job_id)
+            job["cancel_requested"] = os.path.exists(
+                os.path.join(self.job_dir(job_id), CANCEL_FILE)
+            )
+
+        return job
+
+    def _progress(self, job_id: str) -> dict | None:
+        try:
+            with open(os.path.join(self.job_dir(job_id), PROGRESS_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list_jobs(self) -> list:
+        return [self.status(job_id) for job_id in reversed(self._order)]
+
+    def health(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queued": self.max_queued,
+                "pending": self.pending(),
+                "jobs": len(self.jobs),
+            }
+
+    def summary(self, job_id: str) -> dict | None:
+        """The run summary a finished job wrote next to its outputs."""
+        job = self.jobs.get(job_id)
+        output_dir = (job.get("result") or {}).get("output_dir") if job else None
+        if output_dir is None:
+            return None
+        try:
+            with open(os.path.join(output_dir, FILE_SUMMARY_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def output_file(self, job_id: str, name: str) -> str | None:
+        """
+        The file to send for an output: the output itself, or for a
+        dataset / star folder a zip of it (made once, beside the folder).
+        """
+        job = self.jobs.get(job_id)
+        if job is None or name not in OUTPUT_FILES:
+            return None
+        path = (job.get("result") or {}).get("outputs", {}).get(name)
+        if not path or not os.path.exists(path):
+            return None
+
+        # downloads keep the job at the back of the eviction queue
+        self.store.touch(job["output_dir"])
+        self.store.touch(os.path.join(self.job_dir(job_id), JOB_FILE))
+
+        if os.path.isfile(path):
+            return path
+        archive = path.rstrip(os.sep) + ".zip"
+        if not os.path.exists(archive):
+            # concurrent downloads each build their own copy; one wins
+            tmp = shutil.make_archive(f"{path}.{uuid.uuid4().hex[:8]}", "zip", path)
+            os.replace(tmp, archive)
+        return archive
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+# -------------------------------------------------
+# HTTP
+# -------------------------------------------------
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    # set by make_server
+    service: JobService = None
+
+    def log_message(self, fmt, *args):
+        logger.debug("%s %s", self.address_string(), fmt % args)
+
+    def _json(self, status, body, headers=None):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message, headers=None):
+        self._json(status, {"error": message}, headers)
+
+    def _parts(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+        return parts, query
+
+    def do_GET(self):
+        parts, _ = self._parts()
+
+        if parts == ["health"]:
+            return self._json(HTTPStatus.OK, self.service.health())
+
+        if parts == ["jobs"]:
+            return self._json(HTTPStatus.OK, self.service.list_jobs())
+
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.service.status(parts[1])
+            if job is None:
+                return self._error(HTTPStatus.NOT_FOUND, "no such job")
+            return self._json(HTTPStatus.OK, job)
+
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "summary":
+            summary = self.service.summary(parts[1])
+            if summary is None:
+                return self._error(HTTPStatus.NOT_FOUND, "summary not available")
+            return self._json(HTTPStatus.OK, summary)
+
+        if len(parts) == 4 and parts[0] == "jobs" and parts[2] == "outputs":
+            path = self.service.output_file(parts[1], parts[3])
+            if path is None:
+                return self._error(HTTPStatus.NOT_FOUND, "output not available")
+            return self._send_file(path)
+
+        self._error(HTTPStatus.NOT_FOUND, "not found")
+
+    def _send_file(self, path):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.send_header(
+            "Content-Disposition", f'attachment; filename="{os.path.basename(path)}"'
+        )
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, UPLOAD_BLOCK)
+
+    def _discard_body(self, length):
+        """
+        Read off an upload that is refused, so the client sees the error
+        response rather than a broken pipe. Nothing is kept.
+        """
+        remaining = length
+        while remaining > 0:
+            block = self.rfile.read(min(UPLOAD_BLOCK, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+
+    def do_POST(self):
+        parts, query = self._parts()
+        if parts != ["jobs"]:
+            return self._error(HTTPStatus.NOT_FOUND, "not found")
+
+        length = self.headers.get("Content-Length", "")
+        if not length.isdigit():
+            self.close_connection = True
+            return self._error(HTTPStatus.LENGTH_REQUIRED, "Content-Length required")
+        length = int(length)
+
+        try:
+            # refuse before reading a large body
+            with self.service._lock:
+                self.service.check_capacity()
+
+            config = json.loads(query["config"]) if "config" in query else None
+            outputs = query["outputs"].split(",") if query.get("outputs") else None
+            job_options = json.loads(query["options"]) if "options" in query else None
+
+            job = self.service.submit(
+                query.get("filename", "upload.csv"), self.rfile, length,
+                config=config, requested_outputs=outputs, job_options=job_options
+            )
+        except QueueFull as e:
+            self._discard_body(length)
+            return self._error(HTTPStatus.TOO_MANY_REQUESTS, str(e),
+                               {"Retry-After": str(RETRY_AFTER_SECONDS)})
+        except QuotaExceeded as e:
+            self._discard_body(length)
+            return self._error(HTTPStatus.INSUFFICIENT_STORAGE, str(e))
+        except ValueError as e:
+            self._discard_body(length)
+            return self._error(HTTPStatus.BAD_REQUEST, str(e))
+
+        self._json(HTTPStatus.ACCEPTED, job, {"Location": f"/jobs/{job['id']}"})
+
+    def do_DELETE(self):
+        parts, _ = self._parts()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._error(HTTPStatus.NOT_FOUND, "not found")
+
+        if self.service.status(parts[1]) is None:
+            return self._error(HTTPStatus.NOT_FOUND, "no such job")
+
+        if not self.service.cancel(parts[1]):
+            return self._error(HTTPStatus.CONFLICT, "job already finished")
+
+        self._json(HTTPStatus.OK, self.service.status(parts[1]))
+
+
+def make_server(service: JobService, host: str = "127.0.0.1",
+                port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    handler = type("BoundJobRequestHandler", (JobRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# -------------------------------------------------
+# Client (used by the Streamlit app)
+# -------------------------------------------------
+
+class JobClient:
+    def __init__(self, base_url: str, timeout: float = 30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, data=None, headers=None):
+        request = urllib.request.Request(
+            self.base_url + path, data=data, method=method, headers=headers or {}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            if e.code == HTTPStatus.TOO_MANY_REQUESTS:
+                raise QueueFull(json.loads(e.read()).get("error")) from e
+            raise
+
+    def submit(self, input_path: str, config: dict | None = None,
+               requested_outputs=None, job_options: dict | None = None) -> dict:
+        query = {"filename": os.path.basename(input_path)}
+        if config is not None:
+            query["config"] = json.dumps(config)
+        if requested_outputs:
+            query["outputs"] = ",".join(requested_outputs)
+        if job_options:
+            query["options"] = json.dumps(job_options)
+
+        # the file object is streamed, not read into memory
+        with open(input_path, "rb") as f:
+            return self._request(
+                "POST", "/jobs?" + urllib.parse.urlencode(query), data=f,
+                headers={"Content-Length": str(os.path.getsize(input_path))}
+            )
+
+    def status(self, job_id: str) -> dict:
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def summary(self, job_id: str) -> dict:
+        return self._request("GET", f"/jobs/{job_id}/summary")
+
+    def download(self, job_id: str, name: str, dest_dir: str) -> str:
+        """
+        Stream output `name` into dest_dir under the name the service
+        sends (folders come as .zip). Returns the local path.
+        """
+        url = f"{self.base_url}/jobs/{job_id}/outputs/{urllib.parse.quote(name)}"
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            filename = response.headers.get_filename() or name
+            path = os.path.join(dest_dir, _safe_filename(filename))
+            with open(path + ".part", "wb") as f:
+                shutil.copyfileobj(response, f, UPLOAD_BLOCK)
+        os.replace(path + ".part", path)
+        return path
+
+    def cancel(self, job_id: str) -> dict:
+        return self._request("DELETE", f"/jobs/{job_id}")
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local cleaning job service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--max-queued", type=int, default=DEFAULT_MAX_QUEUED,
+                        help="jobs queued or running before submissions get 429")
+    parser.add_argument("--jobs-dir", default=DEFAULT_JOBS_DIR)
+    parser.add_argument("--quota-mb", type=float, default=TOTAL_QUOTA_MB,
+                        help="disk for uploads and outputs of all jobs")
+    parser.add_argument("--ttl-hours", type=float, default=TTL_HOURS,
+                        help="finished jobs' files are removed after this long unused")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    service = JobService(args.jobs_dir, args.workers, args.max_queued,
+                         total_quota_mb=args.quota_mb, ttl_hours=args.ttl_hours)
+    server = make_server(service, args.host, args.port)
+    logger.info("Job service on http://%s:%d (%d workers)", args.host, args.port, args.workers)
+
+    # stop cleanly on SIGTERM too, taking the worker processes down with us
+    signal.signal(signal.SIGTERM, _interrupt)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main()
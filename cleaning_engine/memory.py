@@ -0,0 +1,187 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from cleaning_engine.readers import sample_input, estimate_rows
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+MB = 1024 * 1024
+
+# raw frame + cleaned frame + one intermediate column set while an
+# operation runs (copy-on-write lets unchanged columns share memory)
+WORKING_COPIES = 3
+
+ESTIMATE_SAMPLE_ROWS = 2000
+
+
+_cow_lock = threading.Lock()
+_cow_jobs = 0
+_cow_previous = None
+
+
+@contextmanager
+def copy_on_write():
+    """
+    Context in which column selections and shallow copies share memory
+    until something writes to them (pandas 3 always behaves like this).
+    Scoped to the jobs rather than set on import, so code that imports the
+    engine keeps its own pandas options. pandas options are process-wide:
+    the first job to enter turns it on and the last to leave restores it,
+    so jobs on other threads never see it switched off under them.
+    """
+    global _cow_jobs, _cow_previous
+
+    if int(pd.__version__.split(".")[0]) >= 3:
+        yield
+        return
+
+    with _cow_lock:
+        if _cow_jobs == 0:
+            _cow_previous = pd.get_option("mode.copy_on_write")
+            pd.set_option("mode.copy_on_write", True)
+        _cow_jobs += 1
+    try:
+        yield
+    finally:
+        with _cow_lock:
+            _cow_jobs -= 1
+            if _cow_jobs == 0:
+                pd.set_option("mode.copy_on_write", _cow_previous)
+
+
+# -------------------------------------------------
+# RSS readers
+# -------------------------------------------------
+
+def rss_bytes() -> int:
+    """Current resident set size of this process (0 if unknown)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    if resource is not None:
+        # no current RSS outside Linux, fall back to the lifetime peak
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+    return 0
+
+
+def _kernel_peak_bytes():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _reset_kernel_peak() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class PeakMemoryMonitor:
+    """
+    Peak RSS reached inside a `with` block.
+
+    Uses the kernel high-water mark when it can be reset (Linux), and a
+    sampling thread otherwise, so each run reports its own peak rather than
+    the peak of the whole process lifetime.
+
+    The high-water mark belongs to the process: while another monitor is
+    active (jobs on app threads) it is neither reset nor read, and only
+    the samples count. RSS is process-wide either way, so `shared` tells
+    that the peak includes the other jobs' memory.
+    """
+
+    _lock = threading.Lock()
+    _active = set()
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.start_bytes = 0
+        self.peak_bytes = 0
+        self.shared = False
+        self._kernel = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        with PeakMemoryMonitor._lock:
+            self.shared = bool(PeakMemoryMonitor._active)
+            for other in PeakMemoryMonitor._active:
+                other.shared = True
+            PeakMemoryMonitor._active.add(self)
+            # resetting would clear the peak the other jobs are measuring
+            self._kernel = not self.shared and _reset_kernel_peak()
+
+        self.start_bytes = rss_bytes()
+        self.peak_bytes = self.start_bytes
+
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+        with PeakMemoryMonitor._lock:
+            PeakMemoryMonitor._active.discard(self)
+
+        self.peak_bytes = max(self.peak_bytes, rss_bytes())
+        if self._kernel and not self.shared:
+            self.peak_bytes = max(self.peak_bytes, _kernel_peak_bytes() or 0)
+
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, rss_bytes())
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak_bytes / MB, 1)
+
+
+# -------------------------------------------------
+# Memory estimate for a run
+# -------------------------------------------------
+
+def estimate_frame_bytes_per_row(input_path: str, sample_rows: int = ESTIMATE_SAMPLE_ROWS) -> float:
+    """
+    In-memory DataFrame bytes per row, measured on the leading rows.
+    """
+    sample = sample_input(input_path, sample_rows)
+    if sample.empty:
+        return 1.0
+
+    return sample.memory_usage(index=False, deep=True).sum() / len(sample)
+
+
+def estimate_run_mb(input_path: str) -> float:
+    """Rough peak memory of cleaning the whole input in one frame."""
+    row_bytes = estimate_frame_bytes_per_row(input_path)
+    return estimate_rows(input_path) * row_bytes * WORKING_COPIES / MB
+
+
+def chunk_rows_for_budget(input_path: str, budget_mb: float, min_rows: int = 10_000) -> int:
+    """Rows per chunk so one chunk's working set stays within the budget."""
+    row_mb = estimate_frame_bytes_per_row(input_path) * WORKING_COPIES / MB
+    return max(min_rows, int(budget_mb / max(row_mb, 1e-9)))
@@ -0,0 +1,213 @@
+"""
+Persistent cache of raw company name -> resolution, across runs.
+
+The same raw spellings come back in every monthly file. Each entry keeps
+what the preclean -> suffix removal -> master match chain made of a raw
+string (preclean, core and standardized name, needs review), so a known
+spelling skips the whole chain. Entries belong to a version of the master
+and the rules, and a lookup only sees the entries of its own version, so
+runs against different masters can share one cache. A version nobody
+has opened for MAX_AGE_DAYS is dropped.
+
+    python -m cleaning_engine.name_cache status
+    python -m cleaning_engine.name_cache clear
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from cleaning_engine.operations import (
+    company_preclean, company_standardizer, company_suffix_cleaner, unicode_folding,
+)
+from cleaning_engine.operations.company_standardizer import master_signature
+
+
+NAME_CACHE_PATH = "datasets/reference/name_cache.db"
+
+# bump when the resolution code changes without a rule table changing
+RULES_VERSION = 1
+
+# versions not opened for this long are pruned
+MAX_AGE_DAYS = 30
+
+CACHE_COLUMNS = ["preclean", "core", "standardized", "needs_review"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS names (
+    raw TEXT NOT NULL,
+    version TEXT NOT NULL,
+    preclean TEXT,
+    core TEXT,
+    standardized TEXT,
+    needs_review INTEGER NOT NULL,
+    PRIMARY KEY (raw, version)
+);
+
+CREATE TABLE IF NOT EXISTS versions (
+    version TEXT PRIMARY KEY,
+    last_used TEXT NOT NULL
+);
+"""
+
+
+def rules_version() -> str:
+    """Fingerprint of every rule table the resolution chain uses."""
+    rules = (
+        RULES_VERSION,
+        sorted(company_preclean.DROP_EXACT),
+        company_preclean.DROP_KEYWORDS,
+        company_suffix_cleaner.LEGAL_SUFFIXES,
+        sorted(company_standardizer.LEGAL_SUFFIXES),
+        sorted(company_standardizer.BAD_NAME_TOKENS),
+        sorted(unicode_folding.SPECIAL_FOLDS.items()),
+        sorted(unicode_folding.FOLD_TABLE.items()),
+    )
+    return hashlib.sha1(repr(rules).encode()).hexdigest()[:12]
+
+
+def cache_version(master_path: str) -> str:
+    """Version of the master (path and change counter / file stamp) and rules."""
+    key = (os.path.abspath(master_path), master_signature(master_path), rules_version())
+    return hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+
+
+# -------------------------------------------------
+# Cache
+# -------------------------------------------------
+
+class NameCache:
+    """Resolutions of raw names for one master / rules version."""
+
+    def __init__(self, path: str, version: str, max_age_days: float = MAX_AGE_DAYS):
+        self.path = path
+        self.version = version
+
+        now = datetime.now()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO versions (version, last_used) VALUES (?, ?)",
+                (self.version, now.isoformat(timespec="seconds"))
+            )
+            # other versions stay for the runs still using them, until unused
+            cutoff = (now - timedelta(days=max_age_days)).isoformat(timespec="seconds")
+            conn.execute(
+                "DELETE FROM names WHERE version IN "
+                "(SELECT version FROM versions WHERE last_used < ?)",
+                (cutoff,)
+            )
+            conn.execute("DELETE FROM versions WHERE last_used < ?", (cutoff,))
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # concurrent runs read while one appends
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def lookup(self, raw_names) -> pd.DataFrame:
+        """Cached resolutions of the given raw names, indexed by raw name."""
+        with closing(self._connect()) as conn:
+            conn.execute("CREATE TEMP TABLE wanted (raw TEXT PRIMARY KEY)")
+            conn.executemany(
+                "INSERT OR IGNORE INTO wanted (raw) VALUES (?)",
+                ((name,) for name in raw_names)
+            )
+            found = pd.read_sql_query(
+                """
+                SELECT n.raw, n.preclean, n.core, n.standardized, n.needs_review
+                FROM names n JOIN wanted w ON w.raw = n.raw
+                WHERE n.version = ?
+                """,
+                conn,
+                params=(self.version,),
+            )
+
+        found["needs_review"] = found["needs_review"].astype(bool)
+        return found.set_index("raw")
+
+    def add(self, resolved: pd.DataFrame) -> int:
+        """Append resolutions (indexed by raw name, CACHE_COLUMNS). Returns rows written."""
+        if resolved.empty:
+            return 0
+
+        rows = [
+            (raw, self.version, _text(pre), _text(core), _text(std), int(bool(review)))
+            for raw, pre, core, std, review in resolved[CACHE_COLUMNS].itertuples()
+        ]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO names
+                    (raw, version, preclean, core, standardized, needs_review)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+        return len(rows)
+
+
+def _text(value):
+    return None if pd.isna(value) else str(value)
+
+
+def open_cache(path: str | None, master_path: str) -> NameCache | None:
+    """The cache at `path` for the current master and rules (None: no cache)."""
+    if path is None:
+        return None
+    return NameCache(path, cache_version(master_path))
+
+
+def hit_rate(summary: dict):
+    """Share of distinct names served from the cache, from the summary counts."""
+    hits = summary.get("company_name_cache_hits", 0)
+    misses = summary.get("company_name_cache_misses", 0)
+    if hits + misses == 0:
+        return None
+    return round(hits / (hits + misses), 4)
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent company name cache")
+    parser.add_argument("command", choices=["status", "clear"])
+    parser.add_argument("--db", default=NAME_CACHE_PATH, help="cache database")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"No name cache at {args.db}")
+        return 0
+
+    with closing(sqlite3.connect(args.db, timeout=30)) as conn, conn:
+        if args.command == "clear":
+            conn.execute("DELETE FROM names")
+            print(f"Cleared {args.db}")
+            return 0
+
+        versions = conn.execute(
+            """
+            SELECT v.version, v.last_used, COUNT(n.raw), COALESCE(SUM(n.needs_review), 0)
+            FROM versions v LEFT JOIN names n ON n.version = v.version
+            GROUP BY v.version
+            ORDER BY v.last_used DESC
+            """
+        ).fetchall()
+
+    print(f"{args.db}: {len(versions)} versions")
+    for version, last_used, total, review in versions:
+        print(f"  {version}  last used {last_used}  {total} names ({review} need review)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 import pandas as pd
 import re
 
+from cleaning_engine.operations.unicode_folding import fold_series
+
 
 # -----------------------------
 # Filters
@@ -104,16 +106,20 @@ def is_irrelevant_company(name: str) -> bool:
 def preclean_company_name(series: pd.Series) -> pd.Series:
     """
     Pre-clean company names:
+    - Fold accents (CÔNG TY -> CONG TY) so they count as Latin letters
     - Uppercase
     - Remove punctuation
     - Remove standalone numbers
     - Normalize spaces
     - Remove irrelevant companies
+
+    Each distinct name is cleaned once and mapped back to the rows.
     """
 
+    codes, uniques = pd.factorize(series.astype(str))
+
     cleaned = (
-        series
-        .astype(str)
+        fold_series(pd.Series(uniques, dtype=object))
         .str.upper()
         .str.replace(r"[^\w\s]", " ", regex=True)
         .str.replace(r"\b\d+\b", " ", regex=True)
@@ -127,4 +133,8 @@ def preclean_company_name(series: pd.Series) -> pd.Series:
     # set junk → NA (pipeline will drop rows)
     cleaned[mask_irrelevant] = pd.NA
 
-    return cleaned
+    return pd.Series(
+        cleaned.to_numpy(dtype=object).take(codes),
+        index=series.index,
+        name=series.name
+    )
@@ -1,7 +1,17 @@
+import contextvars
+import logging
+import os
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
 import re
 
-print(">>> COMPANY STANDARDIZER RUNNING")
+from cleaning_engine.operations.unicode_folding import fold_accents
+from cleaning_engine.reference_store import (
+    is_store, change_counter, load_master, add_review, merge_review_csv,
+)
+
+logger = logging.getLogger(__name__)
 
 
 # ---------------------------------
@@ -23,11 +33,11 @@ BAD_NAME_TOKENS = {"", "NA", "N/A", "NULL", "NONE", "NAN"}
 # ---------------------------------
 
 def normalize_key(x: str) -> str:
-    """Safe normalize for matching"""
+    """Safe normalize for matching (accent-folded, so CÔNG == CONG)"""
     if pd.isna(x):
         return ""
 
-    s = str(x).upper().strip()
+    s = fold_accents(str(x)).upper().strip()
 
     if s in BAD_NAME_TOKENS:
         return ""
@@ -71,22 +81,41 @@ def detect_brand_root_from_master(name: str, brand_roots):
 
 
 # ---------------------------------
-# Main Standardizer
+# Master index (loaded once per process)
 # ---------------------------------
 
-def standardize_company_names(
-    df: pd.DataFrame,
-    column_name: str,
-    master_path: str,
-    standardized_col: str,
-    review_flag_col: str,
-    review_output_path: str
-) -> pd.DataFrame:
+# path -> (signature, index, resolved); reloaded when the master changes.
+# resolved maps a name key to (standardized, needs_review) and is shared
+# by every column, chunk and job the process standardizes.
+_MASTER_INDEX = {}
 
-    # -----------------------------
-    # Load master
-    # -----------------------------
-    master_df = pd.read_csv(master_path)
+# resolved names kept per master before the cache starts over
+RESOLVE_CACHE_SIZE = 1_000_000
+
+
+def master_signature(path: str) -> tuple:
+    """Changes whenever the master does (store change counter, else file stamp)."""
+    if is_store(path):
+        return ("version", change_counter("master", path))
+
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_master_index(master_path: str) -> tuple:
+    """
+    (master_map, master_map_suffix, brand_roots) for a master (a reference
+    store or a CSV file). Cached per process, so chunks, increments and batch jobs handled by
+    the same process share one parsed master.
+    """
+    key = os.path.abspath(master_path)
+    signature = master_signature(master_path)
+
+    cached = _MASTER_INDEX.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    master_df = load_master(master_path) if is_store(master_path) else pd.read_csv(master_path)
 
     master_df["core_name"] = master_df["core_name"].apply(normalize_key)
     master_df["standardized_name"] = master_df["standardized_name"].apply(normalize_key)
@@ -108,73 +137,213 @@ def standardize_company_names(
 
     brand_roots = build_brand_roots(master_df)
 
-    standardized_values = []
-    needs_review = []
+    index = (master_map, master_map_suffix, brand_roots)
+    _MASTER_INDEX[key] = (signature, index, {})
+    logger.debug("Company master loaded: %s (%d keys)", master_path, len(master_map))
 
-    # -----------------------------
-    # Row-wise standardization
-    # -----------------------------
-    for raw in df[column_name]:
+    return index
 
-        key = normalize_key(raw)
 
+# ---------------------------------
+# Name resolution
+# ---------------------------------
+
+def resolve_name(key: str, master_map, master_map_suffix, brand_roots) -> tuple:
+    """(standardized name, needs review) of one normalized name key."""
+
+    # -------------------------
+    # Step 1 — direct master match
+    # -------------------------
+    if key in master_map:
+        return master_map[key], False
+
+    # -------------------------
+    # Step 2 — suffix stripped match
+    # -------------------------
+    key_no_suffix = strip_suffix_noise(key)
+
+    if key_no_suffix in master_map_suffix:
+        return master_map_suffix[key_no_suffix], False
+
+    # -------------------------
+    # Step 3 — brand root collapse
+    # -------------------------
+    brand = detect_brand_root_from_master(key_no_suffix, brand_roots)
+
+    if brand:
+        return brand, False
+
+    # -------------------------
+    # Step 4 — fallback → review
+    # -------------------------
+    return key, True
+
+
+def resolve_names(keys, master_path: str) -> tuple:
+    """
+    Resolve distinct name keys against a master:
+    (results in the order of `keys`, names resolved now, names reused).
+    Names already resolved against the same master version, in any column,
+    come from the shared cache.
+    """
+    index = load_master_index(master_path)
+    resolved = _MASTER_INDEX[os.path.abspath(master_path)][2]
+
+    results = []
+    fresh = 0
+    for key in keys:
         if key == "":
-            standardized_values.append(None)
-            needs_review.append(False)
+            results.append((None, False))
             continue
 
-        # -------------------------
-        # Step 1 — direct master match
-        # -------------------------
-        if key in master_map:
-            standardized_values.append(master_map[key])
-            needs_review.append(False)
-            continue
+        result = resolved.get(key)
+        if result is None:
+            if len(resolved) >= RESOLVE_CACHE_SIZE:
+                resolved.clear()
+            result = resolved[key] = resolve_name(key, *index)
+            fresh += 1
+        results.append(result)
 
-        # -------------------------
-        # Step 2 — suffix stripped match
-        # -------------------------
-        key_no_suffix = strip_suffix_noise(key)
+    reused = sum(1 for k in keys if k != "") - fresh
+    return results, fresh, reused
 
-        if key_no_suffix in master_map_suffix:
-            standardized_values.append(master_map_suffix[key_no_suffix])
-            needs_review.append(False)
-            continue
 
-        # -------------------------
-        # Step 3 — brand root collapse
-        # -------------------------
-        brand = detect_brand_root_from_master(key_no_suffix, brand_roots)
+# ---------------------------------
+# Main Standardizer
+# ---------------------------------
 
-        if brand:
-            standardized_values.append(brand)
-            needs_review.append(False)
-            continue
+def standardize_company_names(
+    df: pd.DataFrame,
+    column_name: str,
+    master_path: str,
+    standardized_col: str,
+    review_flag_col: str,
+    review_output_path: str | None,
+    value_col: str | None = None,
+    summary: dict | None = None
+) -> pd.DataFrame:
+    """
+    Map the names of `column_name` to the master. Each distinct name is
+    resolved once (see resolve_names); summary, if given, counts the
+    names resolved and reused in company_names_resolved / _reused.
+    """
+
+    # -----------------------------
+    # Distinct names only
+    # -----------------------------
+    codes, uniques = pd.factorize(df[column_name])
+    keys = [normalize_key(v) for v in uniques]
+
+    results, fresh, reused = resolve_names(keys, master_path)
 
-        # -------------------------
-        # Step 4 — fallback → review
-        # -------------------------
-        standardized_values.append(key)
-        needs_review.append(True)
+    # code -1 (missing) takes the trailing "no name" entry
+    standardized = np.array([r[0] for r in results] + [None], dtype=object)
+    review = np.array([r[1] for r in results] + [False], dtype=bool)
+
+    standardized_values = standardized.take(codes)
+    needs_review = review.take(codes)
+
+    if summary is not None:
+        summary["company_names_resolved"] = summary.get("company_names_resolved", 0) + fresh
+        summary["company_names_reused"] = summary.get("company_names_reused", 0) + reused
 
     df[standardized_col] = standardized_values
     df[review_flag_col] = needs_review
 
-    # -----------------------------
-    # Export clean review file
-    # -----------------------------
-    review_df = (
-        df.loc[df[review_flag_col], standardized_col]
-        .dropna()
-        .astype(str)
-        .map(normalize_key)
-        .loc[lambda s: s.str.len() >= 3]
-        .drop_duplicates()
-        .sort_values()
-        .to_frame(name="unmapped_core_name")
+    queue_for_review(df, standardized_col, review_flag_col, review_output_path, value_col)
+    return df
+
+
+# ---------------------------------
+# Review queue
+# ---------------------------------
+
+_review_batch = contextvars.ContextVar("cleaning_engine_review_batch", default=None)
+
+
+class ReviewBatch:
+    """
+    Unmatched names of one job. While active, queue_for_review() collects
+    the counts here instead of writing them; flush() merges the totals
+    once, so a job is one run of the queue however many chunks and
+    company columns it has.
+    """
+
+    def __init__(self):
+        self.counts = {}  # review path -> count frames
+
+    @contextmanager
+    def activate(self):
+        token = _review_batch.set(self)
+        try:
+            yield self
+        finally:
+            _review_batch.reset(token)
+
+    def add(self, review_output_path, counts: pd.DataFrame):
+        self.counts.setdefault(review_output_path, []).append(counts)
+
+    def flush(self, source: str | None = None, replace: bool = True):
+        """
+        Merge the collected counts into their queues. `source` and
+        `replace` are passed to add_review (a review CSV just adds up).
+        """
+        for path, frames in self.counts.items():
+            counts = (
+                pd.concat(frames)
+                .groupby("core_name", as_index=False)
+                .agg(rows=("rows", "sum"), cif_usd=("cif_usd", "sum"))
+            )
+            if is_store(path):
+                add_review(counts, path, source=source, replace=replace)
+            else:
+                merge_review_csv(counts, path)
+        self.counts = {}
+
+
+def current_review_batch():
+    return _review_batch.get()
+
+
+def queue_for_review(df, standardized_col, review_flag_col, review_output_path, value_col=None):
+    """
+    Merge unmatched names into the review queue (a reference store, or a
+    CSV; None skips it) with how many rows and how much value (value_col,
+    e.g. CIF) each of them carries. Inside an active ReviewBatch the
+    counts wait for its flush().
+    """
+    if review_output_path is None:
+        return
+
+    flagged = df.loc[df[review_flag_col]]
+    names = flagged[standardized_col].map(normalize_key)
+    keep = (names.str.len() >= 3).to_numpy()
+    if not keep.any():
+        return
+
+    values = 0.0
+    if value_col and value_col in df.columns:
+        values = _numeric_values(flagged[value_col]).to_numpy()[keep]
+
+    counts = (
+        pd.DataFrame({"core_name": names.to_numpy()[keep], "cif_usd": values})
+        .groupby("core_name", as_index=False)
+        .agg(rows=("cif_usd", "size"), cif_usd=("cif_usd", "sum"))
     )
 
-    if not review_df.empty:
-        review_df.to_csv(review_output_path, index=False)
+    batch = current_review_batch()
+    if batch is not None:
+        batch.add(review_output_path, counts)
+    elif is_store(review_output_path):
+        add_review(counts, review_output_path)
+    else:
+        merge_review_csv(counts, review_output_path)
 
-    return df
+
+def _numeric_values(values: pd.Series) -> pd.Series:
+    """Raw amounts ("$1,234.50") as numbers; runs before numeric conversion."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float).fillna(0.0)
+
+    cleaned = values.astype(str).str.replace(r"[^0-9.\-]", "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce").fillna(0.0)
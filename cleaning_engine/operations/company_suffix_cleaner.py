@@ -10,7 +10,7 @@ LEGAL_SUFFIXES = [
 ]
 
 def remove_legal_suffixes(series: pd.Series) -> pd.Series:
-    s = series.copy()
+    s = series
 
     for suffix in LEGAL_SUFFIXES:
         pattern = r"\b" + re.escape(suffix) + r"\b"
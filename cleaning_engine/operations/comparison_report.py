@@ -1,15 +1,25 @@
 import pandas as pd
 
+from cleaning_engine.progress import check_cancelled
 
-def generate_comparison_report(
+
+REPORT_COLUMNS = ["row_number", "column_name", "raw_value", "cleaned_value", "change_type"]
+
+# the cell loop is slow enough to need its own cancellation points
+CANCEL_CHECK_ROWS = 1000
+
+
+def build_comparison_report(
     raw_df: pd.DataFrame,
     cleaned_df: pd.DataFrame,
-    output_path: str
-):
+    row_offset: int = 0
+) -> pd.DataFrame:
     """
-    Generates a detailed comparison report between raw and cleaned data.
+    Builds a detailed comparison report between raw and cleaned data.
     - Cell-level changes
     - Row removal detection
+
+    Chunked runs pass the chunk's first row as `row_offset`.
     """
 
     report_rows = []
@@ -24,6 +34,9 @@ def generate_comparison_report(
     # CELL-LEVEL COMPARISON
     # -----------------------------
     for row_idx in range(min_rows):
+        if row_idx % CANCEL_CHECK_ROWS == 0:
+            check_cancelled()
+
         for col in common_columns:
             raw_val = raw_df.iloc[row_idx][col]
             clean_val = cleaned_df.iloc[row_idx][col]
@@ -34,7 +47,7 @@ def generate_comparison_report(
 
             if raw_norm != clean_norm:
                 report_rows.append({
-                    "row_number": row_idx + 1,
+                    "row_number": row_offset + row_idx + 1,
                     "column_name": col,
                     "raw_value": raw_val,
                     "cleaned_value": clean_val,
@@ -47,16 +60,46 @@ def generate_comparison_report(
     if raw_len > clean_len:
         for row_idx in range(clean_len, raw_len):
             report_rows.append({
-                "row_number": row_idx + 1,
+                "row_number": row_offset + row_idx + 1,
                 "column_name": "__ROW__",
                 "raw_value": "ROW_PRESENT",
                 "cleaned_value": "ROW_REMOVED",
                 "change_type": "row_removed"
             })
 
-    # -----------------------------
-    # EXPORT
-    # -----------------------------
-    report_df = pd.DataFrame(report_rows)
+    return pd.DataFrame(report_rows, columns=REPORT_COLUMNS)
+
+
+class ChunkedComparison:
+    """
+    The comparison report of a chunked run, row for row what
+    build_comparison_report gives over the whole file: cleaned row i is
+    compared with raw row i. Rows dropped by cleaning move later cleaned
+    rows up against raw rows of an earlier chunk, so the raw rows not yet
+    compared (as many as cleaning has dropped so far) carry over to the
+    next chunk; finish() reports the ones left at the end as removed.
+    """
+
+    def __init__(self):
+        self.pending = None
+        self.compared = 0
+
+    def add(self, raw_df: pd.DataFrame, cleaned_df: pd.DataFrame) -> pd.DataFrame:
+        if self.pending is not None and len(self.pending):
+            raw_df = pd.concat([self.pending, raw_df], ignore_index=True)
+
+        rows = min(len(raw_df), len(cleaned_df))
+        report = build_comparison_report(
+            raw_df.iloc[:rows], cleaned_df.iloc[:rows], row_offset=self.compared
+        )
+
+        self.pending = raw_df.iloc[rows:]
+        self.compared += rows
+        return report
 
-    report_df.to_csv(output_path, index=False)
+    def finish(self) -> pd.DataFrame:
+        if self.pending is None:
+            return pd.DataFrame(columns=REPORT_COLUMNS)
+        return build_comparison_report(
+            self.pending, self.pending.iloc[:0], row_offset=self.compared
+        )
@@ -1,9 +1,216 @@
+import os
+import numpy as np
 import pandas as pd
 
-def remove_duplicates(df, summary):
+
+SEGMENT_PREFIX = "fp_"
+DEFAULT_MAX_IN_MEMORY = 5_000_000
+# more segments than this are merged into one
+MAX_SEGMENTS = 8
+
+
+# -----------------------------------
+# Row fingerprints
+# -----------------------------------
+
+def duplicate_key_columns(df: pd.DataFrame, subset=None, exclude=None) -> list:
+    """
+    Columns that define a duplicate.
+    All columns by default, or the configured business key,
+    minus anything excluded (e.g. the 'no' sequence).
+    """
+    cols = list(subset) if subset else list(df.columns)
+    cols = [c for c in cols if c in df.columns]
+
+    if exclude:
+        cols = [c for c in cols if c not in set(exclude)]
+
+    return cols
+
+
+def row_fingerprints(df: pd.DataFrame, subset=None, exclude=None) -> np.ndarray:
+    """
+    One 64-bit fingerprint per row (8 bytes/row regardless of width).
+    """
+    cols = duplicate_key_columns(df, subset, exclude)
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy(dtype=np.uint64)
+
+
+def _sorted_contains(sorted_fps: np.ndarray, fps: np.ndarray) -> np.ndarray:
+    if len(sorted_fps) == 0 or len(fps) == 0:
+        return np.zeros(len(fps), dtype=bool)
+
+    idx = np.searchsorted(sorted_fps, fps)
+    idx[idx == len(sorted_fps)] = len(sorted_fps) - 1
+    return sorted_fps[idx] == fps
+
+
+# -----------------------------------
+# Fingerprint store
+# -----------------------------------
+
+class FingerprintStore:
+    """
+    Set of row fingerprints seen so far, across chunks or files.
+
+    Fingerprints are kept as one sorted uint64 array in memory. With a
+    `directory`, the array is spilled to a sorted .npy segment once it holds
+    `max_in_memory` entries, and segments are memory-mapped for lookups, so
+    the store can outgrow RAM and be reopened by later runs. Call flush()
+    once a job is done to persist what is still in memory. Past
+    MAX_SEGMENTS the segments are merged into one, so a lookup searches a
+    bounded number of arrays however many batches came before.
+    """
+
+    def __init__(self, directory: str | None = None, max_in_memory: int = DEFAULT_MAX_IN_MEMORY):
+        self.directory = directory
+        self.max_in_memory = max_in_memory
+        self._memory = np.empty(0, dtype=np.uint64)
+        self._segments = []
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._segments = sorted(
+                os.path.join(directory, name)
+                for name in os.listdir(directory)
+                if name.startswith(SEGMENT_PREFIX) and name.endswith(".npy")
+            )
+
+    def __len__(self):
+        return len(self._memory) + sum(
+            len(np.load(path, mmap_mode="r")) for path in self._segments
+        )
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def contains(self, fps) -> np.ndarray:
+        fps = np.asarray(fps, dtype=np.uint64)
+        found = _sorted_contains(self._memory, fps)
+
+        for path in self._segments:
+            pending = ~found
+            if not pending.any():
+                break
+            found[pending] = _sorted_contains(np.load(path, mmap_mode="r"), fps[pending])
+
+        return found
+
+    def add(self, fps):
+        fps = np.asarray(fps, dtype=np.uint64)
+        self._memory = np.union1d(self._memory, fps)
+
+        if self.directory and len(self._memory) >= self.max_in_memory:
+            self._spill()
+
+    def flush(self):
+        if self.directory and len(self._memory):
+            self._spill()
+
+    def clear(self):
+        for path in self._segments:
+            os.remove(path)
+        self._segments = []
+        self._memory = np.empty(0, dtype=np.uint64)
+
+    def _write_segment(self, fps: np.ndarray) -> str:
+        # numbered after the last segment: merged ones leave gaps
+        number = 0
+        if self._segments:
+            name = os.path.basename(self._segments[-1])
+            number = int(name[len(SEGMENT_PREFIX):-len(".npy")]) + 1
+
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:05d}.npy")
+        np.save(path + ".tmp.npy", fps)
+        os.replace(path + ".tmp.npy", path)
+        return path
+
+    def _spill(self):
+        self._segments.append(self._write_segment(self._memory))
+        self._memory = np.empty(0, dtype=np.uint64)
+
+        if len(self._segments) > MAX_SEGMENTS:
+            self.compact()
+
+    def compact(self):
+        """Merge every segment into one sorted segment."""
+        if len(self._segments) < 2:
+            return
+
+        merged = np.unique(np.concatenate([np.load(path) for path in self._segments]))
+        old = self._segments
+        self._segments = [self._write_segment(merged)]
+        for path in old:
+            os.remove(path)
+
+
+# -----------------------------------
+# Collision check
+# -----------------------------------
+
+def _rows_equal(df: pd.DataFrame, cols: list, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Exact value comparison of row pairs (NaN == NaN, pd.NA == pd.NA)."""
+    a = df[cols].iloc[left].reset_index(drop=True)
+    b = df[cols].iloc[right].reset_index(drop=True)
+
+    same = (a == b) | (a.isna() & b.isna())
+    return same.all(axis=1).to_numpy()
+
+
+# -----------------------------------
+# Main duplicate remover
+# -----------------------------------
+
+def remove_duplicates(df, summary, subset=None, exclude=None, store=None, verify=True):
+    """
+    Drop repeated rows, keeping the first occurrence.
+
+    Rows are compared by 64-bit fingerprints of the key columns. Fingerprint
+    matches inside the frame are verified against the actual values (a
+    mismatch is counted as a collision and the row is kept). With a `store`
+    (FingerprintStore or its directory), rows already seen in previous
+    chunks / files are dropped too and the kept rows are added to it; the
+    caller flushes a store it passes in once the job is done.
+    """
     before = len(df)
+    cols = duplicate_key_columns(df, subset, exclude)
+    fps = row_fingerprints(df, cols)
+
+    # -------------------------
+    # within this frame
+    # -------------------------
+    _, first_pos, inverse = np.unique(fps, return_index=True, return_inverse=True)
+    first_of_row = first_pos[inverse]
+    dup = first_of_row != np.arange(before)
+
+    collisions = 0
+    if verify and dup.any():
+        dup_pos = np.flatnonzero(dup)
+        same = _rows_equal(df, cols, dup_pos, first_of_row[dup_pos])
+        collisions = int((~same).sum())
+        dup[dup_pos[~same]] = False
+
+    summary["duplicates_removed"] = int(dup.sum())
+    summary["duplicate_collisions"] = collisions
+
+    # -------------------------
+    # against previously processed data
+    # -------------------------
+    if store is not None:
+        own = isinstance(store, str)
+        if own:
+            store = FingerprintStore(store)
+
+        seen = store.contains(fps) & ~dup
+        summary["duplicates_removed_against_store"] = int(seen.sum())
+
+        dup |= seen
+        store.add(fps[~dup])
+        if own:
+            store.flush()
 
-    df = df.drop_duplicates(keep="first")
+    if dup.any():
+        df = df[~dup]
 
-    summary["duplicates_removed"] = before - len(df)
     return df
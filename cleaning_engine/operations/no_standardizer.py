@@ -1,19 +1,20 @@
 import pandas as pd
 
-def standardize_no_column(df: pd.DataFrame, summary: dict):
+def standardize_no_column(df: pd.DataFrame, summary: dict, start: int = 1):
     """
-    Ensures 'no' column starts from 1 and is strictly ascending.
+    Ensures 'no' column starts from `start` (1 by default) and is strictly ascending.
     Runs after duplicates/empty rows removed.
+    Incremental runs pass the next free number so appended rows continue the sequence.
     """
     if "no" not in df.columns:
-        df.insert(0, "no", range(1, len(df) + 1))
+        df.insert(0, "no", range(start, start + len(df)))
         summary["no_column_created"] = True
         summary["no_column_reassigned"] = True
         return df
 
-    old_no = df["no"].copy()
+    old_no = df["no"]
 
-    df["no"] = range(1, len(df) + 1)
+    df["no"] = range(start, start + len(df))
 
     changed = (old_no.astype(str) != df["no"].astype(str)).sum()
     summary["no_column_reassigned"] = True
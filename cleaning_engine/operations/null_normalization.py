@@ -6,19 +6,20 @@ NULL_VALUES = {"", "na", "n/a", "null", "-", ".", "?"}
 def normalize_nulls(df: pd.DataFrame) -> pd.DataFrame:
     """
     Replace common null representations and whitespace-only strings with NaN.
+    Only text columns that actually contain such values are rewritten.
     """
 
-    #  Normalize known null strings (case-insensitive, trimmed)
-    df = df.apply(
-        lambda col: col.map(
-            lambda x: np.nan
-            if isinstance(x, str) and x.strip().lower() in NULL_VALUES
-            else x
-        )
-    )
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        series = df[col]
 
-    # Convert whitespace-only strings ("   ") → NaN
-    for col in df.select_dtypes(include="object").columns:
-        df[col] = df[col].replace(r"^\s+$", np.nan, regex=True)
+        #  Known null strings (case-insensitive, trimmed), checked once per
+        #  distinct value; whitespace-only strings strip down to ""
+        null_tokens = [
+            v for v in series.unique()
+            if isinstance(v, str) and v.strip().lower() in NULL_VALUES
+        ]
+
+        if null_tokens:
+            df[col] = series.mask(series.isin(null_tokens), np.nan)
 
     return df
@@ -75,7 +75,11 @@ def _align_sign(df, a, b):
 # Main Numeric Conversion Engine
 # -----------------------------------
 
-def infer_numeric_columns(df: pd.DataFrame):
+def infer_numeric_columns(df: pd.DataFrame, columns=None):
+    """
+    Convert the columns that look numeric; with `columns` exactly those
+    present (so batches of one file get the same dtypes).
+    """
 
     converted_cols = []
 
@@ -86,7 +90,13 @@ def infer_numeric_columns(df: pd.DataFrame):
         if pd.api.types.is_datetime64_any_dtype(series):
             continue
 
-        if should_convert_to_numeric(series):
+        if columns is not None:
+            if col in columns:
+                cleaned = series.apply(clean_numeric_value)
+                df[col] = pd.to_numeric(cleaned, errors="coerce").fillna(0)
+                converted_cols.append(col)
+
+        elif should_convert_to_numeric(series):
 
             cleaned = series.apply(clean_numeric_value)
             numeric = pd.to_numeric(cleaned, errors="coerce")
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 
@@ -33,29 +34,37 @@ POWERBI_COLUMNS = [
 
 def build_powerbi_dataset(df: pd.DataFrame) -> pd.DataFrame:
 
-    out = df.copy()
-
     # -------------------
     # Keep only useful cols
+    # (copy-on-write: columns are only copied when modified below)
     # -------------------
-    cols = [c for c in POWERBI_COLUMNS if c in out.columns]
-    out = out[cols]
+    cols = [c for c in POWERBI_COLUMNS if c in df.columns]
+    out = df[cols]
 
     # -------------------
     # Add time features
     # -------------------
     if "arrival_date" in out.columns:
         out["arrival_date"] = pd.to_datetime(out["arrival_date"], errors="coerce")
-        out["year"] = out["arrival_date"].dt.year
-        out["month"] = out["arrival_date"].dt.month
+        # nullable ints: 2024 rather than 2024.0 when some dates are missing
+        out["year"] = out["arrival_date"].dt.year.astype("Int64")
+        out["month"] = out["arrival_date"].dt.month.astype("Int64")
 
     # -------------------
     # Add derived metrics
     # -------------------
+    # float division: a zero divisor gives NaN, and the ratios stay float64
     if "usd_cif" in out.columns and "net_weight" in out.columns:
-        out["value_per_kg"] = out["usd_cif"] / out["net_weight"].replace(0, pd.NA)
+        out["value_per_kg"] = safe_ratio(out["usd_cif"], out["net_weight"])
 
     if "usd_cif" in out.columns and "quantity" in out.columns:
-        out["value_per_unit"] = out["usd_cif"] / out["quantity"].replace(0, pd.NA)
+        out["value_per_unit"] = safe_ratio(out["usd_cif"], out["quantity"])
 
     return out
+
+
+def safe_ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    """numerator / denominator as float64; NaN where either is missing or the divisor is 0."""
+    numerator = pd.to_numeric(numerator, errors="coerce").astype("float64")
+    denominator = pd.to_numeric(denominator, errors="coerce").astype("float64")
+    return numerator / denominator.replace(0, np.nan)
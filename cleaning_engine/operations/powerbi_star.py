@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+
+FACT_TABLE = "fact_shipments"
+
+# dimension -> {Power BI column: fact key column}; columns of one
+# dimension share its keys (one country table for all country roles)
+DIMENSIONS = {
+    "importer": {"importer_name": "importer_key"},
+    "exporter": {"exporter_name": "exporter_key"},
+    "country": {
+        "importer_country": "importer_country_key",
+        "exporter_country": "exporter_country_key",
+        "country_of_origin": "origin_country_key",
+    },
+    "product": {"product": "product_key"},
+    "unit": {
+        "gross_weight_unit": "gross_weight_unit_key",
+        "net_weight_unit": "net_weight_unit_key",
+        "quantity_unit": "quantity_unit_key",
+        "packages_unit": "packages_unit_key",
+    },
+}
+
+DATE_COLUMN = "arrival_date"
+DATE_KEY = "date_key"
+
+# calendar columns that move from the fact to dim_date
+DATE_FEATURES = ["year", "month"]
+
+
+# -----------------------------
+# Keys
+# -----------------------------
+
+class StarKeys:
+    """
+    Integer surrogate keys of every dimension, stable across the batches
+    (chunks) of one export: a value keeps the key it got first, new values
+    get the next keys. Keys start at 1; a missing value has no key.
+    """
+
+    def __init__(self):
+        self.values = {dim: pd.Index([], dtype=object) for dim in DIMENSIONS}
+        self.dates = pd.DatetimeIndex([])
+
+    def encode(self, dim: str, series: pd.Series) -> pd.Series:
+        """Keys of `series` in dimension `dim`, adding values not seen before."""
+        codes, uniques = pd.factorize(series)
+
+        known = self.values[dim]
+        positions = known.get_indexer(uniques)
+        unseen = positions == -1
+        if unseen.any():
+            positions[unseen] = len(known) + np.arange(unseen.sum())
+            self.values[dim] = known.append(pd.Index(uniques[unseen], dtype=object))
+
+        keys = pd.arrays.IntegerArray(
+            (positions.take(codes) + 1).astype("int32"), codes < 0
+        ) if len(codes) else pd.array([], dtype="Int32")
+        return pd.Series(keys, index=series.index)
+
+    def fact(self, powerbi_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fact rows of a Power BI frame (make_powerbi_ready output, before
+        the "NULL" fill of the flat file, so missing values get no key): every
+        dimension column becomes its key, the date a yyyymmdd date_key;
+        measures and other columns stay as they are.
+        """
+        fact = {}
+        mapped = set()
+
+        if DATE_COLUMN in powerbi_df.columns:
+            dates = pd.to_datetime(powerbi_df[DATE_COLUMN], errors="coerce").dt.normalize()
+            self.dates = self.dates.union(pd.DatetimeIndex(dates.dropna().unique()))
+            fact[DATE_KEY] = (
+                dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day
+            ).astype("Int32")
+            mapped.update([DATE_COLUMN, *DATE_FEATURES])
+
+        for dim, roles in DIMENSIONS.items():
+            for col, key in roles.items():
+                if col in powerbi_df.columns:
+                    fact[key] = self.encode(dim, powerbi_df[col])
+                    mapped.add(col)
+
+        for col in powerbi_df.columns:
+            if col not in mapped:
+                fact[col] = powerbi_df[col]
+
+        return pd.DataFrame(fact, index=powerbi_df.index)
+
+    def dimensions(self) -> dict:
+        """dim_<name> tables of every value keyed so far."""
+        tables = {}
+
+        for dim, roles in DIMENSIONS.items():
+            # a dimension with one role keeps that column's name
+            name = next(iter(roles)) if len(roles) == 1 else dim
+            values = self.values[dim]
+            tables[f"dim_{dim}"] = pd.DataFrame({
+                f"{dim}_key": np.arange(1, len(values) + 1, dtype="int32"),
+                name: values.to_numpy(dtype=object),
+            })
+
+        dates = self.dates.sort_values()
+        tables["dim_date"] = pd.DataFrame({
+            DATE_KEY: (dates.year * 10000 + dates.month * 100 + dates.day).astype("int32"),
+            "date": dates,
+            "year": dates.year.astype("int16"),
+            "quarter": dates.quarter.astype("int8"),
+            "month": dates.month.astype("int8"),
+            "month_name": dates.month_name(),
+            "day": dates.day.astype("int8"),
+        })
+
+        return tables
+
+
+def build_star_schema(powerbi_df: pd.DataFrame) -> dict:
+    """Fact and dimension tables of one Power BI frame: {table name: frame}."""
+    keys = StarKeys()
+    fact = keys.fact(powerbi_df)
+    return {FACT_TABLE: fact, **keys.dimensions()}
@@ -0,0 +1,69 @@
+import unicodedata
+
+import pandas as pd
+
+
+# -----------------------------
+# Letters without an NFD decomposition
+# -----------------------------
+
+SPECIAL_FOLDS = {
+    "Đ": "D", "đ": "d", "Ð": "D", "ð": "d",
+    "Ø": "O", "ø": "o", "Ł": "L", "ł": "l",
+    "Æ": "AE", "æ": "ae", "Œ": "OE", "œ": "oe",
+    "Þ": "TH", "þ": "th", "ß": "ss", "ı": "i",
+}
+
+# Latin-1 Supplement .. Latin Extended-B, Latin Extended Additional
+# (Vietnamese precomposed letters), plus the combining marks themselves
+FOLD_RANGES = [(0x00C0, 0x0250), (0x1E00, 0x1F00)]
+COMBINING_RANGE = (0x0300, 0x0370)
+
+
+def _build_fold_table() -> dict:
+    table = {}
+
+    for start, end in FOLD_RANGES:
+        for code in range(start, end):
+            ch = chr(code)
+            base = "".join(
+                c for c in unicodedata.normalize("NFD", ch)
+                if not unicodedata.combining(c)
+            )
+            if base != ch and base.isascii():
+                table[code] = base
+
+    for code in range(*COMBINING_RANGE):
+        table[code] = None
+
+    table.update(str.maketrans(SPECIAL_FOLDS))
+    return table
+
+
+# built once at import; str.translate is a single C pass per value
+FOLD_TABLE = _build_fold_table()
+
+
+# -----------------------------
+# Folding
+# -----------------------------
+
+def fold_accents(text: str) -> str:
+    """'CÔNG TY ĐỒNG TÂM' -> 'CONG TY DONG TAM'. Non-Latin scripts are kept."""
+    return text.translate(FOLD_TABLE)
+
+
+def fold_series(series: pd.Series) -> pd.Series:
+    """
+    Accent-fold a text column, once per distinct value.
+    Non-string values are left as they are.
+    """
+    codes, uniques = pd.factorize(series)
+
+    folded = [
+        fold_accents(v) if isinstance(v, str) else v
+        for v in uniques
+    ]
+
+    values = pd.Index(folded, dtype=object).take(codes, allow_fill=True)
+    return pd.Series(values, index=series.index, name=series.name)
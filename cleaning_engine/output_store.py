@@ -0,0 +1,397 @@
+"""
+Disk quotas and eviction for the app's per-session output folders.
+
+    python -m cleaning_engine.output_store --sweep
+
+Every session writes under <root>/<sid>/. The store keeps a small SQLite
+index beside them (<root>/.store.db) with the last time each artifact was
+used (written, previewed or downloaded) and which sessions are running a
+job. sweep() then, skipping sessions that are running:
+
+  - deletes artifacts not used for ttl_hours (and emptied session folders)
+  - gzips artifacts not used for compress_after_hours (path -> path.gz)
+  - deletes least recently used artifacts while the store is over its
+    total quota
+
+check_quota() refuses an upload that would take a session (or the store,
+after a sweep) over its quota. Several app processes and threads may use
+one store: the index is SQLite and running sessions are never swept.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from contextlib import closing, contextmanager
+
+from cleaning_engine.writers import gzip_copy, _disk_size
+
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_ROOT = "outputs/sessions"
+INDEX_NAME = ".store.db"
+
+SESSION_QUOTA_MB = 2048
+TOTAL_QUOTA_MB = 20480
+TTL_HOURS = 72
+COMPRESS_AFTER_HOURS = 24
+# smaller artifacts are not worth compressing
+COMPRESS_MIN_MB = 1
+# a session that has not renewed its lease for this long is not running
+# any more (its process died)
+LEASE_SECONDS = 6 * 3600
+# sweeps triggered by page loads run at most this often
+SWEEP_INTERVAL_SECONDS = 300
+# a sweep claim older than this belongs to a process that died
+SWEEP_TIMEOUT_SECONDS = 3600
+
+MB = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    session TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS leases (
+    session TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sweeps (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_sweep REAL NOT NULL,
+    running_until REAL NOT NULL
+);
+
+INSERT OR IGNORE INTO sweeps (id, last_sweep, running_until) VALUES (1, 0, 0);
+"""
+
+
+class QuotaExceeded(Exception):
+    """Raised by check_quota() when an upload would not fit."""
+
+
+class OutputStore:
+
+    def __init__(
+        self,
+        root: str = OUTPUT_ROOT,
+        session_quota_mb: float = SESSION_QUOTA_MB,
+        total_quota_mb: float = TOTAL_QUOTA_MB,
+        ttl_hours: float = TTL_HOURS,
+        compress_after_hours: float | None = COMPRESS_AFTER_HOURS
+    ):
+        self.root = root
+        self.session_quota_mb = session_quota_mb
+        self.total_quota_mb = total_quota_mb
+        self.ttl_hours = ttl_hours
+        self.compress_after_hours = compress_after_hours
+        os.makedirs(root, exist_ok=True)
+
+    # -----------------------------
+    # index
+    # -----------------------------
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(os.path.join(self.root, INDEX_NAME), timeout=30)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _key(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+
+    # -----------------------------
+    # sessions
+    # -----------------------------
+    def session_dir(self, sid: str) -> str:
+        path = os.path.join(self.root, sid)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def touch(self, path: str):
+        """Record that an artifact was just written, previewed or downloaded."""
+        key = self._key(path)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO artifacts (path, session, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET last_used = excluded.last_used",
+                (key, key.split(os.sep, 1)[0], time.time())
+            )
+
+    def acquire(self, sid: str):
+        """Keep sweeps away from a session while something writes into it."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (session, expires) VALUES (?, ?)",
+                (sid, time.time() + LEASE_SECONDS)
+            )
+
+    def release(self, sid: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM leases WHERE session = ?", (sid,))
+
+    @contextmanager
+    def lease(self, sid: str):
+        self.acquire(sid)
+        try:
+            yield
+        finally:
+            self.release(sid)
+
+    def clear_session(self, sid: str):
+        """Drop a session's previous artifacts (e.g. before its next run)."""
+        self._remove(os.path.join(self.root, sid))
+        os.makedirs(os.path.join(self.root, sid), exist_ok=True)
+
+    def resolve(self, path: str) -> str | None:
+        """Where an artifact is now: as written, gzipped by a sweep, or None."""
+        if os.path.exists(path):
+            return path
+        if os.path.exists(path + ".gz"):
+            return path + ".gz"
+        return None
+
+    # -----------------------------
+    # usage and quotas
+    # -----------------------------
+    def artifacts(self) -> list:
+        """[{path, session, bytes, last_used}] of every artifact on disk."""
+        with closing(self._connect()) as conn:
+            used = dict(conn.execute("SELECT path, last_used FROM artifacts"))
+
+        found = []
+        for session in os.scandir(self.root):
+            if not session.is_dir() or session.name.startswith("."):
+                continue
+
+            for entry in os.scandir(session.path):
+                try:
+                    # parquet / arrow datasets are one artifact
+                    size = _disk_size(entry.path)
+                    modified = entry.stat().st_mtime
+                except FileNotFoundError:
+                    # removed by another session meanwhile
+                    continue
+
+                found.append({
+                    "path": entry.path,
+                    "session": session.name,
+                    "bytes": size,
+                    "last_used": max(used.get(self._key(entry.path), 0.0), modified),
+                })
+
+        return found
+
+    def usage(self) -> dict:
+        sessions = {}
+        for a in self.artifacts():
+            sessions[a["session"]] = sessions.get(a["session"], 0) + a["bytes"]
+        return {"total_bytes": sum(sessions.values()), "sessions": sessions}
+
+    def check_quota(self, sid: str, incoming_bytes: int):
+        """
+        Raise QuotaExceeded unless `incoming_bytes` more fit in the session
+        and in the store (sweeping first if the store is full).
+        """
+        usage = self.usage()
+        session_bytes = usage["sessions"].get(sid, 0) + incoming_bytes
+
+        if session_bytes > self.session_quota_mb * MB:
+            raise QuotaExceeded(
+                f"session would use {session_bytes / MB:,.0f} MB "
+                f"(quota {self.session_quota_mb:,.0f} MB)"
+            )
+
+        if usage["total_bytes"] + incoming_bytes > self.total_quota_mb * MB:
+            self.sweep(reserve_bytes=incoming_bytes)
+            total = self.usage()["total_bytes"] + incoming_bytes
+            if total > self.total_quota_mb * MB:
+                raise QuotaExceeded(
+                    f"output store would use {total / MB:,.0f} MB "
+                    f"(quota {self.total_quota_mb:,.0f} MB)"
+                )
+
+    # -----------------------------
+    # eviction
+    # -----------------------------
+    def _leased(self) -> set:
+        with closing(self._connect()) as conn:
+            return {
+                row[0] for row in
+                conn.execute("SELECT session FROM leases WHERE expires > ?", (time.time(),))
+            }
+
+    def _remove(self, path: str):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+        key = self._key(path)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM artifacts WHERE path = ? OR path LIKE ?",
+                (key, key + os.sep + "%")
+            )
+
+    def sweep(self, reserve_bytes: int = 0, now: float | None = None) -> dict | None:
+        """
+        Expire, compress and evict as described in the module docstring,
+        leaving room for `reserve_bytes` more. Returns what was done, or
+        None when another process or thread is sweeping already.
+        """
+        now = now or time.time()
+
+        # one sweep at a time across processes
+        with closing(self._connect()) as conn, conn:
+            claimed = conn.execute(
+                "UPDATE sweeps SET running_until = ? WHERE id = 1 AND running_until < ?",
+                (time.time() + SWEEP_TIMEOUT_SECONDS, time.time())
+            ).rowcount
+        if not claimed:
+            return None
+
+        try:
+            return self._sweep(reserve_bytes, now)
+        finally:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "UPDATE sweeps SET last_sweep = ?, running_until = 0 WHERE id = 1", (now,)
+                )
+
+    def _sweep(self, reserve_bytes, now) -> dict:
+        leased = self._leased()
+        report = {"expired": [], "compressed": [], "evicted": [], "freed_bytes": 0}
+
+        artifacts = [a for a in self.artifacts() if a["session"] not in leased]
+        kept = []
+
+        for a in artifacts:
+            idle_hours = (now - a["last_used"]) / 3600
+
+            if idle_hours > self.ttl_hours:
+                self._remove(a["path"])
+                report["expired"].append(a["path"])
+                report["freed_bytes"] += a["bytes"]
+                continue
+
+            if (
+                self.compress_after_hours is not None
+                and idle_hours > self.compress_after_hours
+                and os.path.isfile(a["path"])
+                and a["bytes"] >= COMPRESS_MIN_MB * MB
+                and not a["path"].endswith((".gz", ".zst", ".zip", ".parquet", ".xlsx"))
+            ):
+                try:
+                    a = self._compress(a)
+                except FileNotFoundError:
+                    # its session started over meanwhile
+                    continue
+                report["compressed"].append(a["path"])
+
+            kept.append(a)
+
+        # least recently used first, until everything (plus the reservation) fits
+        total = sum(a["bytes"] for a in self.artifacts()) + reserve_bytes
+        for a in sorted(kept, key=lambda a: a["last_used"]):
+            if total <= self.total_quota_mb * MB:
+                break
+            if not os.path.exists(a["path"]):
+                continue
+            self._remove(a["path"])
+            report["evicted"].append(a["path"])
+            report["freed_bytes"] += a["bytes"]
+            total -= a["bytes"]
+
+        for session in os.scandir(self.root):
+            if (
+                session.is_dir() and session.name not in leased
+                and not session.name.startswith(".") and not os.listdir(session.path)
+            ):
+                try:
+                    os.rmdir(session.path)
+                except OSError:
+                    # written to meanwhile
+                    pass
+
+        if report["expired"] or report["compressed"] or report["evicted"]:
+            logger.info(
+                "Output store sweep: %d expired, %d compressed, %d evicted, %.1f MB freed",
+                len(report["expired"]), len(report["compressed"]), len(report["evicted"]),
+                report["freed_bytes"] / MB
+            )
+        return report
+
+    def maybe_sweep(self) -> dict | None:
+        """sweep() unless one ran in the last SWEEP_INTERVAL_SECONDS."""
+        with closing(self._connect()) as conn:
+            last_sweep = conn.execute("SELECT last_sweep FROM sweeps WHERE id = 1").fetchone()[0]
+
+        if time.time() - last_sweep < SWEEP_INTERVAL_SECONDS:
+            return None
+        return self.sweep()
+
+    def _compress(self, artifact: dict) -> dict:
+        path = artifact["path"]
+        target = gzip_copy(path)
+        os.remove(path)
+
+        # the gzip copy inherits the original's place in the LRU order
+        key = self._key(target)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM artifacts WHERE path = ?", (self._key(path),))
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (path, session, last_used) VALUES (?, ?, ?)",
+                (key, artifact["session"], artifact["last_used"])
+            )
+        os.utime(target, (artifact["last_used"], artifact["last_used"]))
+
+        return {**artifact, "path": target, "bytes": os.path.getsize(target)}
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Output store usage and eviction")
+    parser.add_argument("--root", default=OUTPUT_ROOT)
+    parser.add_argument("--sweep", action="store_true", help="expire, compress and evict now")
+    parser.add_argument("--total-quota-mb", type=float, default=TOTAL_QUOTA_MB)
+    parser.add_argument("--ttl-hours", type=float, default=TTL_HOURS)
+    parser.add_argument("--compress-after-hours", type=float, default=COMPRESS_AFTER_HOURS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level="INFO", format="%(levelname)s %(name)s: %(message)s")
+
+    store = OutputStore(
+        args.root,
+        total_quota_mb=args.total_quota_mb,
+        ttl_hours=args.ttl_hours,
+        compress_after_hours=args.compress_after_hours
+    )
+
+    if args.sweep:
+        report = store.sweep()
+        if report is None:
+            print("another sweep is running")
+        else:
+            print(f"expired {len(report['expired'])}, compressed {len(report['compressed'])}, "
+                  f"evicted {len(report['evicted'])}, freed {report['freed_bytes'] / MB:,.1f} MB")
+
+    usage = store.usage()
+    for sid, size in sorted(usage["sessions"].items(), key=lambda kv: -kv[1]):
+        print(f"{sid:<20} {size / MB:>10,.1f} MB")
+    print(f"{'total':<20} {usage['total_bytes'] / MB:>10,.1f} MB "
+          f"(quota {store.total_quota_mb:,.0f} MB)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
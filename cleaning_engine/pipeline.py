@@ -1,3 +1,9 @@
+import logging
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
 from cleaning_engine.operations.column_name_standardizer import standardize_column_names
 from cleaning_engine.operations.duplicates import remove_duplicates
 from cleaning_engine.operations.empty_rows import remove_empty_rows
@@ -8,126 +14,318 @@ from cleaning_engine.operations.date_inference import normalize_date_column
 
 from cleaning_engine.heuristics.date_heuristic import should_convert_to_date
 
-from cleaning_engine.operations.company_standardizer import standardize_company_names
+from cleaning_engine.operations.company_standardizer import (
+    ReviewBatch, current_review_batch, standardize_company_names, queue_for_review,
+)
 from cleaning_engine.operations.company_preclean import preclean_company_name
 from cleaning_engine.operations.company_suffix_cleaner import remove_legal_suffixes
 
 from cleaning_engine.operations.no_standardizer import standardize_no_column
 from cleaning_engine.operations.product_normalizer import normalize_product_details
 
+from cleaning_engine import name_cache
+from cleaning_engine.name_cache import NAME_CACHE_PATH, CACHE_COLUMNS
+from cleaning_engine.memory import copy_on_write
+from cleaning_engine.profiling import PipelineProfiler, current_profiler, stage
+from cleaning_engine.progress import ProgressTracker
+from cleaning_engine.reference_store import REFERENCE_DB_PATH
+
+
+logger = logging.getLogger(__name__)
+
+# the reference store; a CSV path also works for either
+COMPANY_MASTER_PATH = REFERENCE_DB_PATH
+COMPANY_REVIEW_PATH = REFERENCE_DB_PATH
+
+# name columns standardized against the company master (config:
+# company_columns); rows whose required name is noise are dropped
+COMPANY_COLUMNS = ["importer_name", "exporter_name", "notify_party"]
+COMPANY_REQUIRED_COLUMNS = ["importer_name"]
+
+
+def pipeline_stages(config) -> list:
+    """Stage names run_pipeline goes through for `config`, in order."""
+    stages = [
+        name for name, key in [
+            ("standardize_columns", "standardize_columns"),
+            ("normalize_nulls", "normalize_nulls"),
+            ("trim_text", "trim_text"),
+        ]
+        if config.get(key)
+    ]
+    stages.append("product_details")
+
+    if config.get("standardize_companies"):
+        # once per name column (columns missing from the input cost nothing)
+        for _ in config.get("company_columns", COMPANY_COLUMNS):
+            stages += ["company_preclean", "legal_suffixes", "company_master"]
+    if config.get("standardize_dates"):
+        stages.append("dates")
+    if config.get("convert_numeric"):
+        stages.append("numeric")
+    if config.get("remove_empty_rows"):
+        stages.append("empty_rows")
+    if config.get("remove_duplicates"):
+        stages.append("duplicates")
+    if config.get("standardize_no", True):
+        stages.append("no_column")
+
+    return stages
 
-def run_pipeline(df, config):
+
+def run_pipeline(df, config, progress=None, cancel=None):
+    """
+    Run the configured operations in order.
+
+    Every operation is a profiling stage (wall / CPU time, rows in and out,
+    columns touched, memory delta). Inside run_cleaning_job the stages go to
+    the job's profile; called directly, the pipeline profiles itself into
+    summary["profile"] (config: profile_mode, profile_path).
+
+    progress(event) is called as stages start and end (see
+    progress.ProgressTracker) and cancel() is polled before each stage;
+    True raises progress.JobCancelled. Inside run_cleaning_job the job's
+    own callbacks apply.
+
+    Unmatched company names go to the review queue once, at the end (in
+    run_cleaning_job, at the end of the job).
+    """
     summary = {}
 
+    review = ReviewBatch() if current_review_batch() is None else None
+
+    profiler = None
+    if current_profiler() is None:
+        tracker = None
+        if progress is not None or cancel is not None:
+            tracker = ProgressTracker(
+                progress, cancel, total_rows=len(df), plan=pipeline_stages(config)
+            )
+            tracker.rows_read = len(df)
+        profiler = PipelineProfiler(config.get("profile_mode"), progress=tracker)
+
+    with copy_on_write(), profiler.activate() if profiler else nullcontext(), \
+            review.activate() if review else nullcontext():
+        df = _run_stages(df, config, summary)
+
+    if review:
+        review.flush()
+
+    if profiler:
+        if profiler.progress is not None:
+            profiler.progress.finished()
+        summary["profile"] = profiler.report()
+        if config.get("profile_path"):
+            profiler.write(config["profile_path"])
+
+    return df, summary
+
+
+def _run_stages(df, config, summary):
+
     # -------------------------
     # BASIC COLUMN CLEANING
     # -------------------------
     if config.get("standardize_columns"):
-        df = standardize_column_names(df)
+        with stage("standardize_columns", df) as s:
+            df = s.output(standardize_column_names(df))
         summary["columns_standardized"] = True
 
     if config.get("normalize_nulls"):
-        df = normalize_nulls(df)
+        with stage("normalize_nulls", df) as s:
+            df = s.output(normalize_nulls(df))
         summary["nulls_normalized"] = True
 
     if config.get("trim_text"):
-        df = trim_text(df)
+        with stage("trim_text", df) as s:
+            df = s.output(trim_text(df))
         summary["text_trimmed"] = True
-        
+
     if "product_details" in df.columns:
-        df["product_details_short"] = normalize_product_details(
-            df["product_details"])
+        with stage("product_details", df) as s:
+            df["product_details_short"] = normalize_product_details(
+                df["product_details"])
         summary["product_details_normalized"] = True
 
-
-
     # -------------------------
     # COMPANY NAME STANDARDIZATION
     # -------------------------
-    if config.get("standardize_companies") and "importer_name" in df.columns:
-
-        print(">>> COMPANY PIPELINE RUNNING")
-
-        # ---- Step 1: preclean
-        df["importer_name_preclean"] = preclean_company_name(
-            df["importer_name"]
-        )
+    company_cols = [c for c in config.get("company_columns", COMPANY_COLUMNS) if c in df.columns]
 
-        # ---- Step 2: DROP rows where importer became NA (noise / irrelevant)
-        before_rows = len(df)
-        df = df.dropna(subset=["importer_name_preclean"])
-        after_rows = len(df)
-
-        summary["company_rows_removed_preclean"] = before_rows - after_rows
+    if config.get("standardize_companies") and company_cols:
 
-        # ---- Step 3: remove legal suffixes
-        df["importer_core_name"] = remove_legal_suffixes(
-            df["importer_name_preclean"]
-        )
+        logger.info("Company standardization running: %s", company_cols)
 
-        # ---- Step 4: master-based standardization
-        df = standardize_company_names(
-            df=df,
-            column_name="importer_core_name",
-            master_path="datasets/reference/company_master.csv",
-            standardized_col="importer_name_standardized",
-            review_flag_col="importer_needs_review",
-            review_output_path="datasets/reference/importer_needs_review.csv"
-        )
+        required = set(config.get("company_required_columns", COMPANY_REQUIRED_COLUMNS))
+        summary["company_rows_removed_preclean"] = 0
 
-        # ---- Step 5: only overwrite if standardized exists
-        df["importer_name"] = df["importer_name_standardized"].fillna(
-            df["importer_core_name"]
+        # one master index and one resolution cache for all columns; the
+        # persistent name cache (company_name_cache, None: off) across runs
+        cache = name_cache.open_cache(
+            config.get("company_name_cache", NAME_CACHE_PATH),
+            config.get("company_master_path", COMPANY_MASTER_PATH)
         )
+        for col in company_cols:
+            df = _standardize_company_column(df, col, col in required, config, summary, cache)
 
+        summary["company_columns_standardized"] = company_cols
+        if cache is not None:
+            summary["company_name_cache_hit_rate"] = name_cache.hit_rate(summary)
         summary["company_standardized"] = True
 
     # -------------------------
     # DATE STANDARDIZATION (MUST BE BEFORE NUMERIC)
     # -------------------------
     if config.get("standardize_dates"):
-        print(">>> DATE STANDARDIZER (HEURISTIC) RUNNING")
+        logger.info("Date standardizer (heuristic) running")
 
         date_cols = []
+        # config date_columns: convert exactly these (e.g. the first chunk's)
+        forced = config.get("date_columns")
 
-        for col in df.columns:
-            try:
-                if should_convert_to_date(df[col]):
-                    df[col] = normalize_date_column(df[col])
-                    date_cols.append(col)
-            except Exception as e:
-                print(f"[WARN] Date conversion failed for column '{col}': {e}")
+        with stage("dates", df):
+            for col in df.columns:
+                try:
+                    if col in forced if forced is not None else should_convert_to_date(df[col]):
+                        df[col] = normalize_date_column(df[col])
+                        date_cols.append(col)
+                except Exception as e:
+                    logger.warning("Date conversion failed for column '%s': %s", col, e)
 
         summary["date_columns_converted"] = date_cols
 
         if date_cols:
-            print("Date columns standardized:", date_cols)
-            for c in date_cols:
-                print(f"SAMPLE [{c}]:", df[c].head(5).tolist())
+            logger.info("Date columns standardized: %s", date_cols)
+            if logger.isEnabledFor(logging.DEBUG):
+                for c in date_cols:
+                    logger.debug("SAMPLE [%s]: %s", c, df[c].head(5).tolist())
 
     # -------------------------
     # NUMERIC TYPE INFERENCE (AFTER DATES)
     # -------------------------
     if config.get("convert_numeric"):
-        df, converted = infer_numeric_columns(df)
+        with stage("numeric", df) as s:
+            df, converted = infer_numeric_columns(df, config.get("numeric_columns"))
+            s.output(df)
         summary["numeric_columns_converted"] = converted
 
     # -------------------------
     # ROW-LEVEL CLEANUP (LAST)
     # -------------------------
     if config.get("remove_empty_rows"):
-        df = remove_empty_rows(df, summary)
+        with stage("empty_rows", df) as s:
+            df = s.output(remove_empty_rows(df, summary))
 
     if config.get("remove_duplicates"):
-        df = remove_duplicates(df, summary)
+        # optional business key (duplicate_subset / duplicate_exclude) and
+        # duplicate_store: fingerprint store of previously processed files
+        with stage("duplicates", df) as s:
+            df = s.output(remove_duplicates(
+                df,
+                summary,
+                subset=config.get("duplicate_subset"),
+                exclude=config.get("duplicate_exclude"),
+                store=config.get("duplicate_store")
+            ))
 
     # -------------------------
     # NO COLUMN STANDARDIZATION (FINAL)
     # -------------------------
     if config.get("standardize_no", True):
-        df = standardize_no_column(df, summary)
+        with stage("no_column", df) as s:
+            df = s.output(standardize_no_column(df, summary))
 
     summary["final_rows"] = len(df)
     summary["final_columns"] = len(df.columns)
 
-    return df, summary
+    return df
+
+
+def company_column_names(col: str) -> dict:
+    """Derived columns of a company name column (importer_name -> importer_core_name, ...)."""
+    prefix = col[:-len("_name")] if col.endswith("_name") else col
+    return {
+        "preclean": f"{col}_preclean",
+        "core": f"{prefix}_core_name",
+        "standardized": f"{col}_standardized",
+        "review": f"{prefix}_needs_review",
+    }
+
+
+def _standardize_company_column(df, col, required, config, summary, cache):
+    """
+    Preclean, strip suffixes and map one name column. The chain runs once
+    per distinct raw spelling that the name cache does not know yet; the
+    results are spread back over the rows.
+    """
+    names = company_column_names(col)
+    derived = [names["preclean"], names["core"], names["standardized"], names["review"]]
+
+    # ---- Step 1: preclean the spellings the cache does not know
+    with stage("company_preclean", df):
+        codes, uniques = pd.factorize(df[col])
+        distinct = pd.DataFrame(index=pd.Index(pd.Series(uniques, dtype=object).astype(str), name="raw"))
+        distinct = distinct[~distinct.index.duplicated()]
+
+        known = cache.lookup(distinct.index) if cache is not None else None
+        new = distinct if known is None else distinct[~distinct.index.isin(known.index)]
+
+        new = new.assign(**{col: new.index.to_numpy()})
+        new[names["preclean"]] = preclean_company_name(new[col])
+
+    # ---- Step 2: remove legal suffixes
+    with stage("legal_suffixes", df):
+        new[names["core"]] = remove_legal_suffixes(new[names["preclean"]])
+
+    # ---- Step 3: master-based standardization (the review queue gets row counts below)
+    with stage("company_master", df) as s:
+        new = standardize_company_names(
+            df=new,
+            column_name=names["core"],
+            master_path=config.get("company_master_path", COMPANY_MASTER_PATH),
+            standardized_col=names["standardized"],
+            review_flag_col=names["review"],
+            review_output_path=None,
+            summary=summary
+        )
+        resolved = new[derived]
+
+        if cache is not None:
+            cache.add(resolved.set_axis(CACHE_COLUMNS, axis=1))
+            resolved = pd.concat([known.set_axis(derived, axis=1), resolved])
+
+            summary["company_name_cache_hits"] = summary.get("company_name_cache_hits", 0) + len(known)
+            summary["company_name_cache_misses"] = summary.get("company_name_cache_misses", 0) + len(new)
+
+        # ---- Step 4: spread over the rows (code -1, a missing name, takes the NA row)
+        resolved = resolved.reindex(pd.Index(uniques, dtype=object).astype(str))
+        for c in derived:
+            values = resolved[c].to_numpy(dtype=object)
+            df[c] = np.append(values, None if c != names["review"] else False).take(codes)
+        df[names["review"]] = df[names["review"]].astype(bool)
+
+        # ---- Step 5: DROP rows where a required name became NA (noise / irrelevant)
+        before_rows = len(df)
+        if required:
+            df = df.dropna(subset=[names["preclean"]])
+        removed = before_rows - len(df)
+
+        queue_for_review(
+            df, names["standardized"], names["review"],
+            config.get("company_review_path", COMPANY_REVIEW_PATH), value_col="usd_cif"
+        )
+
+        # ---- Step 6: only overwrite if standardized exists
+        # (noise in an optional column keeps its raw value)
+        df[col] = df[names["standardized"]].fillna(df[names["core"]]).fillna(df[col])
+        s.output(df)
+
+    summary["company_rows_removed_preclean"] += removed
+    summary[f"{col}_rows_removed_preclean"] = removed
+
+    named = df[names["standardized"]].notna()
+    flagged = df[names["review"]]
+    summary[f"{col}_matched_rows"] = int((named & ~flagged).sum())
+    summary[f"{col}_review_rows"] = int(flagged.sum())
+
+    return df
@@ -0,0 +1,384 @@
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+from cleaning_engine.memory import rss_bytes, MB
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = (None, "cprofile", "sample")
+TOP_FUNCTIONS = 15
+SAMPLE_INTERVAL = 0.005
+
+# profiler of the job running in this thread / context
+_active = contextvars.ContextVar("cleaning_engine_profiler", default=None)
+
+
+# -------------------------------------------------
+# Column bookkeeping
+# -------------------------------------------------
+
+def _column_refs(df) -> dict:
+    """
+    Weak reference to each column's storage plus its data address, so a
+    stage can be checked for rewritten columns without keeping the old
+    columns alive.
+    """
+    refs = {}
+    for col, series in df.items():
+        if isinstance(series.dtype, np.dtype):
+            values = series.to_numpy()
+            address = values.__array_interface__["data"][0]
+            while isinstance(values.base, np.ndarray):
+                values = values.base
+        else:
+            values = series.array
+            address = id(values)
+
+        try:
+            refs[col] = (weakref.ref(values), address)
+        except TypeError:
+            refs[col] = None
+
+    return refs
+
+
+def _columns_touched(before: dict, after_df) -> list:
+    """
+    Columns added, removed or rewritten by a stage. With copy-on-write an
+    untouched column still shares storage with the input frame.
+    """
+    if after_df is None:
+        return []
+
+    after = _column_refs(after_df)
+    touched = [c for c in before if c not in after]
+
+    for col, ref in after.items():
+        old = before.get(col)
+        if old is None or ref is None:
+            touched.append(col)
+        elif old[0]() is not ref[0]() or old[1] != ref[1]:
+            touched.append(col)
+
+    return [str(c) for c in touched]
+
+
+# -------------------------------------------------
+# Per-stage function profilers
+# -------------------------------------------------
+
+def _cprofile_top(prof: cProfile.Profile, top: int) -> list:
+    """Hot spots: functions by own time (cumulative time alongside)."""
+    stats = pstats.Stats(prof)
+    rows = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)
+
+    return [
+        {
+            "function": f"{os.path.basename(file)}:{line}({func})",
+            "calls": nc,
+            "tottime": round(tt, 4),
+            "cumtime": round(ct, 4),
+        }
+        for (file, line, func), (cc, nc, tt, ct, callers) in rows[:top]
+    ]
+
+
+class _StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval.
+    Much lower overhead than cProfile on long vectorised stages.
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.total = Counter()
+        self.leaf = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            self.samples += 1
+            seen = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                key = f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+                if leaf:
+                    self.leaf[key] += 1
+                    leaf = False
+                if key not in seen:
+                    self.total[key] += 1
+                    seen.add(key)
+                frame = frame.f_back
+
+    def top(self, n: int) -> list:
+        """Hot spots: functions by samples spent in their own code."""
+        ranked = sorted(
+            self.total, key=lambda k: (self.leaf.get(k, 0), self.total[k]), reverse=True
+        )
+        return [
+            {
+                "function": key,
+                "samples": self.total[key],
+                "self_samples": self.leaf.get(key, 0),
+                "share": round(self.total[key] / max(self.samples, 1), 3),
+            }
+            for key in ranked[:n]
+        ]
+
+
+# -------------------------------------------------
+# Stage record
+# -------------------------------------------------
+
+class StageTimer:
+    """Handed out by `stage()`; call output(df) with the stage's result."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.output_df = None
+        self.record = {}
+
+    def output(self, df):
+        self.output_df = df
+        return df
+
+
+class _NullStage(StageTimer):
+    pass
+
+
+# -------------------------------------------------
+# Profiler
+# -------------------------------------------------
+
+class PipelineProfiler:
+    """
+    Collects per-stage wall time, process CPU time, rows in / out, columns
+    touched and RSS delta. Stages of repeated calls (chunks, increments)
+    are aggregated by name in report(); every call is kept for the trace.
+
+    mode="cprofile" or "sample" also records the top functions of each
+    top-level stage (deterministic cProfile, or a stack sampler).
+
+    `progress` (a progress.ProgressTracker) is told about every stage start
+    and end; that is where progress events and cancellation happen.
+    """
+
+    def __init__(self, mode: str | None = None, top: int = TOP_FUNCTIONS, progress=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+
+        self.mode = mode
+        self.top = top
+        self.progress = progress
+        self.calls = []
+        self._depth = 0
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def activate(self):
+        """Make this the profiler `stage()` records into."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    @contextmanager
+    def stage(self, name: str, df=None):
+        if self.progress is not None:
+            # may raise JobCancelled: the stage never starts
+            self.progress.stage_started(name, self._depth)
+
+        timer = StageTimer(name)
+        before_cols = _column_refs(df) if df is not None else {}
+        rows_in = len(df) if df is not None else None
+
+        prof = sampler = None
+        if self._depth == 0 and self.mode == "cprofile":
+            prof = cProfile.Profile()
+        elif self._depth == 0 and self.mode == "sample":
+            sampler = _StackSampler(threading.get_ident())
+
+        depth = self._depth
+        self._depth += 1
+        rss_before = rss_bytes()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+
+        if prof:
+            prof.enable()
+        if sampler:
+            sampler.start()
+
+        try:
+            yield timer
+        finally:
+            if prof:
+                prof.disable()
+            if sampler:
+                sampler.stop()
+
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            self._depth -= 1
+
+            out = timer.output_df if timer.output_df is not None else df
+            record = {
+                "stage": name,
+                "depth": depth,
+                "start": round(start - self._origin, 6),
+                "wall_seconds": round(wall, 6),
+                "cpu_seconds": round(cpu, 6),
+                "rows_in": rows_in,
+                "rows_out": len(out) if out is not None else None,
+                "columns_touched": _columns_touched(before_cols, out) if df is not None else [],
+                "memory_delta_mb": round((rss_bytes() - rss_before) / MB, 2),
+            }
+            if prof:
+                record["functions"] = _cprofile_top(prof, self.top)
+            if sampler:
+                record["functions"] = sampler.top(self.top)
+
+            timer.record = record
+            self.calls.append(record)
+            if self.progress is not None:
+                self.progress.stage_finished(record)
+            logger.debug(
+                "stage %s: %.3fs wall, %s -> %s rows",
+                name, wall, record["rows_in"], record["rows_out"]
+            )
+
+    # -----------------------------
+    # results
+    # -----------------------------
+    def report(self) -> dict:
+        stages = {}
+        for call in self.calls:
+            agg = stages.get(call["stage"])
+            if agg is None:
+                agg = stages[call["stage"]] = {
+                    "stage": call["stage"],
+                    "depth": call["depth"],
+                    "calls": 0,
+                    "wall_seconds": 0.0,
+                    "cpu_seconds": 0.0,
+                    "rows_in": 0,
+                    "rows_out": 0,
+                    "columns_touched": [],
+                    "memory_delta_mb": 0.0,
+                }
+
+            agg["calls"] += 1
+            agg["wall_seconds"] = round(agg["wall_seconds"] + call["wall_seconds"], 6)
+            agg["cpu_seconds"] = round(agg["cpu_seconds"] + call["cpu_seconds"], 6)
+            agg["rows_in"] += call["rows_in"] or 0
+            agg["rows_out"] += call["rows_out"] or 0
+            agg["memory_delta_mb"] = round(agg["memory_delta_mb"] + call["memory_delta_mb"], 2)
+            agg["columns_touched"] += [
+                c for c in call["columns_touched"] if c not in agg["columns_touched"]
+            ]
+            if "functions" in call:
+                agg.setdefault("functions", call["functions"])
+
+        stages = list(stages.values())
+        for agg in stages:
+            # reading stages have no rows in; rate them by what they produced
+            rows = agg["rows_in"] or agg["rows_out"]
+            agg["rows_per_s"] = (
+                round(rows / agg["wall_seconds"])
+                if agg["wall_seconds"] else None
+            )
+
+        return {
+            "mode": self.mode,
+            "total_wall_seconds": round(
+                sum(s["wall_seconds"] for s in stages if s["depth"] == 0), 6
+            ),
+            "stages": stages,
+        }
+
+    def trace_events(self) -> list:
+        """Chrome trace (chrome://tracing, Perfetto) complete events."""
+        return [
+            {
+                "name": call["stage"],
+                "cat": "pipeline",
+                "ph": "X",
+                "ts": round(call["start"] * 1e6),
+                "dur": round(call["wall_seconds"] * 1e6),
+                "pid": os.getpid(),
+                "tid": 1,
+                "args": {
+                    "rows_in": call["rows_in"],
+                    "rows_out": call["rows_out"],
+                    "cpu_seconds": call["cpu_seconds"],
+                    "memory_delta_mb": call["memory_delta_mb"],
+                },
+            }
+            for call in self.calls
+        ]
+
+    def write(self, path: str) -> str:
+        """
+        One JSON file: the report plus `traceEvents`,
+        so it also opens directly in a trace viewer.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({**self.report(), "traceEvents": self.trace_events()}, f, indent=2)
+        return path
+
+
+# -------------------------------------------------
+# Hook for operations
+# -------------------------------------------------
+
+def current_profiler():
+    return _active.get()
+
+
+@contextmanager
+def stage(name: str, df=None):
+    """
+    Time a block as a pipeline stage of the running job
+    (a no-op outside a profiled run):
+
+        with stage("my_operation", df) as s:
+            df = s.output(my_operation(df))
+    """
+    profiler = current_profiler()
+    if profiler is None:
+        yield _NullStage(name)
+        return
+
+    with profiler.stage(name, df) as timer:
+        yield timer
@@ -0,0 +1,157 @@
+import time
+from contextlib import contextmanager
+
+from cleaning_engine.profiling import current_profiler
+
+
+class JobCancelled(Exception):
+    """Raised at the next stage (or chunk) boundary after cancel() returns True."""
+
+
+# -------------------------------------------------
+# Tracker
+# -------------------------------------------------
+
+class ProgressTracker:
+    """
+    Turns profiling stages into progress events for a callback:
+
+        {"event": "start" | "end" | "done", "stage": ..., "fraction": 0..1,
+         "rows_read": ..., "rows_total": ..., "elapsed_seconds": ...,
+         "eta_seconds": ...}
+
+    Work is measured as rows x seconds-per-row of each stage, so a stage
+    that historically dominates a run (the comparison report) also
+    dominates the fraction and the estimate. `plan` lists the stages one
+    batch of rows goes through; `weights` maps stage -> seconds per row
+    (missing stages get the mean weight).
+
+    `cancel` is polled whenever a stage starts; a True result raises
+    JobCancelled there, except inside shielded() blocks.
+    """
+
+    def __init__(self, callback=None, cancel=None, total_rows: int = 0,
+                 plan=None, weights: dict | None = None):
+        self.callback = callback
+        self.cancel = cancel
+        self.total_rows = total_rows
+        self.rows_read = 0
+        self.plan = list(plan or [])
+        self.weights = dict(weights or {})
+        self.done_work = 0.0
+        self._shielded = 0
+        self._start = time.perf_counter()
+
+    # -----------------------------
+    # work model
+    # -----------------------------
+    def _weight(self, stage: str) -> float:
+        if stage in self.weights:
+            return self.weights[stage]
+        known = [w for w in self.weights.values() if w > 0]
+        return sum(known) / len(known) if known else 1.0
+
+    def _fraction(self) -> float:
+        total = self.total_rows * sum(self._weight(s) for s in self.plan)
+        if total <= 0:
+            return 0.0
+        # stays below 1 until the job says it is done
+        return min(self.done_work / total, 0.99)
+
+    def set_total_rows(self, rows: int):
+        """Exact row count once it is known (after an in-memory read)."""
+        self.total_rows = rows
+
+    # -----------------------------
+    # stage hooks (called by the profiler)
+    # -----------------------------
+    def stage_started(self, name: str, depth: int):
+        self.check_cancelled()
+        if depth == 0:
+            self._emit("start", name)
+
+    def stage_finished(self, record: dict):
+        if record["depth"] != 0:
+            return
+
+        rows = record["rows_in"] or record["rows_out"] or 0
+        if record["stage"] == "read_input":
+            self.rows_read += record["rows_out"] or 0
+            self.total_rows = max(self.total_rows, self.rows_read)
+
+        if record["stage"] in self.plan:
+            self.done_work += rows * self._weight(record["stage"])
+
+        self._emit("end", record["stage"])
+
+    def finished(self):
+        self._emit("done", None, fraction=1.0)
+
+    # -----------------------------
+    # cancellation
+    # -----------------------------
+    def check_cancelled(self):
+        if self._shielded == 0 and self.cancel is not None and self.cancel():
+            raise JobCancelled("cancelled by request")
+
+    @contextmanager
+    def shielded(self):
+        """Cancellation waits until the block ends (e.g. appends + manifest)."""
+        self._shielded += 1
+        try:
+            yield
+        finally:
+            self._shielded -= 1
+
+    # -----------------------------
+    # events
+    # -----------------------------
+    def _emit(self, event: str, stage, fraction: float | None = None):
+        if self.callback is None:
+            return
+
+        elapsed = time.perf_counter() - self._start
+        fraction = self._fraction() if fraction is None else fraction
+        eta = elapsed * (1 - fraction) / fraction if 0 < fraction < 1 else None
+
+        self.callback({
+            "event": event,
+            "stage": stage,
+            "fraction": round(fraction, 4),
+            "rows_read": self.rows_read,
+            "rows_total": self.total_rows,
+            "elapsed_seconds": round(elapsed, 2),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        })
+
+
+# -------------------------------------------------
+# Hook for long operations
+# -------------------------------------------------
+
+def current_tracker():
+    """Progress tracker of the running job, if it has one."""
+    profiler = current_profiler()
+    return profiler.progress if profiler is not None else None
+
+
+@contextmanager
+def shielded():
+    """shielded() of the running job's tracker (a no-op without one)."""
+    tracker = current_tracker()
+    if tracker is None:
+        yield
+        return
+
+    with tracker.shielded():
+        yield
+
+
+def check_cancelled():
+    """
+    Cancellation point for long-running operations: raises JobCancelled
+    if the running job was asked to stop (a no-op without a tracker).
+    """
+    tracker = current_tracker()
+    if tracker is not None:
+        tracker.check_cancelled()
@@ -0,0 +1,430 @@
+import gzip
+import io
+import os
+import random
+import unicodedata
+import zipfile
+from datetime import date, datetime, time
+
+import pandas as pd
+
+from cleaning_engine.encoding import SAMPLE_BYTES, detect_encoding
+
+
+# formats run_cleaning_job accepts, as found by detect_format
+INPUT_FORMATS = ("csv", "csv.gz", "zip", "xlsx", "parquet")
+
+# file extensions for uploaders / directory scans
+INPUT_EXTENSIONS = ("csv", "gz", "zip", "xlsx", "xlsm", "parquet")
+
+EXCEL_CHUNK_ROWS = 50_000
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZIP_MAGIC = b"PK\x03\x04"
+PARQUET_MAGIC = b"PAR1"
+
+
+# -------------------------------------------------
+# Format detection
+# -------------------------------------------------
+
+def detect_format(path: str) -> str:
+    """
+    Input format from the leading bytes, whatever the file is called.
+    An .xlsx workbook is itself a zip archive, told apart by its workbook part.
+    """
+    with open(path, "rb") as f:
+        head = f.read(4)
+
+    if head.startswith(GZIP_MAGIC):
+        return "csv.gz"
+
+    if head == PARQUET_MAGIC:
+        return "parquet"
+
+    if head == ZIP_MAGIC:
+        with zipfile.ZipFile(path) as zf:
+            if "xl/workbook.xml" in zf.namelist():
+                return "xlsx"
+        return "zip"
+
+    return "csv"
+
+
+def zip_members(path: str) -> list:
+    """CSV members of an archive in name order (folders and OS metadata skipped)."""
+    with zipfile.ZipFile(path) as zf:
+        return sorted(
+            info.filename
+            for info in zf.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and info.filename.lower().endswith(".csv")
+        )
+
+
+def leading_bytes(path: str, n: int = SAMPLE_BYTES) -> bytes:
+    """First `n` bytes of the (decompressed) CSV text of an input."""
+    fmt = detect_format(path)
+
+    if fmt == "csv.gz":
+        with gzip.open(path, "rb") as f:
+            return f.read(n)
+
+    if fmt == "zip":
+        members = zip_members(path)
+        if not members:
+            return b""
+        with zipfile.ZipFile(path) as zf, zf.open(members[0]) as f:
+            return f.read(n)
+
+    if fmt == "csv":
+        with open(path, "rb") as f:
+            return f.read(n)
+
+    return b""
+
+
+def input_encoding(path: str) -> tuple:
+    """(encoding, confidence) of a text input, from its leading bytes."""
+    sample = leading_bytes(path)
+    return detect_encoding(sample, truncated=len(sample) == SAMPLE_BYTES)
+
+
+def describe_input(path: str) -> dict:
+    """Format, archive members and text encoding for the run summary."""
+    info = {"format": detect_format(path)}
+    if info["format"] == "zip":
+        info["members"] = zip_members(path)
+
+    if info["format"] in ("csv", "csv.gz", "zip"):
+        info["encoding"], info["encoding_confidence"] = input_encoding(path)
+
+    return info
+
+
+# -------------------------------------------------
+# Readers
+# -------------------------------------------------
+
+def read_input(path: str, chunksize: int | None = None, **kwargs):
+    """
+    Read any supported input like the raw CSV reader:
+    a DataFrame, or an iterator of DataFrames when `chunksize` is set.
+
+    Compressed and archived inputs are decompressed while they are parsed,
+    never extracted to disk. The CSVs of a multi-member zip form one dataset
+    (columns aligned by name). Excel sheets are streamed row by row.
+    `usecols` also limits the columns read from Parquet.
+
+    Text is decoded to str as it is parsed, from `encoding` or else the
+    encoding detected on the leading bytes; undecodable bytes become U+FFFD
+    instead of failing the run.
+    """
+    fmt = detect_format(path)
+
+    if fmt in ("csv", "csv.gz", "zip") and not kwargs.get("encoding"):
+        kwargs["encoding"] = input_encoding(path)[0]
+
+    result = _read_frames(path, fmt, chunksize, **kwargs)
+
+    # cp1258 spells tones as combining marks; compose them like UTF-8 text
+    if kwargs.get("encoding") == "cp1258":
+        if chunksize is not None:
+            return (compose_text(chunk) for chunk in result)
+        return compose_text(result)
+
+    return result
+
+
+def _read_frames(path, fmt, chunksize, **kwargs):
+    if fmt == "xlsx":
+        chunks = _excel_chunks(path, chunksize or EXCEL_CHUNK_ROWS, kwargs.get("sheet_name"))
+    elif fmt == "parquet":
+        chunks = _parquet_chunks(path, chunksize, kwargs.get("usecols"))
+    elif fmt == "zip":
+        chunks = _zip_chunks(path, chunksize, **kwargs)
+    else:
+        # csv / csv.gz: pandas decompresses gzip as a stream
+        kwargs["compression"] = "gzip" if fmt == "csv.gz" else None
+        if chunksize is not None:
+            return _read_csv(path, chunksize=chunksize, **kwargs)
+        return _read_csv(path, **kwargs)
+
+    if chunksize is not None:
+        return chunks
+
+    frames = list(chunks)
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _read_csv(source, **kwargs):
+    # robust parser; every column as text, so a chunk parses like the
+    # whole file whether or not it happens to have a blank or a word
+    kwargs.pop("sheet_name", None)
+    return pd.read_csv(
+        source,
+        **{
+            "dtype": str,
+            "keep_default_na": False,
+            "engine": "python",
+            "on_bad_lines": "warn",
+            "encoding_errors": "replace",
+            **kwargs,
+        }
+    )
+
+
+def _zip_chunks(path, chunksize, **kwargs):
+    members = zip_members(path)
+    if not members:
+        raise ValueError(f"No CSV files in {os.path.basename(path)}")
+
+    with zipfile.ZipFile(path) as zf:
+        for member in members:
+            with zf.open(member) as f:
+                if chunksize is None:
+                    yield _read_csv(f, **kwargs)
+                else:
+                    yield from _read_csv(f, chunksize=chunksize, **kwargs)
+
+
+def _parquet_chunks(path, chunksize, columns=None):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet input needs the 'pyarrow' package") from e
+
+    pf = pq.ParquetFile(path)
+    if chunksize is None:
+        yield pf.read(columns=columns).to_pandas()
+        return
+
+    for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+
+def compose_text(df: pd.DataFrame) -> pd.DataFrame:
+    """NFC-normalize text columns, once per distinct value."""
+    for col in df.select_dtypes(include="object").columns:
+        codes, uniques = pd.factorize(df[col])
+        composed = [
+            unicodedata.normalize("NFC", v) if isinstance(v, str) else v
+            for v in uniques
+        ]
+        if any(a is not b and a != b for a, b in zip(composed, uniques)):
+            values = pd.Index(composed, dtype=object).take(codes, allow_fill=True)
+            df[col] = pd.Series(values, index=df.index, name=col)
+    return df
+
+
+# -----------------------------
+# Excel
+# -----------------------------
+def _cell_text(value):
+    """Cells as a CSV export would show them (empty -> "", dates as ISO text)."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        if value.time() == time(0, 0):
+            return value.date().isoformat()
+        return value.isoformat(sep=" ")
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+def _excel_chunks(path, chunksize, sheet_name=None):
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportError("Excel input needs the 'openpyxl' package") from e
+
+    # read_only streams the sheet XML instead of building the whole workbook
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [
+            str(c) if c is not None else f"Unnamed: {i}"
+            for i, c in enumerate(header)
+        ]
+
+        batch = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            batch.append([_cell_text(v) for v in row[:len(columns)]])
+
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=columns).infer_objects()
+                batch = []
+
+        if batch:
+            yield pd.DataFrame(batch, columns=columns).infer_objects()
+    finally:
+        wb.close()
+
+
+# -------------------------------------------------
+# Sampling (preview)
+# -------------------------------------------------
+
+SAMPLE_STRATA = 100
+
+
+def stratified_sample(path: str, n_rows: int, seed: int = 0, strata: int = SAMPLE_STRATA) -> tuple:
+    """
+    About `n_rows` rows spread over the whole input, with bounded I/O:
+    (frame, method).
+
+    A plain CSV is cut into `strata` equal byte ranges and one block of
+    whole lines is read from a random offset in each ("stratified"), so
+    only ~1.5x the sample's bytes are read however big the file is.
+    Parquet reads evenly spaced row groups ("row_groups"). Streams without
+    random access (gzip, zip, Excel, UTF-16 text) fall back to the leading
+    rows ("head").
+    """
+    fmt = detect_format(path)
+    rng = random.Random(seed)
+
+    if fmt == "csv":
+        encoding = input_encoding(path)[0]
+        if encoding != "utf-16":
+            return _csv_block_sample(path, n_rows, encoding, strata, rng)
+
+    if fmt == "parquet":
+        return _parquet_group_sample(path, n_rows, rng), "row_groups"
+
+    return sample_input(path, n_rows), "head"
+
+
+def _csv_block_sample(path, n_rows, encoding, strata, rng):
+    size = os.path.getsize(path)
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        avg_line = _text_line_bytes(f, 200) or 1
+
+        per_stratum = -(-n_rows // strata)
+        block = int(per_stratum * avg_line * 1.5) + 2 * int(avg_line)
+        stratum_bytes = (size - data_start) / strata
+
+        # small file: the strata would overlap, read it whole
+        if stratum_bytes <= block:
+            df = read_input(path, encoding=encoding, on_bad_lines="skip")
+            if len(df) > n_rows:
+                keep = sorted(rng.sample(range(len(df)), n_rows))
+                df = df.iloc[keep].reset_index(drop=True)
+            return df, "full" if len(df) <= n_rows else "random"
+
+        lines = []
+        for i in range(strata):
+            offset = data_start + int(i * stratum_bytes + rng.uniform(0, stratum_bytes - block))
+            f.seek(offset)
+            chunk = f.read(block)
+
+            # whole lines only: drop the partial first and last line
+            if offset > data_start:
+                chunk = chunk[chunk.find(b"\n") + 1:]
+            chunk = chunk[:chunk.rfind(b"\n") + 1]
+
+            lines.extend(chunk.splitlines(keepends=True)[:per_stratum])
+
+    # a block may start inside a quoted multi-line field; such rows are skipped
+    df = _read_csv(
+        io.BytesIO(header + b"".join(lines[:n_rows])),
+        encoding=encoding,
+        on_bad_lines="skip"
+    )
+    return (compose_text(df) if encoding == "cp1258" else df), "stratified"
+
+
+def _parquet_group_sample(path, n_rows, rng):
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    groups = pf.metadata.num_row_groups
+    if groups == 0:
+        return pd.DataFrame()
+
+    rows_per_group = max(pf.metadata.num_rows / groups, 1)
+    wanted = min(groups, max(1, -(-n_rows // int(rows_per_group))))
+    picked = sorted({int(i * groups / wanted) for i in range(wanted)})
+
+    df = pf.read_row_groups(picked).to_pandas()
+    if len(df) > n_rows:
+        keep = sorted(rng.sample(range(len(df)), n_rows))
+        df = df.iloc[keep].reset_index(drop=True)
+    return df
+
+
+# -------------------------------------------------
+# Size estimate (memory budget)
+# -------------------------------------------------
+
+def sample_input(path: str, nrows: int) -> pd.DataFrame:
+    """The leading rows of any input, read without touching the rest."""
+    chunks = read_input(path, chunksize=nrows, on_bad_lines="skip")
+    sample = next(iter(chunks), None)
+    return sample if sample is not None else pd.DataFrame()
+
+
+def _text_line_bytes(f, nrows: int) -> float:
+    """Average line length of the first rows of an open binary CSV stream."""
+    f.readline()
+    lines = [f.readline() for _ in range(nrows)]
+    lines = [l for l in lines if l]
+    return sum(map(len, lines)) / max(len(lines), 1)
+
+
+def _gzip_uncompressed_size(path: str) -> int:
+    """ISIZE trailer of the last member (exact below 4 GB, wraps above)."""
+    with open(path, "rb") as f:
+        f.seek(-4, os.SEEK_END)
+        return int.from_bytes(f.read(4), "little")
+
+
+def estimate_rows(path: str, sample_rows: int = 2000) -> int:
+    """Row count of an input, exact where the format records it."""
+    fmt = detect_format(path)
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+
+    if fmt == "xlsx":
+        import openpyxl
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            return max((wb.worksheets[0].max_row or 1) - 1, 0)
+        finally:
+            wb.close()
+
+    if fmt == "zip":
+        with zipfile.ZipFile(path) as zf:
+            members = zip_members(path)
+            text_bytes = sum(zf.getinfo(m).file_size for m in members)
+            if not members:
+                return 0
+            with zf.open(members[0]) as f:
+                avg_line = _text_line_bytes(f, sample_rows)
+        return int(text_bytes / max(avg_line, 1))
+
+    if fmt == "csv.gz":
+        with gzip.open(path, "rb") as f:
+            avg_line = _text_line_bytes(f, sample_rows)
+        return int(_gzip_uncompressed_size(path) / max(avg_line, 1))
+
+    with open(path, "rb") as f:
+        avg_line = _text_line_bytes(f, sample_rows)
+    return int(os.path.getsize(path) / max(avg_line, 1))
@@ -0,0 +1,590 @@
+"""
+SQLite store for the company reference data: the master (core name ->
+standardized name), suggested additions and the review queue of names the
+master did not match.
+
+The review queue is cumulative: each run merges in its unmatched names
+with their row count and CIF value, so review_queue() can rank names by
+how many shipments resolving them would match. A run that names its
+input (a source key) replaces that input's earlier contribution, so
+cleaning the same file again does not count its names twice.
+
+    python -m cleaning_engine.reference_store status
+    python -m cleaning_engine.reference_store import datasets/reference
+    python -m cleaning_engine.reference_store export exported/
+
+Writes are row upserts in short transactions, so app sessions and pipeline
+runs can share one store. Every table has a change counter that goes up
+with each write that changed rows; a changed row gets the new counter
+value as its version. Caches (the parsed master index) compare counters
+instead of re-reading the table.
+
+A new store is seeded from the CSVs next to it (company_master.csv,
+company_master_additions.csv, importer_needs_review.csv) if they exist.
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+
+REFERENCE_DB_PATH = "datasets/reference/reference.db"
+
+HASH_BLOCK = 1 << 20
+
+TABLES = ("master", "additions", "review")
+
+# CSV files of each table, for seeding, import and export
+CSV_FILES = {
+    "master": "company_master.csv",
+    "additions": "company_master_additions.csv",
+    "review": "importer_needs_review.csv",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS master (
+    core_name TEXT PRIMARY KEY,
+    standardized_name TEXT NOT NULL,
+    source TEXT,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS master_by_version ON master(version);
+
+CREATE TABLE IF NOT EXISTS additions (
+    core_name TEXT PRIMARY KEY,
+    standardized_name TEXT NOT NULL,
+    cluster TEXT,
+    confidence REAL,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS review (
+    core_name TEXT PRIMARY KEY,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 1,
+    rows INTEGER NOT NULL DEFAULT 0,
+    cif_usd REAL NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS review_by_impact ON review(rows DESC, cif_usd DESC);
+
+-- what each input (source key) added to the review counts
+CREATE TABLE IF NOT EXISTS review_sources (
+    source TEXT NOT NULL,
+    core_name TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    cif_usd REAL NOT NULL,
+    PRIMARY KEY (source, core_name)
+);
+
+CREATE TABLE IF NOT EXISTS changes (
+    name TEXT PRIMARY KEY,
+    counter INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO changes (name, counter)
+VALUES ('master', 0), ('additions', 0), ('review', 0);
+"""
+
+
+def is_store(path) -> bool:
+    """Reference paths ending in .db are stores; anything else is a CSV."""
+    return str(path).endswith(".db")
+
+
+# -------------------------------------------------
+# Connection
+# -------------------------------------------------
+
+def connect(path: str = REFERENCE_DB_PATH) -> sqlite3.Connection:
+    new = not os.path.exists(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # pipeline runs read while app sessions write
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+
+    if new:
+        import_csvs(os.path.dirname(os.path.abspath(path)), conn=conn)
+
+    return conn
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _write(conn, table: str, sql: str, rows: list, versioned: bool = True) -> int:
+    """
+    Run one statement per row in a single transaction; with `versioned`
+    the table's next version is appended to each row's parameters. The
+    counter only moves if rows changed. Returns rows changed.
+    """
+    with conn:
+        # taking the write lock first keeps counter and rows consistent
+        conn.execute("UPDATE changes SET counter = counter + 1 WHERE name = ?", (table,))
+        version = conn.execute(
+            "SELECT counter FROM changes WHERE name = ?", (table,)
+        ).fetchone()[0]
+
+        before = conn.total_changes
+        conn.executemany(sql, [(*row, version) if versioned else row for row in rows])
+        changed = conn.total_changes - before
+
+        if changed == 0:
+            conn.execute("UPDATE changes SET counter = counter - 1 WHERE name = ?", (table,))
+
+    return changed
+
+
+def change_counter(table: str = "master", path: str = REFERENCE_DB_PATH) -> int:
+    with closing(connect(path)) as conn:
+        return conn.execute("SELECT counter FROM changes WHERE name = ?", (table,)).fetchone()[0]
+
+
+# -------------------------------------------------
+# Reading
+# -------------------------------------------------
+
+def load_table(table: str, path: str = REFERENCE_DB_PATH, since_version: int = 0) -> pd.DataFrame:
+    """A table as a frame; with since_version only the rows changed after it."""
+    if table not in TABLES:
+        raise ValueError(f"Unknown reference table: {table}")
+
+    with closing(connect(path)) as conn:
+        return pd.read_sql_query(
+            f"SELECT * FROM {table} WHERE version > ? ORDER BY core_name",
+            conn,
+            params=(since_version,)
+        )
+
+
+def load_master(path: str = REFERENCE_DB_PATH) -> pd.DataFrame:
+    return load_table("master", path)[["core_name", "standardized_name"]]
+
+
+def review_queue(path: str = REFERENCE_DB_PATH, limit: int | None = None) -> pd.DataFrame:
+    """
+    Unmatched names by impact: most rows first, then CIF value. share is
+    the name's part of all queued rows; cumulative_share is what resolving
+    it and every name above it would cover.
+    """
+    with closing(connect(path)) as conn:
+        queue = pd.read_sql_query(
+            """
+            SELECT core_name, rows, cif_usd, runs, first_seen, last_seen
+            FROM review
+            ORDER BY rows DESC, cif_usd DESC, core_name
+            """,
+            conn
+        )
+
+    return _ranked(queue).head(limit) if limit else _ranked(queue)
+
+
+def _ranked(queue: pd.DataFrame) -> pd.DataFrame:
+    queue = queue.sort_values(
+        ["rows", "cif_usd", "core_name"], ascending=[False, False, True]
+    ).reset_index(drop=True)
+
+    total = queue["rows"].sum()
+    queue["share"] = (queue["rows"] / total).round(4) if total else 0.0
+    queue["cumulative_share"] = (queue["rows"].cumsum() / total).round(4) if total else 0.0
+    return queue
+
+
+# -------------------------------------------------
+# Writing
+# -------------------------------------------------
+
+def _pairs(rows) -> list:
+    """(core_name, standardized_name) pairs from a frame, without blanks."""
+    if isinstance(rows, pd.DataFrame):
+        rows = rows[["core_name", "standardized_name"]].itertuples(index=False)
+
+    pairs = {}
+    for core, std in rows:
+        if pd.isna(core) or pd.isna(std) or not str(core).strip() or not str(std).strip():
+            continue
+        pairs[str(core).strip()] = str(std).strip()
+
+    return list(pairs.items())
+
+
+UPSERT_MASTER = """
+INSERT INTO master (core_name, standardized_name, source, updated_at, version)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(core_name) DO UPDATE SET
+    standardized_name = excluded.standardized_name,
+    source = excluded.source,
+    updated_at = excluded.updated_at,
+    version = excluded.version
+WHERE master.standardized_name IS NOT excluded.standardized_name
+"""
+
+UPSERT_ADDITIONS = """
+INSERT INTO additions (core_name, standardized_name, cluster, confidence, updated_at, version)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(core_name) DO UPDATE SET
+    standardized_name = excluded.standardized_name,
+    cluster = excluded.cluster,
+    confidence = excluded.confidence,
+    updated_at = excluded.updated_at,
+    version = excluded.version
+WHERE additions.standardized_name IS NOT excluded.standardized_name
+   OR additions.cluster IS NOT excluded.cluster
+   OR additions.confidence IS NOT excluded.confidence
+"""
+
+MERGE_REVIEW = """
+INSERT INTO review (core_name, rows, cif_usd, first_seen, last_seen, version)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(core_name) DO UPDATE SET
+    rows = review.rows + excluded.rows,
+    cif_usd = review.cif_usd + excluded.cif_usd,
+    last_seen = excluded.last_seen,
+    runs = review.runs + 1,
+    version = excluded.version
+"""
+
+# a source's change: rows and CIF are differences, runs 1 for a name the
+# source did not have before
+MERGE_REVIEW_SOURCE = """
+INSERT INTO review (core_name, rows, cif_usd, runs, first_seen, last_seen, version)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(core_name) DO UPDATE SET
+    rows = MAX(review.rows + excluded.rows, 0),
+    cif_usd = MAX(review.cif_usd + excluded.cif_usd, 0),
+    last_seen = excluded.last_seen,
+    runs = review.runs + excluded.runs,
+    version = excluded.version
+"""
+
+# a name the source no longer has
+DROP_REVIEW_SOURCE = """
+UPDATE review SET
+    rows = MAX(rows - ?, 0),
+    cif_usd = MAX(cif_usd - ?, 0),
+    runs = runs - 1,
+    version = ?
+WHERE core_name = ?
+"""
+
+
+def _names(core_names) -> list:
+    return sorted({str(n).strip() for n in core_names if not pd.isna(n) and str(n).strip()})
+
+
+def upsert_master(rows, path: str = REFERENCE_DB_PATH, source: str = "app") -> int:
+    """
+    Insert or update master rows (a frame with core_name and
+    standardized_name, or pairs). Unchanged rows keep their version.
+    """
+    now = _now()
+    with closing(connect(path)) as conn:
+        return _write(conn, "master", UPSERT_MASTER,
+                      [(core, std, source, now) for core, std in _pairs(rows)])
+
+
+def _addition_rows(rows, now: str) -> list:
+    """Suggestion rows; cluster and confidence are optional columns."""
+    if not isinstance(rows, pd.DataFrame):
+        rows = pd.DataFrame(list(rows), columns=["core_name", "standardized_name"])
+
+    extra = rows.reindex(columns=["cluster", "confidence"])
+    clusters = [c if isinstance(c, str) and c else None for c in extra["cluster"]]
+    confidence = [
+        None if pd.isna(c) else float(c)
+        for c in pd.to_numeric(extra["confidence"], errors="coerce")
+    ]
+    meta = dict(zip(rows["core_name"].astype(str).str.strip(), zip(clusters, confidence)))
+
+    return [(core, std, *meta.get(core, (None, None)), now) for core, std in _pairs(rows)]
+
+
+def upsert_additions(rows, path: str = REFERENCE_DB_PATH) -> int:
+    """
+    Insert or update suggested additions: a frame with core_name and
+    standardized_name and optionally the cluster (its representative
+    name) and confidence of each suggestion.
+    """
+    now = _now()
+    with closing(connect(path)) as conn:
+        return _write(conn, "additions", UPSERT_ADDITIONS, _addition_rows(rows, now))
+
+
+def _review_rows(counts: pd.DataFrame, now: str) -> list:
+    counts = counts.reindex(columns=["core_name", "rows", "cif_usd"])
+    counts["core_name"] = counts["core_name"].astype(str).str.strip()
+    counts = counts[counts["core_name"] != ""]
+
+    rows = pd.to_numeric(counts["rows"], errors="coerce").fillna(0).astype(int)
+    cif = pd.to_numeric(counts["cif_usd"], errors="coerce").fillna(0.0)
+
+    return [
+        (name, int(n), float(value), now, now)
+        for name, n, value in zip(counts["core_name"], rows, cif)
+    ]
+
+
+def add_review(counts: pd.DataFrame, path: str = REFERENCE_DB_PATH,
+               source: str | None = None, replace: bool = True) -> int:
+    """
+    Merge the unmatched names of one run (core_name, rows, cif_usd) into
+    the queue: rows and CIF add up, first_seen stays and last_seen moves.
+
+    With a `source` key (see source_key) the counts are that input's
+    contribution: they replace what the source added before, so a rerun
+    of the same input leaves the totals as they were; runs counts the
+    sources that had a name. replace=False adds to the source's earlier
+    contribution instead (an incremental run over the new rows only).
+    """
+    now = _now()
+    rows = _review_rows(counts, now)
+    with closing(connect(path)) as conn:
+        if source is None:
+            return _write(conn, "review", MERGE_REVIEW, rows)
+        return _merge_source(conn, source, rows, replace, now)
+
+
+def _merge_source(conn, source: str, rows: list, replace: bool, now: str) -> int:
+    with conn:
+        # the write lock first, as in _write: the earlier contribution
+        # cannot change between reading and replacing it
+        conn.execute("UPDATE changes SET counter = counter + 1 WHERE name = 'review'")
+        version = conn.execute(
+            "SELECT counter FROM changes WHERE name = 'review'"
+        ).fetchone()[0]
+
+        old = {
+            name: (n, value) for name, n, value in conn.execute(
+                "SELECT core_name, rows, cif_usd FROM review_sources WHERE source = ?", (source,)
+            )
+        }
+        new = {} if replace else dict(old)
+        for name, n, value, _, _ in rows:
+            was = new.get(name, (0, 0.0))
+            new[name] = (was[0] + n, was[1] + value)
+
+        merged = []
+        for name, (n, value) in new.items():
+            was = old.get(name)
+            if was is None:
+                merged.append((name, n, value, 1, now, now, version))
+            else:
+                merged.append((name, n - was[0], value - was[1], 0, now, now, version))
+        dropped = [(n, value, version, name) for name, (n, value) in old.items() if name not in new]
+
+        before = conn.total_changes
+        conn.executemany(MERGE_REVIEW_SOURCE, merged)
+        conn.executemany(DROP_REVIEW_SOURCE, dropped)
+        # names no source has any more (and no imported counts kept)
+        conn.executemany(
+            "DELETE FROM review WHERE core_name = ? AND runs <= 0",
+            [(name,) for *_, name in dropped]
+        )
+        changed = conn.total_changes - before
+
+        conn.execute("DELETE FROM review_sources WHERE source = ?", (source,))
+        conn.executemany(
+            "INSERT INTO review_sources (source, core_name, rows, cif_usd) VALUES (?, ?, ?, ?)",
+            [(source, name, n, value) for name, (n, value) in new.items()]
+        )
+
+        if changed == 0:
+            conn.execute("UPDATE changes SET counter = counter - 1 WHERE name = 'review'")
+
+    return changed
+
+
+def source_key(input_path: str | None = None, source: str | None = None) -> str:
+    """
+    Review source key of a run: the caller's `source` id, else the
+    resolved input path, so a file cleaned again (grown or not) replaces
+    its earlier contribution. Inputs without a lasting path (uploads
+    copied to a temporary folder) pass content_key() as their id.
+    """
+    if source:
+        return source
+    if input_path is None:
+        raise ValueError("a review source needs an input path or a source id")
+    return "path:" + os.path.realpath(input_path)
+
+
+def content_key(input_path: str | None = None, hasher=None) -> str:
+    """
+    Source id of an input by its content (blake2b of the whole file); pass
+    `hasher` instead when the bytes were already hashed while copying.
+    """
+    if hasher is None:
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(input_path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                hasher.update(block)
+    return "content:" + hasher.hexdigest()
+
+
+def merge_review_csv(counts: pd.DataFrame, csv_path: str) -> pd.DataFrame:
+    """add_review() for a review CSV instead of a store (rewritten ranked)."""
+    now = _now()
+    batch = pd.DataFrame(
+        _review_rows(counts, now),
+        columns=["core_name", "rows", "cif_usd", "first_seen", "last_seen"]
+    ).assign(runs=1)
+
+    if os.path.exists(csv_path):
+        previous = _review_csv(csv_path, now)
+        batch = (
+            pd.concat([previous, batch])
+            .groupby("core_name", as_index=False)
+            .agg(rows=("rows", "sum"), cif_usd=("cif_usd", "sum"), runs=("runs", "sum"),
+                 first_seen=("first_seen", "min"), last_seen=("last_seen", "max"))
+        )
+
+    queue = _ranked(batch).rename(columns={"core_name": "unmapped_core_name"})
+    queue.to_csv(csv_path + ".tmp", index=False)
+    os.replace(csv_path + ".tmp", csv_path)
+    return queue
+
+
+def _review_csv(csv_path: str, now: str) -> pd.DataFrame:
+    """A review CSV as queue rows; lists without counts get zero counts."""
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    df = df.rename(columns={"unmapped_core_name": "core_name"})
+
+    queue = pd.DataFrame({"core_name": df["core_name"].str.strip()})
+    queue["rows"] = pd.to_numeric(df.get("rows", 0), errors="coerce")
+    queue["cif_usd"] = pd.to_numeric(df.get("cif_usd", 0.0), errors="coerce")
+    queue["runs"] = pd.to_numeric(df.get("runs", 1), errors="coerce")
+    queue["first_seen"] = df.get("first_seen", now)
+    queue["last_seen"] = df.get("last_seen", now)
+
+    queue = queue.fillna({"rows": 0, "cif_usd": 0.0, "runs": 1})
+    queue = queue[queue["core_name"] != ""].drop_duplicates("core_name")
+    return queue.astype({"rows": int, "runs": int})
+
+
+def remove(table: str, core_names, path: str = REFERENCE_DB_PATH) -> int:
+    """Delete rows by core name (e.g. reviewed names once in the master)."""
+    if table not in TABLES:
+        raise ValueError(f"Unknown reference table: {table}")
+
+    names = [(name,) for name in _names(core_names)]
+    with closing(connect(path)) as conn:
+        changed = _write(conn, table, f"DELETE FROM {table} WHERE core_name = ?",
+                         names, versioned=False)
+        if table == "review":
+            # a name queued again later starts from zero
+            with conn:
+                conn.executemany("DELETE FROM review_sources WHERE core_name = ?", names)
+        return changed
+
+
+# -------------------------------------------------
+# CSV import / export
+# -------------------------------------------------
+
+def import_csvs(csv_dir: str, path: str = REFERENCE_DB_PATH, conn=None) -> dict:
+    """Upsert the reference CSVs found in csv_dir. Returns rows changed per table."""
+    own = conn is None
+    conn = conn or connect(path)
+    now = _now()
+    changed = {}
+
+    try:
+        for table, name in CSV_FILES.items():
+            csv_path = os.path.join(csv_dir, name)
+            if not os.path.exists(csv_path):
+                continue
+
+            df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+
+            if table == "master":
+                changed[table] = _write(conn, table, UPSERT_MASTER,
+                                        [(core, std, "csv", now) for core, std in _pairs(df)])
+            elif table == "additions":
+                changed[table] = _write(conn, table, UPSERT_ADDITIONS, _addition_rows(df, now))
+            else:
+                # importing is not a sighting: queued names keep their counts
+                queue = _review_csv(csv_path, now)
+                changed[table] = _write(
+                    conn, table,
+                    "INSERT OR IGNORE INTO review "
+                    "(core_name, rows, cif_usd, runs, first_seen, last_seen, version) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    list(queue[["core_name", "rows", "cif_usd", "runs", "first_seen", "last_seen"]]
+                         .itertuples(index=False, name=None))
+                )
+    finally:
+        if own:
+            conn.close()
+
+    return changed
+
+
+def export_csvs(out_dir: str, path: str = REFERENCE_DB_PATH) -> dict:
+    """Write every table as the CSV it was imported from. Returns the paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+
+    for table, name in CSV_FILES.items():
+        if table == "review":
+            df = review_queue(path).rename(columns={"core_name": "unmapped_core_name"})
+        elif table == "additions":
+            df = load_table(table, path)[["core_name", "standardized_name", "cluster", "confidence"]]
+        else:
+            df = load_table(table, path)[["core_name", "standardized_name"]]
+
+        paths[table] = os.path.join(out_dir, name)
+        df.to_csv(paths[table], index=False)
+
+    return paths
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Company reference store")
+    parser.add_argument("--db", default=REFERENCE_DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="rows and change counter per table")
+    imp = sub.add_parser("import", help="upsert the reference CSVs of a directory")
+    imp.add_argument("csv_dir")
+    exp = sub.add_parser("export", help="write the tables as CSVs")
+    exp.add_argument("out_dir")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        for table, rows in import_csvs(args.csv_dir, args.db).items():
+            print(f"{table}: {rows} rows changed")
+    elif args.command == "export":
+        for table, csv_path in export_csvs(args.out_dir, args.db).items():
+            print(f"{table}: {csv_path}")
+
+    with closing(connect(args.db)) as conn:
+        for table in TABLES:
+            rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            counter = conn.execute(
+                "SELECT counter FROM changes WHERE name = ?", (table,)
+            ).fetchone()[0]
+            print(f"{table:<10} {rows:>8} rows   change {counter}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+from cleaning_engine import reference_store
+from cleaning_engine.reference_store import is_store
+
+
+RUN_HISTORY_PATH = "datasets/run_history.db"
+
+# a stage regresses when its rows/s falls this far below its baseline
+REGRESSION_THRESHOLD = 0.25
+BASELINE_RUNS = 10
+# recent runs the per-stage cost estimate (progress / ETA) is taken from
+WEIGHT_RUNS = 20
+# a stage needs this much history before it can be flagged
+MIN_BASELINE_RUNS = 3
+# too few rows and rows/s is dominated by fixed per-call overhead
+MIN_STAGE_ROWS = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    input_path TEXT,
+    input_format TEXT,
+    input_bytes INTEGER,
+    source_rows INTEGER,
+    final_rows INTEGER,
+    strategy TEXT,
+    chunks INTEGER,
+    incremental_mode TEXT,
+    wall_seconds REAL,
+    peak_rss_mb REAL,
+    master_version TEXT,
+    master_rows INTEGER,
+    config TEXT
+);
+
+CREATE TABLE IF NOT EXISTS stages (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    calls INTEGER,
+    wall_seconds REAL,
+    cpu_seconds REAL,
+    rows_in INTEGER,
+    rows_out INTEGER,
+    rows_per_s REAL,
+    memory_delta_mb REAL,
+    PRIMARY KEY (run_id, stage)
+);
+
+CREATE INDEX IF NOT EXISTS stages_by_name ON stages(stage, run_id);
+"""
+
+
+# -------------------------------------------------
+# Connection
+# -------------------------------------------------
+
+def connect(path: str = RUN_HISTORY_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # several jobs (app sessions, batch workers) may append at once
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# -------------------------------------------------
+# Master version
+# -------------------------------------------------
+
+def master_version(master_path: str | None) -> tuple:
+    """
+    Short content hash and row count of the company master, so throughput
+    changes can be lined up with master growth. (None, None) if missing.
+    A reference store reports its master change counter as the version.
+    """
+    if not master_path or not os.path.exists(master_path):
+        return None, None
+
+    if is_store(master_path):
+        with closing(reference_store.connect(master_path)) as conn:
+            rows = conn.execute("SELECT COUNT(*) FROM master").fetchone()[0]
+        return f"v{reference_store.change_counter('master', master_path)}", rows
+
+    digest = hashlib.sha256()
+    lines = 0
+    with open(master_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+            lines += block.count(b"\n")
+
+    # minus the header
+    return digest.hexdigest()[:12], max(lines - 1, 0)
+
+
+# -------------------------------------------------
+# Recording
+# -------------------------------------------------
+
+def record_run(
+    summary: dict,
+    input_path: str,
+    config: dict,
+    wall_seconds: float,
+    master_path: str | None = None,
+    path: str = RUN_HISTORY_PATH
+) -> int:
+    """Append one job (and its aggregated profile stages) to the history."""
+    version, master_rows = master_version(master_path)
+    memory = summary.get("memory", {})
+    stages = summary.get("profile", {}).get("stages", [])
+
+    source_rows = sum(s["rows_out"] for s in stages if s["stage"] == "read_input") or None
+
+    with closing(connect(path)) as conn, conn:
+        cur = conn.execute(
+            """
+            INSERT INTO runs (
+                started_at, input_path, input_format, input_bytes, source_rows,
+                final_rows, strategy, chunks, incremental_mode, wall_seconds,
+                peak_rss_mb, master_version, master_rows, config
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                datetime.now().isoformat(timespec="seconds"),
+                os.path.abspath(input_path),
+                summary.get("input", {}).get("format"),
+                os.path.getsize(input_path) if os.path.exists(input_path) else None,
+                source_rows,
+                summary.get("final_rows"),
+                memory.get("strategy"),
+                summary.get("chunks"),
+                summary.get("incremental", {}).get("mode"),
+                round(wall_seconds, 3),
+                memory.get("peak_rss_mb"),
+                version,
+                master_rows,
+                json.dumps(config, sort_keys=True, default=str),
+            )
+        )
+        run_id = cur.lastrowid
+
+        conn.executemany(
+            """
+            INSERT INTO stages (
+                run_id, stage, calls, wall_seconds, cpu_seconds,
+                rows_in, rows_out, rows_per_s, memory_delta_mb
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    run_id, s["stage"], s["calls"], s["wall_seconds"], s["cpu_seconds"],
+                    s["rows_in"], s["rows_out"], s["rows_per_s"], s["memory_delta_mb"],
+                )
+                for s in stages
+            ]
+        )
+
+    return run_id
+
+
+# -------------------------------------------------
+# Queries
+# -------------------------------------------------
+
+def load_runs(path: str = RUN_HISTORY_PATH, limit: int | None = None) -> pd.DataFrame:
+    """Most recent runs last."""
+    with closing(connect(path)) as conn:
+        runs = pd.read_sql_query(
+            "SELECT * FROM runs ORDER BY run_id DESC" + (f" LIMIT {int(limit)}" if limit else ""),
+            conn
+        )
+    return runs.iloc[::-1].reset_index(drop=True)
+
+
+def load_stages(path: str = RUN_HISTORY_PATH) -> pd.DataFrame:
+    with closing(connect(path)) as conn:
+        return pd.read_sql_query(
+            "SELECT * FROM stages ORDER BY run_id, stage", conn
+        )
+
+
+def detect_regressions(
+    path: str = RUN_HISTORY_PATH,
+    threshold: float = REGRESSION_THRESHOLD,
+    baseline_runs: int = BASELINE_RUNS,
+    min_rows: int = MIN_STAGE_ROWS
+) -> pd.DataFrame:
+    """
+    Stages whose rows/s dropped more than `threshold` below the median of
+    the same stage over the previous `baseline_runs` runs (at least
+    MIN_BASELINE_RUNS of them).
+    """
+    stages = load_stages(path)
+    rows = stages["rows_in"].where(stages["rows_in"] > 0, stages["rows_out"])
+    stages = stages[(rows >= min_rows) & stages["rows_per_s"].notna()]
+    stages = stages.sort_values(["stage", "run_id"])
+
+    # median of the preceding runs only, never including the run itself
+    stages["baseline_rows_per_s"] = stages.groupby("stage")["rows_per_s"].transform(
+        lambda s: s.shift(1).rolling(
+            baseline_runs, min_periods=min(MIN_BASELINE_RUNS, baseline_runs)
+        ).median()
+    )
+    stages["change"] = stages["rows_per_s"] / stages["baseline_rows_per_s"] - 1
+
+    flagged = stages[stages["change"] < -threshold]
+
+    return flagged[[
+        "run_id", "stage", "rows_in", "rows_per_s", "baseline_rows_per_s", "change"
+    ]].sort_values(["run_id", "stage"]).reset_index(drop=True)
+
+
+def stage_weights(path: str = RUN_HISTORY_PATH, runs: int = WEIGHT_RUNS,
+                  min_rows: int = MIN_STAGE_ROWS) -> dict:
+    """Median seconds per row of each stage over the last `runs` runs."""
+    if not os.path.exists(path):
+        return {}
+
+    with closing(connect(path)) as conn:
+        stages = pd.read_sql_query(
+            """
+            SELECT stage, wall_seconds,
+                   CASE WHEN rows_in > 0 THEN rows_in ELSE rows_out END AS rows
+            FROM stages
+            WHERE run_id IN (SELECT run_id FROM runs ORDER BY run_id DESC LIMIT ?)
+            """,
+            conn,
+            params=(runs,)
+        )
+
+    stages = stages[stages["rows"] >= min_rows]
+    per_row = stages["wall_seconds"] / stages["rows"]
+    return per_row.groupby(stages["stage"]).median().to_dict()
@@ -1,9 +1,30 @@
+import logging
 import os
+import shutil
+import sqlite3
+import time
 import pandas as pd
 
-from cleaning_engine.pipeline import run_pipeline
-from cleaning_engine.operations.comparison_report import generate_comparison_report
+from cleaning_engine.pipeline import run_pipeline, pipeline_stages, COMPANY_MASTER_PATH
+from cleaning_engine.operations.comparison_report import build_comparison_report, ChunkedComparison
+from cleaning_engine.operations.company_standardizer import ReviewBatch
 from cleaning_engine.operations.column_name_standardizer import standardize_column_names
+from cleaning_engine.operations.duplicates import FingerprintStore
+from cleaning_engine.operations.no_standardizer import standardize_no_column
+from cleaning_engine.operations.powerbi_formatter import safe_ratio
+from cleaning_engine.operations.powerbi_star import StarKeys, FACT_TABLE
+from cleaning_engine.memory import PeakMemoryMonitor, copy_on_write, estimate_run_mb, chunk_rows_for_budget
+from cleaning_engine.writers import OutputWriters, NUMERIC_KINDS, artifact_path, read_output
+from cleaning_engine.readers import read_input, describe_input, estimate_rows, stratified_sample
+from cleaning_engine.profiling import PipelineProfiler, stage
+from cleaning_engine.progress import ProgressTracker, JobCancelled, current_tracker, shielded
+from cleaning_engine.run_history import RUN_HISTORY_PATH, record_run, stage_weights
+from cleaning_engine import incremental as inc
+from cleaning_engine import name_cache
+from cleaning_engine.reference_store import source_key
+
+
+logger = logging.getLogger(__name__)
 
 
 DEFAULT_CONFIG = {
@@ -18,6 +39,27 @@ DEFAULT_CONFIG = {
     "standardize_no": True
 }
 
+OUTPUT_FILES = {
+    "cleaned_file": "cleaned_file.csv",
+    "powerbi_file": "cleaned_for_powerbi.csv",
+    "comparison_report": "comparison_report.csv",
+    # folder of fact and dimension tables (see operations/powerbi_star)
+    "powerbi_star": "powerbi_star",
+}
+
+# built when no outputs are requested explicitly; the star schema is opt-in
+DEFAULT_OUTPUTS = ["cleaned_file", "powerbi_file", "comparison_report"]
+
+# outputs that follow output_format; the comparison report stays CSV
+COLUMNAR_OUTPUTS = {"cleaned_file", "powerbi_file"}
+
+# profiling stage that builds each output (cleaned_file is the pipeline result)
+OUTPUT_STAGES = {
+    "powerbi_file": "powerbi_output",
+    "comparison_report": "comparison_report",
+    "powerbi_star": "powerbi_star",
+}
+
 
 # -------------------------------------------------
 # ✅ Power BI formatter layer (UPDATED)
@@ -56,7 +98,7 @@ def make_powerbi_ready(df: pd.DataFrame) -> pd.DataFrame:
     ]
 
     existing = [c for c in keep_cols if c in df.columns]
-    pb_df = df[existing].copy()
+    pb_df = df[existing]
 
     # -------------------------
     # Business friendly rename
@@ -72,85 +114,894 @@ def make_powerbi_ready(df: pd.DataFrame) -> pd.DataFrame:
     # -------------------------
     if "arrival_date" in pb_df.columns:
         pb_df["arrival_date"] = pd.to_datetime(pb_df["arrival_date"], errors="coerce")
-        pb_df["year"] = pb_df["arrival_date"].dt.year
-        pb_df["month"] = pb_df["arrival_date"].dt.month
+        # nullable ints: 2024 rather than 2024.0 when some dates are missing
+        pb_df["year"] = pb_df["arrival_date"].dt.year.astype("Int64")
+        pb_df["month"] = pb_df["arrival_date"].dt.month.astype("Int64")
 
     # -------------------------
     # Derived metrics
     # -------------------------
+    # float division: a zero divisor gives NaN, and the ratios stay float64
     if "cif_usd" in pb_df.columns and "net_weight" in pb_df.columns:
-        pb_df["value_per_kg"] = pb_df["cif_usd"] / pb_df["net_weight"].replace(0, pd.NA)
+        pb_df["value_per_kg"] = safe_ratio(pb_df["cif_usd"], pb_df["net_weight"])
 
     if "cif_usd" in pb_df.columns and "quantity" in pb_df.columns:
-        pb_df["value_per_unit"] = pb_df["cif_usd"] / pb_df["quantity"].replace(0, pd.NA)
+        pb_df["value_per_unit"] = safe_ratio(pb_df["cif_usd"], pb_df["quantity"])
 
     return pb_df
 
 
+def build_powerbi_output(cleaned_df: pd.DataFrame) -> pd.DataFrame:
+    powerbi_df = make_powerbi_ready(cleaned_df)
+
+    # Fill nulls safely for BI tools (text columns only: numbers keep NaN)
+    string_cols = [
+        col for col in powerbi_df.select_dtypes(include=["object", "string"]).columns
+        if pd.api.types.infer_dtype(powerbi_df[col], skipna=True) not in NUMERIC_KINDS
+    ]
+    powerbi_df[string_cols] = powerbi_df[string_cols].fillna("NULL")
+
+    return powerbi_df
+
+
+# -------------------------------------------------
+# OUTPUT ARTIFACTS
+# -------------------------------------------------
+def output_path(output_dir: str, name: str, compression: str | None = None,
+                output_format: str = "csv") -> str:
+    if name == "powerbi_star":
+        # a folder; its tables follow the format and compression
+        return os.path.join(output_dir, OUTPUT_FILES[name])
+    if name not in COLUMNAR_OUTPUTS:
+        output_format = "csv"
+    return artifact_path(os.path.join(output_dir, OUTPUT_FILES[name]), output_format, compression)
+
+
+def build_output(
+    name: str,
+    output_dir: str,
+    cleaned_df: pd.DataFrame | None = None,
+    input_csv_path: str | None = None,
+    compression: str | None = None,
+    output_format: str = "csv",
+    partition_cols=None
+) -> str:
+    """
+    Produce one artifact from a retained cleaned result without rerunning
+    the pipeline, e.g. a Power BI file that was not requested at run time.
+
+    cleaned_df defaults to the cleaned file already in `output_dir`;
+    the comparison report also needs the raw input.
+    """
+    if cleaned_df is None:
+        cleaned_df = read_output(
+            output_path(output_dir, "cleaned_file", compression, output_format),
+            output_format
+        )
+
+    raw_df = None
+    if name == "comparison_report":
+        if input_csv_path is None:
+            raise ValueError("comparison_report needs input_csv_path")
+        raw_df = _read_raw(input_csv_path)
+
+    path = output_path(output_dir, name, compression, output_format)
+
+    with copy_on_write(), \
+            OutputWriters(compression, output_format=output_format, partition_cols=partition_cols) as writers:
+        if name == "powerbi_star":
+            star = StarExport(writers, path)
+            star.add(cleaned_df)
+            star.finish()
+        else:
+            _submit(writers, name, _build_artifact(name, cleaned_df, raw_df), path)
+
+    return path
+
+
+def _submit(writers, name, frame, path, append=False):
+    writers.submit(name, frame, path, append=append, columnar=name in COLUMNAR_OUTPUTS)
+
+
+def _build_artifact(name, cleaned_df, raw_df=None, row_offset=0, comparison=None) -> pd.DataFrame:
+    """
+    The frame that gets serialized for output `name`. A chunked run
+    builds its comparison report through a ChunkedComparison.
+    """
+    if name == "cleaned_file":
+        return cleaned_df
+
+    if name == "powerbi_file":
+        with stage("powerbi_output", cleaned_df) as s:
+            return s.output(build_powerbi_output(cleaned_df))
+
+    if name == "comparison_report":
+        with stage("comparison_report", cleaned_df) as s:
+            raw_df = standardize_column_names(raw_df.copy(deep=False))
+            if comparison is not None:
+                return s.output(comparison.add(raw_df, cleaned_df))
+            return s.output(build_comparison_report(
+                raw_df=raw_df,
+                cleaned_df=cleaned_df,
+                row_offset=row_offset
+            ))
+
+    raise ValueError(f"Unknown output: {name}")
+
+
+class StarExport:
+    """
+    The powerbi_star output: fact rows are written batch by batch (chunks
+    append) with keys that stay stable across batches; the dimension
+    tables follow once every batch is in. Everything is written into
+    `<path>.partial` and swapped in as one set by finish(), so a reader
+    never sees a fact table whose keys the dimensions do not match.
+    """
+
+    def __init__(self, writers: OutputWriters, path: str):
+        self.writers = writers
+        self.path = path
+        self.partial = path + ".partial"
+        self.keys = StarKeys()
+        self.batches = 0
+
+        shutil.rmtree(self.partial, ignore_errors=True)
+        os.makedirs(self.partial)
+
+    def _table_path(self, table: str) -> str:
+        return artifact_path(
+            os.path.join(self.partial, f"{table}.csv"),
+            self.writers.output_format, self.writers.compression
+        )
+
+    def add(self, cleaned_df: pd.DataFrame):
+        """Key one batch of cleaned rows."""
+        with stage("powerbi_star", cleaned_df) as s:
+            # before the "NULL" fill of the flat file: a missing value has no key
+            fact = s.output(self.keys.fact(make_powerbi_ready(cleaned_df)))
+
+        self.writers.submit(
+            "powerbi_star", fact, self._table_path(FACT_TABLE),
+            append=self.batches > 0, columnar=True
+        )
+        self.batches += 1
+
+    def finish(self):
+        """Write the dimensions, wait for every table and swap the set in."""
+        if self.batches == 0:
+            self.writers.submit("powerbi_star", pd.DataFrame(), self._table_path(FACT_TABLE), columnar=True)
+
+        for table, frame in self.keys.dimensions().items():
+            self.writers.submit(f"powerbi_star/{table}", frame, self._table_path(table), columnar=True)
+        self.writers.wait()
+
+        # the previous set goes only once the new one is complete
+        old = self.path + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.replace(self.path, old)
+        os.replace(self.partial, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+
+
+# -------------------------------------------------
+# PREVIEW (sampled dry run)
+# -------------------------------------------------
+PREVIEW_SAMPLE_ROWS = 10_000
+
+# the comparison report is slow per row; without history it is timed on
+# this many sample rows only
+PREVIEW_REPORT_ROWS = 200
+
+
+def preview_cleaning_job(
+    input_csv_path: str,
+    config: dict | None = None,
+    requested_outputs=None,
+    sample_rows: int = PREVIEW_SAMPLE_ROWS,
+    seed: int = 0,
+    history_path: str | None = RUN_HISTORY_PATH
+):
+    """
+    Clean a sample of the input with `config` to check the options before
+    a full run. Nothing is written: no outputs, no review file, no history,
+    and the persistent name cache is neither read nor extended.
+
+    The sample is ~sample_rows rows spread over the whole file, read with
+    bounded I/O (readers.stratified_sample). Returns (cleaned_sample, preview)
+    where preview holds the column types, date / numeric columns
+    converted, the company match rate, the share of rows kept and
+    projected_seconds for a full run of the requested outputs: the
+    estimated row count times each stage's seconds per row, measured on
+    the sample for pipeline stages and taken from the run history for
+    reading and outputs (timed on the sample when there is no history).
+    """
+    if config is None:
+        config = DEFAULT_CONFIG
+
+    if requested_outputs is None:
+        requested_outputs = list(DEFAULT_OUTPUTS)
+
+    start = time.perf_counter()
+    profiler = PipelineProfiler()
+
+    with copy_on_write(), profiler.activate():
+        with stage("read_input") as s:
+            raw_df, method = stratified_sample(input_csv_path, sample_rows, seed)
+            s.output(raw_df)
+
+        cleaned_df, summary = _clean_batch(
+            raw_df.copy(deep=False),
+            {**config, "company_review_path": None, "company_name_cache": None}
+        )
+
+        # cheap enough to time on the whole sample
+        if "powerbi_file" in requested_outputs:
+            _build_artifact("powerbi_file", cleaned_df)
+        if "powerbi_star" in requested_outputs:
+            with stage("powerbi_star", cleaned_df) as s:
+                s.output(StarKeys().fact(make_powerbi_ready(cleaned_df)))
+
+    profile = profiler.report()
+    try:
+        source_rows = estimate_rows(input_csv_path)
+    except (OSError, ValueError):
+        source_rows = len(raw_df)
+
+    projection = _project_stage_seconds(
+        input_csv_path, config, requested_outputs, profile, cleaned_df, raw_df,
+        max(source_rows, len(raw_df)), history_path
+    )
+
+    match_rate = None
+    if "importer_needs_review" in cleaned_df.columns:
+        named = cleaned_df["importer_name_standardized"].notna()
+        if named.any():
+            matched = ~cleaned_df.loc[named, "importer_needs_review"].astype(bool)
+            match_rate = round(float(matched.mean()), 4)
+
+    preview = {
+        "sample_method": method,
+        "sample_rows": len(raw_df),
+        "sample_final_rows": len(cleaned_df),
+        "rows_kept_share": round(len(cleaned_df) / len(raw_df), 4) if len(raw_df) else None,
+        "estimated_source_rows": source_rows,
+        "column_types": {col: str(dtype) for col, dtype in cleaned_df.dtypes.items()},
+        "date_columns_converted": summary.get("date_columns_converted", []),
+        "numeric_columns_converted": summary.get("numeric_columns_converted", []),
+        "company_match_rate": match_rate,
+        "projected_seconds": round(sum(projection.values()), 1),
+        "projected_stage_seconds": {k: round(v, 2) for k, v in projection.items()},
+        "preview_seconds": round(time.perf_counter() - start, 3),
+    }
+    return cleaned_df, preview
+
+
+def _project_stage_seconds(input_csv_path, config, requested_outputs, profile,
+                           cleaned_df, raw_df, source_rows, history_path) -> dict:
+    """Projected full-run seconds per stage."""
+    history = {}
+    if history_path:
+        try:
+            history = stage_weights(history_path)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Could not read stage costs from %s: %s", history_path, e)
+
+    measured = {
+        s["stage"]: s["wall_seconds"] / (s["rows_in"] or s["rows_out"])
+        for s in profile["stages"]
+        if s["depth"] == 0 and (s["rows_in"] or s["rows_out"])
+    }
+
+    # sampled reads seek around the file: history knows the sequential rate
+    if "read_input" in history:
+        measured["read_input"] = history["read_input"]
+
+    if "comparison_report" in requested_outputs:
+        if "comparison_report" in history:
+            measured["comparison_report"] = history["comparison_report"]
+        elif len(cleaned_df):
+            rows = min(PREVIEW_REPORT_ROWS, len(cleaned_df))
+            report_start = time.perf_counter()
+            build_comparison_report(
+                raw_df=standardize_column_names(raw_df.head(rows).copy(deep=False)),
+                cleaned_df=cleaned_df.head(rows)
+            )
+            measured["comparison_report"] = (time.perf_counter() - report_start) / rows
+
+    plan = ["read_input"] + pipeline_stages(config) + [
+        OUTPUT_STAGES[name] for name in requested_outputs if name in OUTPUT_STAGES
+    ]
+    return {name: measured.get(name, 0.0) * source_rows for name in plan}
+
+
 # -------------------------------------------------
 # MAIN JOB
 # -------------------------------------------------
-def run_cleaning_job(input_csv_path: str, output_dir: str = "outputs", config: dict | None = None):
+def run_cleaning_job(
+    input_csv_path: str,
+    output_dir: str = "outputs",
+    config: dict | None = None,
+    incremental: bool = False,
+    memory_budget_mb: float | None = None,
+    requested_outputs=None,
+    compression: str | None = None,
+    output_format: str = "csv",
+    partition_cols=None,
+    profile_mode: str | None = None,
+    profile_path: str | None = None,
+    history_path: str | None = RUN_HISTORY_PATH,
+    review_source: str | None = None,
+    progress=None,
+    cancel=None
+):
+    """
+    Clean a raw file and write the requested outputs
+    (cleaned_file, powerbi_file, comparison_report by default; powerbi_star
+    adds a star-schema folder of an integer-keyed fact table and
+    dimension tables, see StarExport).
+    The input may be a CSV, a .csv.gz, a zip of CSVs (one dataset), an
+    .xlsx workbook or a Parquet file; summary["input"] records which.
+    Outputs that are not requested are never built; build_output() can
+    produce them later from the returned cleaned_df.
+
+    With incremental=True the job keeps a run manifest in `output_dir` and,
+    when the input only grew since the previous run, cleans just the new rows
+    and appends them to the previous outputs. Any other change to the file or
+    the config falls back to a full run. Only plain CSV inputs can be
+    updated incrementally.
+
+    With memory_budget_mb set, a file estimated to need more than the budget
+    is cleaned in chunks (duplicates tracked in a disk-spilling fingerprint
+    store) and the returned cleaned_df is None; outputs are on disk.
+
+    Unmatched company names are merged into the review queue once, when
+    the job has finished, as the input's contribution (see
+    reference_store.add_review): cleaning the same file again replaces it
+    instead of counting its names twice. The input is identified by its
+    resolved path, or by review_source when the path does not last (an
+    upload: reference_store.content_key). A cancelled job adds nothing.
+
+    Outputs are serialized on background writer threads (optionally gzip /
+    zstd compressed) while the next artifact is computed; the job returns
+    once every writer has finished and reports throughput in summary["writers"].
+
+    output_format="parquet" or "arrow" writes the cleaned and Power BI files
+    as dataset directories with their dtypes (compression is then the
+    columnar codec), optionally partitioned by partition_cols, e.g.
+    ["year", "month"] on the Power BI file.
+
+    Every pipeline operation and output build is profiled into
+    summary["profile"]; profile_mode="cprofile" / "sample" adds the top
+    functions per stage and profile_path writes the profile as JSON that
+    also opens in a trace viewer (chrome://tracing, Perfetto).
+
+    Each job is appended to the SQLite run history at history_path
+    (None to skip): input size, rows, config, stage timings, peak memory
+    and company master version. See tools/run_report for trends.
+
+    progress(event) receives the running stage, rows read, the fraction
+    done and an ETA (weighted by the stage costs in the run history) as
+    stages start and end. cancel() is polled at every stage and chunk
+    boundary; once it returns True the job stops there, removes any
+    partly written outputs (and the incremental manifest that described
+    them) and raises progress.JobCancelled.
+    """
 
     if config is None:
         config = DEFAULT_CONFIG
 
     os.makedirs(output_dir, exist_ok=True)
 
-    cleaned_output_path = os.path.join(output_dir, "cleaned_file.csv")
-    powerbi_output_path = os.path.join(output_dir, "cleaned_for_powerbi.csv")
-    comparison_output_path = os.path.join(output_dir, "comparison_report.csv")
+    if requested_outputs is None:
+        requested_outputs = list(DEFAULT_OUTPUTS)
 
-    # -----------------------------
-    # READ RAW DATA (robust parser)
-    # -----------------------------
-    raw_df = pd.read_csv(
-        input_csv_path,
-        keep_default_na=False,
-        engine="python",
-        on_bad_lines="warn"
+    unknown = set(requested_outputs) - set(OUTPUT_FILES)
+    if unknown:
+        raise ValueError(f"Unknown outputs requested: {sorted(unknown)}")
+
+    outputs = {
+        name: output_path(output_dir, name, compression, output_format)
+        for name in OUTPUT_FILES
+        if name in requested_outputs
+    }
+
+    writers = OutputWriters(
+        compression, output_format=output_format, partition_cols=partition_cols
     )
 
-    raw_df_copy = raw_df.copy()
+    tracker = None
+    if progress is not None or cancel is not None:
+        tracker = _progress_tracker(
+            input_csv_path, config, requested_outputs, history_path, progress, cancel
+        )
+
+    profiler = PipelineProfiler(profile_mode, progress=tracker)
+    review = ReviewBatch()
+    start = time.perf_counter()
+
+    try:
+        with PeakMemoryMonitor() as monitor, profiler.activate(), review.activate():
+            with copy_on_write(), writers:
+                cleaned_df, summary = _run_job(
+                    input_csv_path, output_dir, config, outputs, writers,
+                    incremental, memory_budget_mb
+                )
+    except JobCancelled:
+        if writers.report():
+            _discard_outputs(outputs, output_dir)
+        logger.info("Cleaning job cancelled: %s", input_csv_path)
+        raise
+
+    # one merge per job, as this input's contribution: a rerun replaces
+    # it, an incremental run adds the new rows' names to it
+    review.flush(
+        source=source_key(input_csv_path, review_source),
+        replace=summary.get("incremental", {}).get("mode") != "incremental"
+    )
+
+    summary["input"] = describe_input(input_csv_path)
+    if "company_name_cache_hit_rate" in summary:
+        # chunk summaries add up the counts, not the rates
+        summary["company_name_cache_hit_rate"] = name_cache.hit_rate(summary)
+    summary.setdefault("memory", {})["peak_rss_mb"] = monitor.peak_mb
+    # other jobs ran in this process meanwhile: the peak includes them
+    summary["memory"]["peak_rss_shared"] = monitor.shared
+    summary["writers"] = writers.report()
+    summary["profile"] = profiler.report()
+
+    if profile_path:
+        profiler.write(profile_path)
+
+    if history_path:
+        # the history is bookkeeping: never fail a finished job over it
+        try:
+            summary["run_id"] = record_run(
+                summary, input_csv_path, config, time.perf_counter() - start,
+                master_path=config.get("company_master_path", COMPANY_MASTER_PATH),
+                path=history_path
+            )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Could not record run history in %s: %s", history_path, e)
+
+    if tracker is not None:
+        tracker.finished()
+
+    return cleaned_df, summary, outputs
+
+
+def _progress_tracker(input_csv_path, config, requested_outputs, history_path,
+                      progress, cancel) -> ProgressTracker:
+    plan = ["read_input"] + pipeline_stages(config) + [
+        OUTPUT_STAGES[name] for name in requested_outputs if name in OUTPUT_STAGES
+    ]
+
+    # stage costs of earlier runs make the fraction (and ETA) time-weighted
+    weights = {}
+    if history_path:
+        try:
+            weights = stage_weights(history_path)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Could not read stage costs from %s: %s", history_path, e)
+
+    try:
+        total_rows = estimate_rows(input_csv_path)
+    except (OSError, ValueError):
+        total_rows = 0
+
+    return ProgressTracker(progress, cancel, total_rows, plan, weights)
+
+
+def _discard_outputs(outputs: dict, output_dir: str):
+    """
+    Remove the outputs of a cancelled job. They may be half written, so the
+    manifest that would let the next incremental run append to them goes too.
+    """
+    for name, path in outputs.items():
+        if name == "powerbi_star":
+            # the previous complete set stays; only the unfinished one goes
+            shutil.rmtree(path + ".partial", ignore_errors=True)
+        elif os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    manifest = inc.manifest_path(output_dir)
+    if os.path.exists(manifest):
+        os.remove(manifest)
+
+
+def _run_job(input_csv_path, output_dir, config, outputs, writers,
+             incremental, memory_budget_mb):
+    fallback_reason = None
+    store = None
+
+    # appending by byte offset only works on a plain text file
+    # with single-byte newlines
+    input_info = describe_input(input_csv_path)
+    if incremental and (input_info["format"] != "csv" or input_info["encoding"] == "utf-16"):
+        incremental = False
+        fallback_reason = "input_not_appendable"
+
+    # new rows can add dimension members: the star set is rebuilt as a whole
+    if incremental and "powerbi_star" in outputs:
+        incremental = False
+        fallback_reason = "output_not_appendable"
+
+    if incremental:
+        manifest = inc.load_manifest(output_dir)
+        store = inc.fingerprint_store(output_dir)
+        scan = inc.scan_input(
+            input_csv_path, manifest["processed_bytes"] if manifest else 0
+        )
+        fallback_reason = inc.check_manifest(manifest, input_csv_path, config, scan, store)
+
+        # every requested output must have been kept up to date by the manifest
+        if fallback_reason is None and not set(outputs) <= set(manifest.get("outputs", [])):
+            fallback_reason = "outputs_changed"
+
+        if fallback_reason is None and all(os.path.exists(p) for p in outputs.values()):
+            result = _run_incremental_update(
+                input_csv_path, output_dir, config, manifest, scan, store, outputs, writers
+            )
+            if result is not None:
+                return result
+            fallback_reason = "schema_changed"
+        elif fallback_reason is None:
+            fallback_reason = "outputs_missing"
+
+        store.clear()
 
     # -----------------------------
-    # RUN PIPELINE
+    # MEMORY STRATEGY
     # -----------------------------
-    cleaned_df, summary = run_pipeline(raw_df, config)
+    estimated_mb = estimate_run_mb(input_csv_path)
+    chunked = memory_budget_mb is not None and estimated_mb > memory_budget_mb
+
+    if chunked:
+        spill_dir = None
+        if store is None:
+            spill_dir = os.path.join(output_dir, ".dedup_spill")
+            shutil.rmtree(spill_dir, ignore_errors=True)
+            store = FingerprintStore(spill_dir)
+
+        # without a frame to return, the cleaned file is the retained result
+        outputs["cleaned_file"] = output_path(
+            output_dir, "cleaned_file", writers.compression, writers.output_format
+        )
+
+        chunk_rows = chunk_rows_for_budget(input_csv_path, memory_budget_mb)
+        try:
+            cleaned_df, summary, run_info = _run_chunked(
+                input_csv_path, config, outputs, writers, store, chunk_rows
+            )
+        finally:
+            if spill_dir:
+                shutil.rmtree(spill_dir, ignore_errors=True)
+    else:
+        cleaned_df, summary, run_info = _run_in_memory(
+            input_csv_path, config, outputs, writers, store
+        )
+
+    summary["memory"] = {
+        "budget_mb": memory_budget_mb,
+        "estimated_mb": round(float(estimated_mb), 1),
+        "strategy": "chunked" if chunked else "in_memory",
+    }
+
+    # -----------------------------
+    # RUN MANIFEST (incremental mode)
+    # Only once every output is fully written
+    # -----------------------------
+    if incremental:
+        store.flush()
+        writers.wait()
+        inc.save_manifest(output_dir, {
+            "input_path": os.path.abspath(input_csv_path),
+            "processed_bytes": scan["processed_bytes"],
+            "prefix_checksum": scan["prefix_checksum"],
+            "config": config,
+            "encoding": input_info["encoding"],
+            "columns": run_info["columns"],
+            "date_columns": summary.get("date_columns_converted", []),
+            "numeric_columns": summary.get("numeric_columns_converted", []),
+            "source_rows": run_info["source_rows"],
+            "rows_written": summary["final_rows"],
+            "fingerprint_segments": store.segment_count,
+            "outputs": list(outputs),
+        })
+
+    if fallback_reason:
+        summary["incremental"] = {"mode": "full", "reason": fallback_reason}
+
+    return cleaned_df, summary
+
+
+def _clean_batch(raw_df, config, store=None, no_start=1):
+    """
+    Run the pipeline on one batch of raw rows.
+    The 'no' sequence is renumbered here from `no_start` so chunks and
+    increments continue it, and `store` (if any) carries duplicate memory
+    across batches.
+    """
+    if store is None:
+        store = config.get("duplicate_store")
+
+    cleaned_df, summary = run_pipeline(
+        raw_df, {**config, "standardize_no": False, "duplicate_store": store}
+    )
+
+    if config.get("standardize_no", True):
+        cleaned_df = standardize_no_column(cleaned_df, summary, start=no_start)
+        summary["final_columns"] = len(cleaned_df.columns)
+
+    return cleaned_df, summary
+
+
+def _read_raw(input_csv_path, **kwargs):
+    # csv, csv.gz, zip of csvs, xlsx or parquet; decompressed while parsed
+    return read_input(input_csv_path, **kwargs)
+
+
+# -------------------------------------------------
+# IN-MEMORY RUN
+# -------------------------------------------------
+def _run_in_memory(input_csv_path, config, outputs, writers, store):
+    with stage("read_input") as s:
+        raw_df = s.output(_read_raw(input_csv_path))
+    source_rows = len(raw_df)
+
+    if current_tracker() is not None:
+        current_tracker().set_total_rows(source_rows)
+
+    # shallow copies: with copy-on-write the pipeline and the report
+    # cannot modify raw_df, and no column is duplicated up front
+    cleaned_df, summary = _clean_batch(raw_df.copy(deep=False), config, store)
 
     # -----------------------------
     # SAVE FULL CLEANED FILE
     # Engineering / ML / audit version
+    # Serialized in the background while the other artifacts are computed
     # -----------------------------
-    cleaned_df.to_csv(cleaned_output_path, index=False)
+    if "cleaned_file" in outputs:
+        _submit(writers, "cleaned_file", cleaned_df, outputs["cleaned_file"])
 
     # -----------------------------
-    # ✅ POWER BI CURATED FILE
+    # COMPARISON REPORT
+    # Built before Power BI so the raw frame can be released right after
     # -----------------------------
-    powerbi_df = make_powerbi_ready(cleaned_df)
+    if "comparison_report" in outputs:
+        _submit(
+            writers,
+            "comparison_report",
+            _build_artifact("comparison_report", cleaned_df, raw_df),
+            outputs["comparison_report"]
+        )
+    del raw_df
 
-    # Fill nulls safely for BI tools
-    string_cols = powerbi_df.select_dtypes(include=["object", "string"]).columns
-    powerbi_df[string_cols] = powerbi_df[string_cols].fillna("NULL")
-
-    powerbi_df.to_csv(powerbi_output_path, index=False)
+    # -----------------------------
+    # ✅ POWER BI CURATED FILE
+    # -----------------------------
+    if "powerbi_file" in outputs:
+        _submit(
+            writers,
+            "powerbi_file",
+            _build_artifact("powerbi_file", cleaned_df),
+            outputs["powerbi_file"]
+        )
 
     # -----------------------------
-    # COMPARISON REPORT
+    # POWER BI STAR SCHEMA (optional)
     # -----------------------------
-    raw_for_compare = standardize_column_names(raw_df_copy.copy())
-    cleaned_for_compare = cleaned_df.copy()
+    if "powerbi_star" in outputs:
+        star = StarExport(writers, outputs["powerbi_star"])
+        star.add(cleaned_df)
+        star.finish()
+
+    return cleaned_df, summary, {
+        "columns": list(cleaned_df.columns),
+        "source_rows": source_rows,
+    }
 
-    generate_comparison_report(
-        raw_df=raw_for_compare,
-        cleaned_df=cleaned_for_compare,
-        output_path=comparison_output_path
-    )
 
-    outputs = {
-        "cleaned_file": cleaned_output_path,
-        "powerbi_file": powerbi_output_path,
-        "comparison_report": comparison_output_path,
+# -------------------------------------------------
+# CHUNKED RUN (memory budget exceeded)
+# -------------------------------------------------
+def _merge_chunk_summary(total: dict, part: dict):
+    for key, value in part.items():
+        if key not in total:
+            total[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, bool):
+            total[key] = total[key] or value
+        elif isinstance(value, (int, float)):
+            total[key] += value
+        elif isinstance(value, list):
+            total[key] += [v for v in value if v not in total[key]]
+
+
+def _profiled_chunks(chunks):
+    """Time reading each chunk as a read_input stage."""
+    chunks = iter(chunks)
+    while True:
+        with stage("read_input") as s:
+            chunk = s.output(next(chunks, None))
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _fixed_conversions(config: dict, summary: dict) -> dict:
+    """config converting the date / numeric columns a first batch converted."""
+    fixed = dict(config)
+    if "date_columns_converted" in summary:
+        fixed["date_columns"] = summary["date_columns_converted"]
+    if "numeric_columns_converted" in summary:
+        fixed["numeric_columns"] = summary["numeric_columns_converted"]
+    return fixed
+
+
+def _run_chunked(input_csv_path, config, outputs, writers, store, chunk_rows):
+    summary = {}
+    columns = None
+    source_rows = 0
+    rows_written = 0
+    chunks = 0
+
+    # keys stay stable across chunks; dimensions are written at the end
+    star = StarExport(writers, outputs["powerbi_star"]) if "powerbi_star" in outputs else None
+    # raw rows are compared by position over the whole file, not per chunk
+    comparison = ChunkedComparison() if "comparison_report" in outputs else None
+
+    for raw_chunk in _profiled_chunks(_read_raw(input_csv_path, chunksize=chunk_rows)):
+        first = chunks == 0
+
+        cleaned, chunk_summary = _clean_batch(
+            raw_chunk.copy(deep=False), config, store, no_start=rows_written + 1
+        )
+
+        # the first chunk decides the column layout and which columns are
+        # dates / numbers; later chunks are converted the same way
+        if columns is None:
+            columns = list(cleaned.columns)
+            config = _fixed_conversions(config, chunk_summary)
+        else:
+            cleaned = cleaned.reindex(columns=columns)
+
+        # each output has its own writer lane: chunk N is written
+        # while chunk N+1 is cleaned, appends stay in order
+        _submit(writers, "cleaned_file", cleaned, outputs["cleaned_file"], append=not first)
+
+        if "comparison_report" in outputs:
+            _submit(
+                writers,
+                "comparison_report",
+                _build_artifact("comparison_report", cleaned, raw_chunk, comparison=comparison),
+                outputs["comparison_report"],
+                append=not first
+            )
+        source_rows += len(raw_chunk)
+        del raw_chunk
+
+        if "powerbi_file" in outputs:
+            _submit(
+                writers,
+                "powerbi_file",
+                _build_artifact("powerbi_file", cleaned),
+                outputs["powerbi_file"],
+                append=not first
+            )
+
+        if star is not None:
+            star.add(cleaned)
+
+        rows_written += len(cleaned)
+        chunks += 1
+        _merge_chunk_summary(summary, chunk_summary)
+
+    if chunks == 0:
+        for name, path in outputs.items():
+            if name != "powerbi_star":
+                _submit(writers, name, pd.DataFrame(), path)
+
+    if comparison is not None and chunks:
+        removed = comparison.finish()
+        if len(removed):
+            _submit(writers, "comparison_report", removed, outputs["comparison_report"], append=True)
+
+    if star is not None:
+        star.finish()
+
+    summary["chunks"] = chunks
+    summary["final_rows"] = rows_written
+    summary["final_columns"] = len(columns or [])
+
+    return None, summary, {
+        "columns": columns or [],
+        "source_rows": source_rows,
     }
 
-    return cleaned_df, summary, outputs
+
+# -------------------------------------------------
+# INCREMENTAL UPDATE
+# -------------------------------------------------
+def _run_incremental_update(input_csv_path, output_dir, config, manifest, scan, store, outputs, writers):
+    """
+    Clean only the rows appended since the last run and append them to the
+    previous outputs. Returns None when the new rows do not clean into the
+    same schema (columns, date / numeric inference) as the previous run.
+    """
+    start = manifest["processed_bytes"]
+    end = scan["processed_bytes"]
+
+    summary = {
+        "incremental": {
+            "mode": "incremental",
+            "new_source_rows": 0,
+            "rows_appended": 0,
+            "duplicates_removed_against_previous": 0,
+        }
+    }
+
+    if end <= start:
+        summary["final_rows"] = manifest["rows_written"]
+        summary["final_columns"] = len(manifest["columns"])
+        return pd.DataFrame(columns=manifest["columns"]), summary
+
+    with stage("read_input") as s:
+        raw_new = s.output(inc.read_new_rows(input_csv_path, start, end, manifest.get("encoding")))
+
+    if current_tracker() is not None:
+        current_tracker().set_total_rows(len(raw_new))
+
+    # the store also drops rows already written by previous runs
+    cleaned_new, summary_new = _clean_batch(
+        raw_new.copy(deep=False), config, store, no_start=manifest["rows_written"] + 1
+    )
+    summary.update(summary_new)
+    summary["incremental"]["duplicates_removed_against_previous"] = summary_new.get(
+        "duplicates_removed_against_store", 0
+    )
+
+    # heuristics run per batch, so the batch must infer what the full run did
+    if (
+        summary_new.get("date_columns_converted", []) != manifest["date_columns"]
+        or summary_new.get("numeric_columns_converted", []) != manifest["numeric_columns"]
+    ):
+        return None
+
+    if list(cleaned_new.columns) != manifest["columns"]:
+        return None
+
+    # -----------------------------
+    # APPEND TO PREVIOUS OUTPUTS
+    # -----------------------------
+    # outputs and manifest must move together: cancelling
+    # waits until both are written
+    with shielded():
+        for name, path in outputs.items():
+            # report rows continue the numbering of the rows already written
+            frame = _build_artifact(name, cleaned_new, raw_new, row_offset=manifest["rows_written"])
+            _submit(writers, name, frame, path, append=True)
+
+        store.flush()
+        writers.wait()
+
+        rows_written = manifest["rows_written"] + len(cleaned_new)
+
+        inc.save_manifest(output_dir, {
+            **manifest,
+            "processed_bytes": end,
+            "prefix_checksum": scan["prefix_checksum"],
+            "source_rows": manifest["source_rows"] + len(raw_new),
+            "rows_written": rows_written,
+            "fingerprint_segments": store.segment_count,
+            # outputs not requested this time are stale from here on
+            "outputs": list(outputs),
+        })
+
+    summary["incremental"]["new_source_rows"] = len(raw_new)
+    summary["incremental"]["rows_appended"] = len(cleaned_new)
+    summary["final_rows"] = rows_written
+    summary["final_columns"] = len(cleaned_new.columns)
+
+    return cleaned_new, summary
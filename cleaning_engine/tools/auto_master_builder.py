@@ -1,105 +1,272 @@
-import pandas as pd
+"""
+Suggest company master additions from the review queue.
+
+    python -m cleaning_engine.tools.auto_master_builder --threshold 0.6
+
+All unmapped names are clustered together: names are reduced to their
+distinctive tokens (legal suffixes, country words and tokens common to
+many names do not identify a company), only names that share a rare
+token or a rare token's prefix are compared (blocking), and pairs similar
+enough by IDF-weighted token overlap or character trigrams are joined.
+Each cluster's representative is the name covering the most review rows;
+every member gets the cluster's suggested standardized name and a
+confidence (its similarity to the representative). Suggestions go to the
+additions table of the reference store, to be confirmed in the app.
+"""
+
+import argparse
+import math
 import re
-from pathlib import Path
+import sys
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from cleaning_engine import reference_store
+from cleaning_engine.reference_store import REFERENCE_DB_PATH
+from cleaning_engine.operations.company_standardizer import normalize_key, strip_suffix_noise
 
 
-INPUT_PATH = "datasets/reference/importer_needs_review.csv"
-OUTPUT_PATH = "datasets/reference/company_master_additions.csv"
+# review queue in, suggested additions out
+INPUT_PATH = REFERENCE_DB_PATH
+OUTPUT_PATH = REFERENCE_DB_PATH
+
+# names at least this similar end up in one cluster
+SIMILARITY_THRESHOLD = 0.6
+# a token in more than this share of names (and more than GENERIC_MIN_NAMES)
+# says nothing about which company it is
+GENERIC_SHARE = 0.01
+GENERIC_MIN_NAMES = 50
+# larger blocks are too unspecific to compare all their pairs
+MAX_BLOCK_SIZE = 200
+PREFIX_LENGTH = 4
+# a name that matched nothing (nor a brand rule): its own suggestion, low confidence
+SINGLETON_CONFIDENCE = 0.5
+
+COUNTRY_WORDS = {
+    "INDIA", "INDONESIA", "MALAYSIA", "PHILIPPINES",
+    "THAILAND", "VIETNAM", "BRAZIL", "MEXICO",
+    "TANZANIA", "RUSSIA", "UAE"
+}
+
+# company-form words (English and Vietnamese) that any name may carry
+FORM_WORDS = {
+    "COMPANY", "CO", "CORP", "CORPORATION", "JSC", "JOINT", "STOCK", "GROUP",
+    "CONG", "TY", "TNHH", "CP", "PHAN", "MTV", "THUONG", "MAI", "XUAT", "NHAP",
+    "KHAU", "DICH", "VU",
+}
+
+# known brands: a cluster whose representative contains the key gets the value
+BRAND_RULES = {
+    "MAC NELS": "MAC NELS",
+    "MERCK": "MERCK",
+    "SIGMA ALDRICH": "SIGMA-ALDRICH",
+    "PROCTER": "PROCTER & GAMBLE",
+    "UNILEVER": "UNILEVER",
+    "CLARIANT": "CLARIANT",
+    "DKSH": "DKSH",
+    "MEGASETIA": "MEGASETIA AGUNG",
+    "KYROVET": "KYROVET LABORATORIES",
+    "MOLECULES ANALYTICAL": "MOLECULES ANALYTICAL",
+    "HOMEPRO": "HOMEPRO",
+    "QUIMICA ISA": "QUIMICA ISA",
+    "KEDS": "KEDS",
+    "ALNAIM": "ALNAIM DRUG",
+    "BAJA": "BAJA FUR",
+    "NEW DAY": "NEW DAY INTERNATIONAL",
+}
 
 
 # -------------------------
-# Heuristic brand reducer
+# Name reduction
 # -------------------------
+def name_tokens(core: str) -> list:
+    """Tokens of a name without legal suffixes, country and company-form words."""
+    key = strip_suffix_noise(normalize_key(core))
+    # initials belong together: "H B C" is the token HBC
+    key = re.sub(r"\b([A-Z0-9])\s+(?=[A-Z0-9]\b)", r"\1", key)
+    tokens = re.findall(r"[A-Z0-9&]+", key)
+    return [t for t in tokens if t not in COUNTRY_WORDS and t not in FORM_WORDS]
+
+
 def suggest_standardized_name(core: str) -> str:
+    """Suggestion for a single name: a brand rule, else its reduced name."""
     if not isinstance(core, str):
         return core
 
-    name = core.upper().strip()
-
-    # remove country words
-    COUNTRY_WORDS = [
-        "INDIA", "INDONESIA", "MALAYSIA", "PHILIPPINES",
-        "THAILAND", "VIETNAM", "BRAZIL", "MEXICO",
-        "TANZANIA", "RUSSIA", "UAE"
-    ]
-
-    words = name.split()
-    words = [w for w in words if w not in COUNTRY_WORDS]
-
-    name = " ".join(words)
-
-    # collapse long legal phrases
-    name = re.sub(r"\bCOMPANY\b", "", name)
+    tokens = name_tokens(core)
+    name = " ".join(tokens)
     name = re.sub(r"\bLABORATORIES\b", "LABS", name)
     name = re.sub(r"\bLAB SOLUTIONS\b", "LABS", name)
 
-    name = re.sub(r"\s+", " ", name).strip()
-
-    # brand heuristics
-    BRAND_RULES = {
-        "MAC NELS": "MAC NELS",
-        "MERCK": "MERCK",
-        "SIGMA ALDRICH": "SIGMA-ALDRICH",
-        "PROCTER": "PROCTER & GAMBLE",
-        "UNILEVER": "UNILEVER",
-        "CLARIANT": "CLARIANT",
-        "DKSH": "DKSH",
-        "MEGASETIA": "MEGASETIA AGUNG",
-        "KYROVET": "KYROVET LABORATORIES",
-        "MOLECULES ANALYTICAL": "MOLECULES ANALYTICAL",
-        "HOMEPRO": "HOMEPRO",
-        "QUIMICA ISA": "QUIMICA ISA",
-        "KEDS": "KEDS",
-        "ALNAIM": "ALNAIM DRUG",
-        "BAJA": "BAJA FUR",
-        "NEW DAY": "NEW DAY INTERNATIONAL",
-    }
-
     for key, std in BRAND_RULES.items():
         if key in name:
             return std
 
-    # fallback → first 2 words
-    return " ".join(name.split()[:2])
+    # nothing left once the form words are gone: keep the name as it was
+    return name or normalize_key(core)
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
 
 
 # -------------------------
-# Build master additions
+# Clustering
 # -------------------------
-def build_master_additions():
-    df = pd.read_csv(INPUT_PATH)
+class _Names:
+    """Distinctive tokens, IDF weights and trigrams of every name."""
+
+    def __init__(self, names):
+        self.names = list(names)
+        tokens = [name_tokens(n) for n in self.names]
+
+        doc_freq = Counter(t for ts in tokens for t in set(ts))
+        n = len(self.names)
+        self.idf = {t: math.log((n + 1) / c) + 1 for t, c in doc_freq.items()}
+        generic_above = max(GENERIC_MIN_NAMES, GENERIC_SHARE * n)
+        self.generic = {t for t, c in doc_freq.items() if c > generic_above}
+
+        self.tokens = [
+            [t for t in ts if t not in self.generic] or ts
+            for ts in tokens
+        ]
+        self.token_sets = [set(ts) for ts in self.tokens]
+        self.trigrams = [_trigrams(" ".join(ts)) for ts in self.tokens]
+        self.doc_freq = doc_freq
+
+    def similarity(self, i: int, j: int) -> float:
+        a, b = self.token_sets[i], self.token_sets[j]
+        if not a or not b:
+            return 0.0
+
+        union = sum(self.idf[t] for t in a | b)
+        weighted = sum(self.idf[t] for t in a & b) / union
 
-    if "unmapped_core_name" not in df.columns:
-        raise ValueError("unmapped_core_name column missing")
+        ta, tb = self.trigrams[i], self.trigrams[j]
+        trigram = len(ta & tb) / len(ta | tb)
 
-    core_names = (
-        df["unmapped_core_name"]
-        .dropna()
-        .astype(str)
-        .str.upper()
-        .str.strip()
-        .unique()
-    )
+        return max(weighted, trigram)
+
+    def blocks(self) -> dict:
+        """Block key -> names: every rare token, and the rarest token's prefix."""
+        blocks = defaultdict(list)
+
+        for i, tokens in enumerate(self.tokens):
+            for t in set(tokens):
+                blocks[("token", t)].append(i)
+
+            # typo tolerance: same start of the most identifying token
+            rarest = min(tokens, key=lambda t: self.doc_freq[t], default="")
+            if len(rarest) > PREFIX_LENGTH:
+                blocks[("prefix", rarest[:PREFIX_LENGTH])].append(i)
+
+        return {k: v for k, v in blocks.items() if 1 < len(v) <= MAX_BLOCK_SIZE}
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_names(names, weights=None, threshold: float = SIMILARITY_THRESHOLD) -> pd.DataFrame:
+    """
+    Cluster names and suggest a standardized name per cluster:
+    [core_name, standardized_name, cluster, confidence]. weights (e.g.
+    review rows per name) choose each cluster's representative.
+    """
+    names = list(names)
+    weights = list(weights) if weights is not None else [0] * len(names)
+    index = _Names(names)
+
+    parent = list(range(len(names)))
+    compared = set()
+
+    for members in index.blocks().values():
+        for a in range(len(members)):
+            for b in range(a + 1, len(members)):
+                i, j = members[a], members[b]
+                if (i, j) in compared:
+                    continue
+                compared.add((i, j))
+
+                if index.similarity(i, j) >= threshold:
+                    parent[_find(parent, i)] = _find(parent, j)
+
+    clusters = defaultdict(list)
+    for i in range(len(names)):
+        clusters[_find(parent, i)].append(i)
 
     rows = []
+    for members in clusters.values():
+        # most review rows, then the shortest name
+        rep = max(members, key=lambda i: (weights[i], -len(names[i])))
+        std = _cluster_name(index, members, rep)
+
+        for i in members:
+            if len(members) == 1:
+                confidence = 1.0 if std in BRAND_RULES.values() else SINGLETON_CONFIDENCE
+            elif i == rep:
+                confidence = 1.0
+            else:
+                confidence = index.similarity(i, rep)
 
-    for core in core_names:
-        std = suggest_standardized_name(core)
+            rows.append({
+                "core_name": names[i],
+                "standardized_name": std,
+                "cluster": names[rep],
+                "confidence": round(confidence, 3),
+            })
 
-        rows.append({
-            "core_name": core,
-            "standardized_name": std
-        })
+    return pd.DataFrame(rows, columns=["core_name", "standardized_name", "cluster", "confidence"])
 
-    out_df = pd.DataFrame(rows).sort_values("core_name")
 
-    Path(OUTPUT_PATH).parent.mkdir(parents=True, exist_ok=True)
-    out_df.to_csv(OUTPUT_PATH, index=False)
+def _cluster_name(index: _Names, members, rep) -> str:
+    """Representative's tokens shared by at least half the cluster."""
+    suggestion = suggest_standardized_name(index.names[rep])
+    if suggestion in BRAND_RULES.values() or len(members) == 1:
+        return suggestion
 
-    print("✅ Master additions file created:")
+    shared = [
+        t for t in index.tokens[rep]
+        if sum(t in index.token_sets[i] for i in members) * 2 >= len(members)
+    ]
+    return " ".join(shared) or suggestion
+
+
+# -------------------------
+# Build master additions
+# -------------------------
+def build_master_additions(threshold: float = SIMILARITY_THRESHOLD) -> pd.DataFrame:
+    queue = reference_store.review_queue(INPUT_PATH)
+    queue["core_name"] = queue["core_name"].astype(str).str.upper().str.strip()
+    queue = queue.groupby("core_name", as_index=False)["rows"].sum()
+
+    out_df = cluster_names(queue["core_name"], queue["rows"], threshold)
+    out_df = out_df.sort_values(["cluster", "confidence"], ascending=[True, False])
+
+    changed = reference_store.upsert_additions(out_df, OUTPUT_PATH)
+
+    clusters = out_df["cluster"].nunique()
+    print("✅ Master additions updated:")
     print(OUTPUT_PATH)
-    print(f"Rows: {len(out_df)}")
+    print(f"Rows: {len(out_df)} in {clusters} clusters ({changed} new or changed)")
+
+    return out_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suggest master additions from the review queue")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD,
+                        help="similarity (0-1) at which names join a cluster")
+    args = parser.parse_args(argv)
+
+    build_master_additions(args.threshold)
+    return 0
 
 
 if __name__ == "__main__":
-    build_master_additions()
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+End-to-end benchmark on synthetic customs data.
+
+    python -m cleaning_engine.tools.benchmark --scales 10000 100000 1000000 --out bench.json
+
+For each scale a synthetic file is generated (cached in --work-dir), every
+pipeline stage is timed by the pipeline's profiler on one in-memory run, and
+the full run_cleaning_job is timed end to end. Results are written as one
+JSON document with the same keys for every run, so two files can be
+compared operation by operation.
+
+Run from the repository root (the company master is read from datasets/).
+"""
+
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cleaning_engine.service import DEFAULT_CONFIG, run_cleaning_job, build_powerbi_output
+from cleaning_engine.pipeline import run_pipeline
+from cleaning_engine.profiling import PipelineProfiler, stage
+from cleaning_engine.readers import read_input
+from cleaning_engine.operations.column_name_standardizer import standardize_column_names
+from cleaning_engine.operations.comparison_report import build_comparison_report
+from cleaning_engine.tools.synthetic_data import write_synthetic_csv
+
+
+RESULTS_VERSION = 1
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+DEFAULT_WORK_DIR = "benchmarks"
+
+
+# -------------------------------------------------
+# Helpers
+# -------------------------------------------------
+
+def _environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _record(seconds: float, rows_in: int, rows_out: int) -> dict:
+    return {
+        "seconds": round(seconds, 4),
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "rows_per_s": round(rows_in / seconds) if seconds else None,
+    }
+
+
+def synthetic_input(work_dir: str, rows: int, seed: int) -> str:
+    """Generated input for a scale, re-used across benchmark runs."""
+    path = os.path.join(work_dir, "data", f"synthetic_{rows}_seed{seed}.csv")
+    if not os.path.exists(path):
+        write_synthetic_csv(path, rows, seed)
+    return path
+
+
+# -------------------------------------------------
+# Per-operation timings
+# -------------------------------------------------
+
+def time_operations(input_path: str, config: dict) -> dict:
+    """
+    Per-stage timings of one in-memory pipeline run, from the
+    pipeline's own profiling stages, plus the output builders.
+    """
+    profiler = PipelineProfiler()
+
+    with profiler.activate():
+        with stage("read_input") as s:
+            raw = s.output(read_input(input_path))
+
+        cleaned, _ = run_pipeline(raw.copy(deep=False), config)
+
+        with stage("powerbi_output", cleaned) as s:
+            s.output(build_powerbi_output(cleaned))
+
+        with stage("comparison_report", cleaned) as s:
+            s.output(build_comparison_report(
+                standardize_column_names(raw.copy(deep=False)), cleaned
+            ))
+
+    return {
+        agg["stage"]: {
+            **_record(agg["wall_seconds"], agg["rows_in"], agg["rows_out"]),
+            "cpu_seconds": round(agg["cpu_seconds"], 4),
+            "memory_delta_mb": agg["memory_delta_mb"],
+        }
+        for agg in profiler.report()["stages"]
+    }
+
+
+# -------------------------------------------------
+# Full job
+# -------------------------------------------------
+
+def time_full_job(input_path: str, output_dir: str, config: dict, source_rows: int,
+                  history_path: str | None = None) -> dict:
+    start = time.perf_counter()
+    _, summary, _ = run_cleaning_job(
+        input_path, output_dir=output_dir, config=config, history_path=history_path
+    )
+    seconds = time.perf_counter() - start
+
+    return {
+        "seconds": round(seconds, 3),
+        "source_rows": source_rows,
+        "final_rows": summary["final_rows"],
+        "rows_per_s": round(source_rows / seconds) if seconds else None,
+        "peak_rss_mb": summary.get("memory", {}).get("peak_rss_mb"),
+        "input_mb": round(os.path.getsize(input_path) / 1024 / 1024, 2),
+    }
+
+
+# -------------------------------------------------
+# Benchmark run
+# -------------------------------------------------
+
+def run_benchmark(scales=None, seed: int = 0, work_dir: str = DEFAULT_WORK_DIR,
+                  operations: bool = True) -> dict:
+    scales = scales or DEFAULT_SCALES
+    review_path = os.path.join(work_dir, "importer_needs_review.csv")
+    # the name cache would turn repeat runs into cache hits
+    config = {**DEFAULT_CONFIG, "company_review_path": review_path, "company_name_cache": None}
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "environment": _environment(),
+        "runs": [],
+    }
+
+    for rows in scales:
+        input_path = synthetic_input(work_dir, rows, seed)
+        run = {"rows": rows}
+
+        if operations:
+            run["operations"] = time_operations(input_path, config)
+
+        run["full_job"] = time_full_job(
+            input_path, os.path.join(work_dir, f"out_{rows}"), config, rows,
+            # benchmark runs get their own history, apart from real jobs
+            history_path=os.path.join(work_dir, "run_history.db")
+        )
+
+        results["runs"].append(run)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the cleaning engine")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+    parser.add_argument("--out", default=None, help="JSON results path")
+    parser.add_argument("--skip-operations", action="store_true",
+                        help="only time the full job")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(
+        args.scales, args.seed, args.work_dir, operations=not args.skip_operations
+    )
+
+    out = args.out or os.path.join(
+        args.work_dir, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    for run in results["runs"]:
+        job = run["full_job"]
+        print(f"{run['rows']:>12,} rows  {job['seconds']:>9.2f}s  "
+              f"{job['rows_per_s']:>10,} rows/s  peak {job['peak_rss_mb']} MB")
+    print(f"Results: {out}")
+
+
+if __name__ == "__main__":
+    main()
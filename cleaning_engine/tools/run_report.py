@@ -0,0 +1,85 @@
+"""
+Trends and throughput regressions from the run history.
+
+    python -m cleaning_engine.tools.run_report --last 20 --threshold 0.25
+
+Shows the most recent runs (size, time, peak memory, master version), the
+rows/s of every stage per run, and flags stages whose rows/s dropped more
+than --threshold below the median of their previous --baseline runs.
+Exits with status 1 when a regression is flagged in the shown runs.
+"""
+
+import argparse
+import sys
+
+import pandas as pd
+
+from cleaning_engine.run_history import (
+    RUN_HISTORY_PATH, REGRESSION_THRESHOLD, BASELINE_RUNS, MIN_STAGE_ROWS,
+    load_runs, load_stages, detect_regressions,
+)
+
+
+RUN_COLUMNS = [
+    "run_id", "started_at", "input_format", "source_rows", "final_rows",
+    "strategy", "wall_seconds", "rows_per_s", "peak_rss_mb", "master_version", "master_rows",
+]
+
+
+def runs_table(runs: pd.DataFrame) -> pd.DataFrame:
+    runs = runs.copy()
+    runs["rows_per_s"] = (runs["source_rows"] / runs["wall_seconds"]).round().astype("Int64")
+    return runs[RUN_COLUMNS]
+
+
+def stage_trend(stages: pd.DataFrame, run_ids) -> pd.DataFrame:
+    """rows/s per stage (rows) and run (columns)."""
+    stages = stages[stages["run_id"].isin(run_ids)]
+    trend = stages.pivot(index="stage", columns="run_id", values="rows_per_s")
+    return trend.round().astype("Int64")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cleaning run history report")
+    parser.add_argument("--db", default=RUN_HISTORY_PATH, help="run history database")
+    parser.add_argument("--last", type=int, default=20, help="runs to show")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="flag a drop in rows/s larger than this fraction")
+    parser.add_argument("--baseline", type=int, default=BASELINE_RUNS,
+                        help="previous runs a stage is compared against")
+    parser.add_argument("--min-rows", type=int, default=MIN_STAGE_ROWS,
+                        help="ignore stages that saw fewer rows")
+    args = parser.parse_args(argv)
+
+    runs = load_runs(args.db, limit=args.last)
+    if runs.empty:
+        print(f"No runs recorded in {args.db}")
+        return 0
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print("RUNS")
+        print(runs_table(runs).to_string(index=False))
+
+        print("\nSTAGE ROWS/S BY RUN")
+        print(stage_trend(load_stages(args.db), runs["run_id"]).to_string())
+
+        regressions = detect_regressions(args.db, args.threshold, args.baseline, args.min_rows)
+        regressions = regressions[regressions["run_id"].isin(runs["run_id"])]
+
+        if regressions.empty:
+            print(f"\nNo stage slowed down by more than {args.threshold:.0%}.")
+            return 0
+
+        regressions = regressions.assign(
+            rows_per_s=regressions["rows_per_s"].round(),
+            baseline_rows_per_s=regressions["baseline_rows_per_s"].round(),
+            change=(regressions["change"] * 100).round(1),
+        )
+        print(f"\nREGRESSIONS (rows/s more than {args.threshold:.0%} below baseline, change in %)")
+        print(regressions.to_string(index=False))
+
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
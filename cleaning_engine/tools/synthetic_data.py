@@ -0,0 +1,280 @@
+"""
+Deterministic synthetic customs data for benchmarks.
+
+    python -m cleaning_engine.tools.synthetic_data out.csv --rows 1000000 --seed 7
+
+Rows are generated in fixed blocks, each seeded by (seed, block number), so
+the same seed always gives the same file and a smaller file is a prefix of
+a larger one. The noise mirrors what the cleaning operations handle: null
+tokens, currency strings, mixed date formats, legal suffixes, accented and
+junk importers, padding and exact duplicate rows.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+BLOCK_ROWS = 100_000
+
+# raw headers as vendors deliver them; standardize_column_names turns
+# them into importer_name, arrival_date, usd_cif, ...
+COLUMNS = [
+    "No", "Arrival Date", "Importer Name", "Importer Country",
+    "Exporter Name", "Exporter Country", "Country of Origin",
+    "Product Details", "USD FOB", "USD CIF",
+    "Gross Weight", "Gross Weight Unit", "Net Weight", "Net Weight Unit",
+    "Quantity", "Quantity Unit", "Package Amount", "Packages Unit",
+]
+
+
+# -------------------------------------------------
+# Vocabulary
+# -------------------------------------------------
+
+NAME_WORDS = [
+    "GLOBAL", "PACIFIC", "ATLAS", "NOVA", "SUNRISE", "GOLDEN", "UNITED",
+    "PRIME", "ROYAL", "EASTERN", "ANDES", "DELTA", "OMEGA", "SILVER",
+    "GREEN", "BLUE", "STAR", "METRO", "ALPHA", "ORION", "MERIDIAN", "APEX",
+    "QUIMICA", "FARMA", "AGRO", "TECH", "MEDI", "LAB", "INDO", "VINA",
+]
+NAME_KINDS = [
+    "TRADING", "CHEMICALS", "PHARMA", "INDUSTRIES", "DISTRIBUTION",
+    "IMPORTS", "LABORATORIES", "HOLDINGS", "SUPPLY", "SCIENTIFIC",
+]
+KNOWN_BRANDS = [
+    "Procter and Gamble", "Unilever Indonesia", "Clariant", "Merck",
+    "Sigma Aldrich", "DKSH", "Megasetia Agung", "Kyrovet Laboratories",
+]
+ACCENTED_NAMES = [
+    "CÔNG TY TNHH THƯƠNG MẠI VIỆT NAM", "Công ty cổ phần Đồng Tâm",
+    "CÔNG TY TNHH DƯỢC PHẨM HÀ NỘI", "Compañía Química Española",
+    "Distribuidora Médica Andina", "Laboratórios São Paulo",
+]
+LEGAL_SUFFIXES = [
+    "", "", "", "PVT LTD", "Pvt. Ltd.", "LIMITED", "Ltd", "S.A.", "S.A.C.",
+    "S.R.L.", "LLC", "Inc.", "CORP", "Corporation", "GmbH", "LTDA", "FZCO",
+]
+JUNK_IMPORTERS = [
+    "NA", "N/A", "VIETNAM", "CHINA", "30504", "1250-COM-1", "EXP 907 H",
+    "XXMARXXRGAXXC", "CA NHAN TO CHUC KHONG CO MA SO THUE",
+    "INDIVIDUALS OR ORGANIZATIONS DO NOT HAVE TAX CODE",
+    "ACME BRANCH OFFICE", "ИП Иванов", "ООО Ромашка",
+]
+
+COUNTRIES = [
+    "INDIA", "INDONESIA", "VIETNAM", "MEXICO", "PERU", "BRAZIL",
+    "THAILAND", "MALAYSIA", "PHILIPPINES", "RUSSIA", "CHINA", "GERMANY",
+]
+EXPORTERS = [
+    "Hikal Ltd", "BASF SE", "Evonik Industries AG", "Lonza AG",
+    "Zhejiang Medicine Co Ltd", "Aarti Industries Limited", "DSM Nutritional",
+]
+
+PRODUCT_TERMS = [
+    "BOMBA", "DESTORNILLADOR", "DISCO DE CORTE", "CARGADOR", "MOTOSIERRA",
+    "TALADRO", "REACTIVO", "VITAMINA C", "FORMULA INFANTIL", "SIMILAC",
+]
+PRODUCT_EXTRAS = ["", "", "SET", "KIT", "INDUSTRIAL", "PARA USO AGRICOLA", "CON ACCESORIOS"]
+MEASURES = ["", "5L", "12MM", "115MM", "500MG", "20V", "1KG", "250ML", "10PCS"]
+
+WEIGHT_UNITS = ["KG", "KG", "KG", "kg", "KGS", "TNE", "G"]
+QUANTITY_UNITS = ["PCS", "PCS", "UNIT", "SET", "KG", "BOX"]
+PACKAGE_UNITS = ["PKG", "CTN", "PALLET", "BAG", "DRUM"]
+
+NULL_TOKENS = ["", "N/A", "NA", "null", "NULL", "-", " "]
+
+DATE_FORMATS = ["%Y-%m-%d", "%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y", "%m-%d-%Y"]
+FIRST_DATE = np.datetime64("2022-01-01")
+DATE_SPAN_DAYS = 4 * 365
+
+
+# -------------------------------------------------
+# Column generators
+# -------------------------------------------------
+
+def _pick(rng, values, n):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+
+def _with_nulls(rng, values, rate):
+    mask = rng.random(len(values)) < rate
+    values[mask] = _pick(rng, NULL_TOKENS, int(mask.sum()))
+    return values
+
+
+def _company_pool(seed, size=5000):
+    """Fixed set of importer base names for a seed (same for every block)."""
+    rng = np.random.default_rng([seed, 0xC0])
+    names = (
+        pd.Series(_pick(rng, NAME_WORDS, size))
+        + " "
+        + pd.Series(_pick(rng, NAME_WORDS, size))
+        + " "
+        + pd.Series(_pick(rng, NAME_KINDS, size))
+    )
+    return np.concatenate([np.asarray(KNOWN_BRANDS, dtype=object), names.to_numpy(dtype=object)])
+
+
+def _importers(rng, pool, n):
+    # a few importers dominate, like real trade data
+    idx = np.minimum(rng.zipf(1.3, n) - 1, len(pool) - 1)
+    base = pd.Series(pool[idx])
+
+    suffix = pd.Series(_pick(rng, LEGAL_SUFFIXES, n))
+    names = (base + " " + suffix).str.strip()
+
+    case = rng.random(n)
+    names = names.where(case < 0.6, names.str.title())
+    names = names.where(case < 0.85, names.str.lower())
+
+    padded = rng.random(n) < 0.05
+    names[padded] = "  " + names[padded] + " "
+
+    values = np.array(names, dtype=object)
+
+    accented = rng.random(n) < 0.04
+    values[accented] = _pick(rng, ACCENTED_NAMES, int(accented.sum()))
+
+    junk = rng.random(n) < 0.03
+    values[junk] = _pick(rng, JUNK_IMPORTERS, int(junk.sum()))
+
+    return _with_nulls(rng, values, 0.01)
+
+
+def _dates(rng, n):
+    days = rng.integers(0, DATE_SPAN_DAYS, n)
+    dates = pd.to_datetime(FIRST_DATE + days.astype("timedelta64[D]"))
+
+    values = np.empty(n, dtype=object)
+    fmt_idx = rng.integers(0, len(DATE_FORMATS), n)
+    for i, fmt in enumerate(DATE_FORMATS):
+        mask = fmt_idx == i
+        values[mask] = dates[mask].strftime(fmt)
+
+    return _with_nulls(rng, values, 0.03)
+
+
+def _amounts(rng, n, mean, sigma, null_rate):
+    amounts = np.round(rng.lognormal(mean, sigma, n), 2)
+    values = amounts.astype(str).astype(object)
+
+    # currency strings / thousands separators the numeric cleaner strips
+    style = rng.random(n)
+    money = style < 0.15
+    values[money] = ["USD " + f"{a:,.2f}" for a in amounts[money]]
+    dollars = (style >= 0.15) & (style < 0.25)
+    values[dollars] = ["$" + f"{a:,.0f}" for a in amounts[dollars]]
+
+    return _with_nulls(rng, values, null_rate)
+
+
+def _products(rng, n):
+    products = (
+        pd.Series(_pick(rng, PRODUCT_TERMS, n))
+        + " "
+        + pd.Series(_pick(rng, MEASURES, n))
+        + " "
+        + pd.Series(_pick(rng, PRODUCT_EXTRAS, n))
+    ).str.replace(r"\s+", " ", regex=True).str.strip()
+
+    return _with_nulls(rng, np.array(products, dtype=object), 0.01)
+
+
+def generate_block(block: int, n_rows: int = BLOCK_ROWS, seed: int = 0, pool=None) -> pd.DataFrame:
+    """
+    First `n_rows` rows of block number `block` (deterministic for a seed).
+    The whole block is always drawn so a short block is a prefix of the full one.
+    """
+    rng = np.random.default_rng([seed, block])
+    if pool is None:
+        pool = _company_pool(seed)
+
+    n = BLOCK_ROWS
+    df = pd.DataFrame({
+        "No": np.arange(block * BLOCK_ROWS + 1, block * BLOCK_ROWS + n + 1),
+        "Arrival Date": _dates(rng, n),
+        "Importer Name": _importers(rng, pool, n),
+        "Importer Country": _with_nulls(rng, _pick(rng, COUNTRIES, n), 0.02),
+        "Exporter Name": _with_nulls(rng, _pick(rng, EXPORTERS, n), 0.02),
+        "Exporter Country": _with_nulls(rng, _pick(rng, COUNTRIES, n), 0.05),
+        "Country of Origin": _with_nulls(rng, _pick(rng, COUNTRIES, n), 0.05),
+        "Product Details": _products(rng, n),
+        "USD FOB": _amounts(rng, n, 8.0, 1.5, 0.10),
+        "USD CIF": _amounts(rng, n, 8.1, 1.5, 0.03),
+        "Gross Weight": _amounts(rng, n, 5.0, 1.2, 0.05),
+        "Gross Weight Unit": _pick(rng, WEIGHT_UNITS, n),
+        "Net Weight": _amounts(rng, n, 4.9, 1.2, 0.05),
+        "Net Weight Unit": _pick(rng, WEIGHT_UNITS, n),
+        "Quantity": rng.integers(1, 5000, n).astype(str).astype(object),
+        "Quantity Unit": _pick(rng, QUANTITY_UNITS, n),
+        "Package Amount": rng.integers(1, 200, n).astype(str).astype(object),
+        "Packages Unit": _pick(rng, PACKAGE_UNITS, n),
+    }, columns=COLUMNS)
+
+    # exact duplicates of earlier rows in the block (same 'No' too)
+    dup_rows = np.flatnonzero(rng.random(n) < 0.02)
+    dup_rows = dup_rows[dup_rows > 0]
+    if len(dup_rows):
+        sources = (rng.random(len(dup_rows)) * dup_rows).astype(int)
+        df.iloc[dup_rows] = df.iloc[sources].to_numpy()
+
+    # a few fully empty lines
+    empty = np.flatnonzero(rng.random(n) < 0.002)
+    df["No"] = df["No"].astype(object)
+    df.iloc[empty, :] = ""
+
+    return df.iloc[:n_rows]
+
+
+def generate_trade_rows(n_rows: int, seed: int = 0):
+    """Yield blocks of synthetic rows, `n_rows` in total."""
+    pool = _company_pool(seed)
+    block = 0
+    remaining = n_rows
+
+    while remaining > 0:
+        size = min(BLOCK_ROWS, remaining)
+        yield generate_block(block, size, seed, pool)
+        remaining -= size
+        block += 1
+
+
+def write_synthetic_csv(path: str, n_rows: int, seed: int = 0) -> str:
+    """Stream `n_rows` synthetic rows to a CSV at `path`, one block at a time."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    with open(path + ".tmp", "w", encoding="utf-8", newline="") as f:
+        for i, block in enumerate(generate_trade_rows(n_rows, seed)):
+            block.to_csv(f, header=i == 0, index=False)
+    os.replace(path + ".tmp", path)
+
+    return path
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic customs rows")
+    parser.add_argument("output", help="CSV path to write")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    write_synthetic_csv(args.output, args.rows, args.seed)
+
+    print(
+        f"Wrote {args.rows:,} rows to {args.output} "
+        f"({os.path.getsize(args.output) / 1024 / 1024:.1f} MB, "
+        f"{time.perf_counter() - start:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
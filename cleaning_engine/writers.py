@@ -0,0 +1,378 @@
+import gzip
+import os
+import time
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+    pc = None
+    ds = None
+
+
+MB = 1024 * 1024
+
+COMPRESSION_SUFFIXES = {
+    None: "",
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+# columnar outputs are dataset directories of part files, so chunked and
+# incremental runs append by adding parts and partitions are sub-directories
+COLUMNAR_FORMATS = {
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+
+# object columns of these inferred kinds are numbers with gaps, not text
+NUMERIC_KINDS = {"integer", "floating", "mixed-integer-float", "decimal"}
+
+COLUMNAR_CODECS = {
+    "parquet": {None, "snappy", "gzip", "zstd", "lz4", "brotli"},
+    "arrow": {None, "lz4", "zstd"},
+}
+
+
+def compressed_path(path: str, compression: str | None) -> str:
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return path + COMPRESSION_SUFFIXES[compression]
+
+
+def artifact_path(csv_path: str, output_format: str = "csv", compression: str | None = None) -> str:
+    """On-disk location of an artifact named like `csv_path` in the given format."""
+    if output_format == "csv":
+        return compressed_path(csv_path, csv_compression(compression))
+
+    if output_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    return os.path.splitext(csv_path)[0] + COLUMNAR_FORMATS[output_format]
+
+
+def csv_compression(compression: str | None):
+    """CSV artifacts only use gzip / zstd; columnar-only codecs leave them plain."""
+    return compression if compression in COMPRESSION_SUFFIXES else None
+
+
+def check_compression(compression: str | None, output_format: str = "csv"):
+    """Fail before the run starts rather than in a writer thread."""
+    if output_format == "csv":
+        compressed_path("", compression)
+    else:
+        if pa is None:
+            raise ImportError(f"{output_format} output needs the 'pyarrow' package")
+        if output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        if compression not in COLUMNAR_CODECS[output_format]:
+            raise ValueError(f"Unsupported {output_format} compression: {compression}")
+
+    if csv_compression(compression) == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError as e:
+            raise ImportError("zstd compression needs the 'zstandard' package") from e
+
+
+def read_output(path: str, output_format: str = "csv") -> pd.DataFrame:
+    """Load an artifact written by OutputWriters back into a frame."""
+    if output_format == "csv":
+        return pd.read_csv(path)
+
+    fmt = "parquet" if output_format == "parquet" else "ipc"
+    return ds.dataset(path, format=fmt, partitioning="hive").to_table().to_pandas()
+
+
+def head_output(path: str, nrows: int, output_format: str = "csv") -> pd.DataFrame:
+    """First `nrows` rows of an artifact, reading no more of it than needed."""
+    if output_format == "csv":
+        return pd.read_csv(path, nrows=nrows)
+
+    fmt = "parquet" if output_format == "parquet" else "ipc"
+    return ds.dataset(path, format=fmt, partitioning="hive").head(nrows).to_pandas()
+
+
+def gzip_copy(path: str, block_size: int = MB) -> str:
+    """
+    Gzipped copy of a file next to it (path + ".gz"), compressed in blocks
+    so memory stays flat. Re-used while it is newer than the original;
+    already compressed files are returned as they are.
+    """
+    if path.endswith((".gz", ".zst")):
+        return path
+
+    target = path + ".gz"
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        return target
+
+    # private temp name: two sessions may compress the same file at once
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, block_size)
+    os.replace(tmp, target)
+
+    return target
+
+
+def _disk_size(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path)
+        for f in files
+    )
+
+
+# -------------------------------------------------
+# Arrow conversion
+# -------------------------------------------------
+
+def _arrow_table(df: pd.DataFrame):
+    """
+    Arrow table with the frame's dtypes. Object columns holding only
+    numbers (with missing values) become numeric; only columns that mix
+    numbers with text are written as strings.
+    """
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        pass
+
+    fixed = df.copy(deep=False)
+    for col in fixed.select_dtypes(include="object").columns:
+        kind = pd.api.types.infer_dtype(fixed[col], skipna=True)
+        if kind in NUMERIC_KINDS:
+            fixed[col] = pd.to_numeric(fixed[col], errors="coerce")
+        elif kind not in ("string", "empty"):
+            fixed[col] = fixed[col].astype(str).where(fixed[col].notna())
+
+    return pa.Table.from_pandas(fixed, preserve_index=False)
+
+
+def _fill_partition_nulls(table, partition_cols):
+    """
+    Rows without a partition value (e.g. no arrival date) go to year=0 /
+    month=0 (or UNKNOWN for text keys): most readers cannot load hive
+    partitions whose value is null.
+    """
+    for col in partition_cols:
+        arr = table[col]
+        if not arr.null_count:
+            continue
+
+        if pa.types.is_integer(arr.type) or pa.types.is_floating(arr.type):
+            filled = pc.fill_null(arr, pa.scalar(0, arr.type))
+        else:
+            filled = pc.fill_null(arr.cast(pa.string()), "UNKNOWN")
+
+        table = table.set_column(table.column_names.index(col), col, filled)
+
+    return table
+
+
+def _cast_like(table, schema):
+    """
+    Align a later chunk with the first one written (e.g. an all-null
+    column in this chunk), so every part of a dataset shares one schema.
+    """
+    fields = [
+        schema.field(name) if name in schema.names else table.schema.field(name)
+        for name in table.column_names
+    ]
+    try:
+        return table.cast(pa.schema(fields))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return table
+
+
+# -------------------------------------------------
+# Background writers
+# -------------------------------------------------
+
+class OutputWriters:
+    """
+    Serializes finished artifacts while the caller computes the next one.
+
+    Each artifact gets its own single-thread lane, so appends to one file
+    (chunked / incremental runs) stay in order while different files are
+    written concurrently. CSV encoding and compression (gzip / zstd) run on
+    the lane thread; zlib and zstd release the GIL while compressing.
+    Submitting blocks once a lane has `max_pending` writes queued, which
+    bounds the number of frames held in memory waiting to be written.
+
+    Use as a context manager; leaving the block waits for every writer
+    and re-raises the first write error.
+    """
+
+    def __init__(self, compression: str | None = None, max_pending: int = 2,
+                 output_format: str = "csv", partition_cols=None):
+        check_compression(compression, output_format)
+        self.compression = compression
+        self.max_pending = max_pending
+        self.output_format = output_format
+        self.partition_cols = partition_cols
+        self._lanes = {}
+        self._pending = {}
+        self._stats = {}
+        self._schemas = {}
+        self._parts = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.wait()
+        else:
+            self.shutdown()
+        return False
+
+    # -----------------------------
+    # submission
+    # -----------------------------
+    def submit(self, name: str, df: pd.DataFrame, path: str, append: bool = False,
+               columnar: bool = False):
+        """
+        Queue `df` to be written to `path` (see artifact_path). CSV unless
+        `columnar` is set and the writers were created with a parquet / arrow
+        output_format, in which case it becomes a dataset partitioned by
+        `partition_cols` (those present in the frame).
+        The frame must not be modified afterwards; copy-on-write guarantees
+        this for pipeline frames.
+        """
+        output_format = self.output_format if columnar else "csv"
+
+        if name not in self._lanes:
+            self._lanes[name] = ThreadPoolExecutor(1, thread_name_prefix=f"writer-{name}")
+            self._pending.setdefault(name, deque())
+            self._stats.setdefault(
+                name, {"path": path, "bytes": 0, "seconds": 0.0, "writes": 0}
+            )
+
+        pending = self._pending[name]
+        while len(pending) >= self.max_pending:
+            pending.popleft().result()
+
+        pending.append(
+            self._lanes[name].submit(
+                self._write, name, df, path, append, output_format
+            )
+        )
+
+    def _write(self, name, df, path, append, output_format):
+        start = time.perf_counter()
+        before = _disk_size(path) if append else 0
+
+        if output_format == "csv":
+            df.to_csv(
+                path,
+                mode="a" if append else "w",
+                header=not append,
+                index=False,
+                compression=csv_compression(self.compression)
+            )
+        else:
+            self._write_dataset(name, df, path, append, output_format)
+
+        elapsed = time.perf_counter() - start
+        written = _disk_size(path) - before
+
+        with self._lock:
+            stats = self._stats[name]
+            stats["bytes"] += written
+            stats["seconds"] += elapsed
+            stats["writes"] += 1
+
+    def _write_dataset(self, name, df, path, append, output_format):
+        if output_format == "parquet":
+            fmt = ds.ParquetFileFormat()
+            codec = self.compression or "snappy"
+        else:
+            fmt = ds.IpcFileFormat()
+            codec = self.compression if self.compression in COLUMNAR_CODECS["arrow"] else None
+
+        if not append:
+            shutil.rmtree(path, ignore_errors=True)
+            self._schemas.pop(name, None)
+
+        table = _arrow_table(df)
+
+        # appending to a dataset from an earlier run: match its file schema
+        schema = self._schemas.get(name)
+        if schema is None and append and os.path.isdir(path):
+            existing = ds.dataset(path, format=fmt, partitioning="hive")
+            if existing.files:
+                schema = ds.dataset(existing.files[0], format=fmt).schema
+
+        if schema is not None:
+            table = _cast_like(table, schema)
+        self._schemas.setdefault(name, table.schema)
+
+        partition_cols = [c for c in (self.partition_cols or []) if c in table.column_names]
+        if partition_cols:
+            table = _fill_partition_nulls(table, partition_cols)
+            # partition values come back dictionary-encoded, which contradicts
+            # the pandas dtype metadata; the arrow types still carry the dtypes
+            table = table.replace_schema_metadata(None)
+
+        with self._lock:
+            self._parts += 1
+            part = self._parts
+
+        ds.write_dataset(
+            table,
+            path,
+            format=fmt,
+            file_options=fmt.make_write_options(compression=codec),
+            partitioning=partition_cols or None,
+            partitioning_flavor="hive" if partition_cols else None,
+            # unique per write so appends never replace earlier parts
+            basename_template=f"part-{time.time_ns()}-{part:05d}-{{i}}{COLUMNAR_FORMATS[output_format]}",
+            existing_data_behavior="overwrite_or_ignore"
+        )
+
+    # -----------------------------
+    # completion
+    # -----------------------------
+    def wait(self) -> dict:
+        try:
+            for pending in self._pending.values():
+                while pending:
+                    pending.popleft().result()
+        finally:
+            self.shutdown()
+
+        return self.report()
+
+    def shutdown(self):
+        for lane in self._lanes.values():
+            lane.shutdown(wait=True)
+        self._lanes = {}
+
+    def report(self) -> dict:
+        """Per-writer bytes, busy time and throughput."""
+        report = {}
+        for name, stats in self._stats.items():
+            seconds = stats["seconds"]
+            report[name] = {
+                "path": stats["path"],
+                "mb": round(stats["bytes"] / MB, 2),
+                "seconds": round(seconds, 3),
+                "writes": stats["writes"],
+                "mb_per_s": round(stats["bytes"] / MB / seconds, 1) if seconds else None,
+            }
+        return report
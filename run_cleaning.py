@@ -1,6 +1,18 @@
+import logging
+import sys
+
 from cleaning_engine.service import run_cleaning_job
+from cleaning_engine import batch
 
 if __name__ == "__main__":
+    # with arguments: batch mode, e.g.
+    #   python run_cleaning.py "vendors/*.csv" --out-dir datasets/cleaned --workers 4
+    # (same as python -m cleaning_engine.batch)
+    if len(sys.argv) > 1:
+        sys.exit(batch.main())
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
     input_path = "datasets/raw/raw_file.csv"
     cleaned_df, summary, outputs = run_cleaning_job(input_path, output_dir="datasets/cleaned")
 
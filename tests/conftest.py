@@ -0,0 +1,50 @@
+import random
+import shutil
+
+import pandas as pd
+import pytest
+
+from cleaning_engine import service
+
+
+HEADER = ["No", "Arrival Date", "Importer Name", "Importer Country", "Exporter Name",
+          "Product Details", "USD CIF", "Net Weight", "Net Weight Unit"]
+
+IMPORTERS = ["Procter and Gamble LIMITED", "dksh s.a.", "QUIMICA ATLAS Corporation",
+             "N/A", "-", "Acme Trading Co., Ltd"]
+
+
+def write_trade_csv(path, rows=400, seed=7):
+    rng = random.Random(seed)
+    records = []
+    for i in range(rows):
+        records.append([
+            i + 1,
+            rng.choice(["26/05/2025", "2024-01-17", "2024/07/18"]),
+            rng.choice(IMPORTERS),
+            rng.choice(["BRAZIL", "VIETNAM", " india "]),
+            rng.choice(["Aarti Industries Limited", "DSM Nutritional"]),
+            rng.choice(["PIPE 20MM", "-", "FORMULA INFANTIL"]),
+            rng.choice(["USD 1,781.66", "12632.39", "NA"]),
+            f"{rng.uniform(1, 500):.2f}",
+            rng.choice(["KG", "KGS"]),
+        ])
+        # repeated shipments (a new No, the same row) and blank lines
+        if rng.random() < 0.1:
+            records.append([i + 1] + records[-1][1:])
+        if rng.random() < 0.03:
+            records.append([""] * len(HEADER))
+    pd.DataFrame(records, columns=HEADER).to_csv(path, index=False)
+
+
+@pytest.fixture
+def config(tmp_path):
+    reference = tmp_path / "reference"
+    reference.mkdir()
+    shutil.copy("datasets/reference/company_master.csv", reference)
+    return {
+        **service.DEFAULT_CONFIG,
+        "company_master_path": str(reference / "reference.db"),
+        "company_review_path": str(reference / "reference.db"),
+        "company_name_cache": str(reference / "name_cache.db"),
+    }
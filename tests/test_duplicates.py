@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from cleaning_engine.operations import duplicates
+from cleaning_engine.operations.duplicates import FingerprintStore, remove_duplicates
+
+
+def _fps(start, stop):
+    return np.arange(start, stop, dtype=np.uint64)
+
+
+def test_store_spills_only_past_max_in_memory(tmp_path):
+    store = FingerprintStore(str(tmp_path), max_in_memory=100)
+
+    store.add(_fps(0, 60))
+    assert store.segment_count == 0
+
+    store.add(_fps(60, 120))
+    assert store.segment_count == 1
+
+    store.add(_fps(120, 130))
+    assert store.segment_count == 1
+    store.flush()
+    assert store.segment_count == 2
+
+
+def test_lookup_across_memory_and_segments(tmp_path):
+    store = FingerprintStore(str(tmp_path), max_in_memory=10)
+    store.add(_fps(0, 10))
+    store.add(_fps(100, 105))
+
+    found = store.contains(np.array([3, 50, 102, 9, 10], dtype=np.uint64))
+    assert found.tolist() == [True, False, True, True, False]
+    assert len(store) == 15
+
+
+def test_flushed_store_reopens(tmp_path):
+    store = FingerprintStore(str(tmp_path))
+    store.add(_fps(0, 5))
+    store.flush()
+
+    reopened = FingerprintStore(str(tmp_path))
+    assert reopened.contains(_fps(3, 8)).tolist() == [True, True, False, False, False]
+
+
+def test_segments_are_compacted(tmp_path):
+    store = FingerprintStore(str(tmp_path), max_in_memory=1)
+    for i in range(duplicates.MAX_SEGMENTS + 3):
+        store.add(_fps(i * 10, i * 10 + 2))
+
+    assert store.segment_count <= duplicates.MAX_SEGMENTS
+    assert store.contains(_fps(0, 2)).all()
+    assert store.contains(np.array([10 * (duplicates.MAX_SEGMENTS + 2) + 1], dtype=np.uint64)).all()
+    assert not store.contains(np.array([5], dtype=np.uint64)).any()
+
+    reopened = FingerprintStore(str(tmp_path))
+    assert len(reopened) == 2 * (duplicates.MAX_SEGMENTS + 3)
+
+
+def test_remove_duplicates_against_store(tmp_path):
+    store = FingerprintStore(str(tmp_path))
+    first = pd.DataFrame({"no": [1, 2, 3], "name": ["A", "B", "A"]})
+    second = pd.DataFrame({"no": [4, 5], "name": ["B", "C"]})
+
+    summary = {}
+    kept = remove_duplicates(first, summary, exclude=["no"], store=store)
+    assert kept["name"].tolist() == ["A", "B"]
+    assert summary["duplicates_removed"] == 1
+    # nothing written until the job flushes
+    assert store.segment_count == 0
+
+    summary = {}
+    kept = remove_duplicates(second, summary, exclude=["no"], store=store)
+    assert kept["name"].tolist() == ["C"]
+    assert summary["duplicates_removed_against_store"] == 1
@@ -0,0 +1,56 @@
+import unicodedata
+
+import pytest
+
+from cleaning_engine.encoding import detect_encoding
+
+
+@pytest.mark.parametrize("text", [
+    "Importação e Distribuição São Paulo Ltda",
+    "Peças e Acessórios João",
+    "Compañía Española de Importación, S.A.",
+    "Città di Però, così lunedì",
+])
+def test_western_text_is_cp1252(text):
+    data = text.encode("cp1252")
+    encoding, _ = detect_encoding(data, truncated=False)
+    assert encoding == "cp1252"
+    assert data.decode(encoding) == text
+
+
+TONES = "\u0300\u0301\u0303\u0309\u0323"
+
+
+def _cp1258(text: str) -> bytes:
+    """cp1258 as Vietnamese files have it: letters precomposed, tones combining."""
+    out = []
+    for char in text:
+        marks = unicodedata.normalize("NFD", char)
+        tones = "".join(m for m in marks if m in TONES)
+        base = unicodedata.normalize("NFC", "".join(m for m in marks if m not in TONES))
+        out.append(base + tones)
+    return "".join(out).encode("cp1258")
+
+
+@pytest.mark.parametrize("text", [
+    "Công ty TNHH Thương mại Đức Nguyễn, Hà Nội",
+    "Cổ phần Xuất nhập khẩu Việt Nam",
+])
+def test_vietnamese_text_is_cp1258(text):
+    data = _cp1258(text)
+    encoding, confidence = detect_encoding(data, truncated=False)
+    assert encoding == "cp1258"
+    assert confidence >= 0.5
+    assert unicodedata.normalize("NFC", data.decode(encoding)) == unicodedata.normalize("NFC", text)
+
+
+def test_utf8_and_bom():
+    assert detect_encoding("São Paulo".encode("utf-8"), truncated=False)[0] == "utf-8"
+    assert detect_encoding(b"plain ascii")[0] == "utf-8"
+    assert detect_encoding("﻿name".encode("utf-8"))[0] == "utf-8-sig"
+    assert detect_encoding("name".encode("utf-16"))[0] == "utf-16"
+
+
+def test_cyrillic_is_cp1251():
+    text = "Общество с ограниченной ответственностью Ромашка"
+    assert detect_encoding(text.encode("cp1251"), truncated=False)[0] == "cp1251"
@@ -0,0 +1,102 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from cleaning_engine import incremental as inc
+from cleaning_engine import service
+from tests.conftest import write_trade_csv
+
+
+CONFIG = {"remove_duplicates": True}
+
+
+@pytest.fixture
+def grown(tmp_path):
+    """A trade file of 100 rows and its first 60 lines."""
+    path = tmp_path / "trade.csv"
+    write_trade_csv(path, rows=100)
+    lines = path.read_bytes().splitlines(keepends=True)
+    return path, b"".join(lines[:60]), b"".join(lines)
+
+
+def _check(path, manifest):
+    scan = inc.scan_input(str(path), manifest["processed_bytes"] if manifest else 0)
+    store = inc.fingerprint_store(str(path.parent / "out"))
+    return inc.check_manifest(manifest, str(path), CONFIG, scan, store)
+
+
+def _manifest(path, head, **changes):
+    """The manifest a run over the first `head` bytes of `path` left."""
+    return {
+        "input_path": os.path.abspath(path),
+        "processed_bytes": len(head),
+        "prefix_checksum": inc.scan_input(str(path), len(head))["previous_checksum"],
+        "config": CONFIG,
+        "fingerprint_segments": 0,
+        **changes,
+    }
+
+
+def test_check_manifest_accepts_a_grown_file(grown):
+    path, head, full = grown
+    path.write_bytes(full)
+    assert _check(path, _manifest(path, head)) is None
+
+
+@pytest.mark.parametrize("reason, change", [
+    ("input_changed", {"input_path": "/elsewhere/trade.csv"}),
+    ("config_changed", {"config": {"remove_duplicates": False}}),
+    ("file_truncated", {"processed_bytes": 10 ** 9}),
+    ("prefix_changed", {"prefix_checksum": "0" * 40}),
+    ("fingerprints_out_of_sync", {"fingerprint_segments": 3}),
+])
+def test_check_manifest_reasons(grown, reason, change):
+    path, head, full = grown
+    path.write_bytes(full)
+    assert _check(path, _manifest(path, head, **change)) == reason
+
+
+def test_check_manifest_without_manifest(grown):
+    path, head, full = grown
+    path.write_bytes(full)
+    assert _check(path, None) == "no_manifest"
+
+
+def test_edited_prefix_is_detected(grown):
+    path, head, full = grown
+    path.write_bytes(full)
+    manifest = _manifest(path, head)
+    path.write_bytes(full.replace(b"KGS", b"KGX", 1))
+    assert _check(path, manifest) == "prefix_changed"
+
+
+def test_update_appends_every_output(grown, tmp_path, config):
+    path, head, full = grown
+    output_dir = str(tmp_path / "out")
+    run = dict(
+        output_dir=output_dir, config=config, incremental=True, history_path=None,
+        requested_outputs=["cleaned_file", "powerbi_file", "comparison_report"],
+    )
+
+    path.write_bytes(head)
+    service.run_cleaning_job(str(path), **run)
+    report_path = os.path.join(output_dir, service.OUTPUT_FILES["comparison_report"])
+    first_report = pd.read_csv(report_path, dtype=str, keep_default_na=False)
+    rows_written = inc.load_manifest(output_dir)["rows_written"]
+
+    path.write_bytes(full)
+    _, summary, _ = service.run_cleaning_job(str(path), **run)
+    assert summary["incremental"]["mode"] == "incremental"
+
+    report = pd.read_csv(report_path, dtype=str, keep_default_na=False)
+    # the first run's report is kept; the new rows are numbered after it
+    pd.testing.assert_frame_equal(report.head(len(first_report)), first_report)
+    added = report.iloc[len(first_report):]
+    assert len(added)
+    assert added["row_number"].astype(int).min() > rows_written
+
+    cleaned = pd.read_csv(os.path.join(output_dir, service.OUTPUT_FILES["cleaned_file"]))
+    assert len(cleaned) == summary["final_rows"]
+    assert json.load(open(inc.manifest_path(output_dir)))["rows_written"] == len(cleaned)
@@ -0,0 +1,37 @@
+import io
+import os
+
+import pytest
+
+from cleaning_engine.job_service import JobService
+
+
+@pytest.fixture
+def service(tmp_path):
+    # the pool starts its workers on the first job, which these never queue
+    service = JobService(str(tmp_path / "jobs"), workers=1)
+    yield service
+    service.shutdown()
+
+
+def _submit(service, **kwargs):
+    body = b"No,Importer Name\n1,ACME LTD\n"
+    return service.submit("trade.csv", io.BytesIO(body), len(body), **kwargs)
+
+
+@pytest.mark.parametrize("kwargs, refused", [
+    ({"config": {"company_master_path": "/etc/passwd"}}, "company_master_path"),
+    ({"config": {"company_name_cache": "x.db", "trim_text": False}}, "company_name_cache"),
+    ({"job_options": {"history_path": "/tmp/history.db"}}, "history_path"),
+    ({"job_options": {"profile_path": "/tmp/profile.json"}}, "profile_path"),
+    # the review source is the service's hash of the upload, never the client's
+    ({"job_options": {"review_source": "path:/data/trade.csv"}}, "review_source"),
+    ({"config": ["trim_text"]}, "JSON object"),
+    ({"requested_outputs": ["cleaned_file", "secrets"]}, "secrets"),
+])
+def test_submit_refuses_keys_outside_the_whitelist(service, kwargs, refused):
+    with pytest.raises(ValueError, match=refused):
+        _submit(service, **kwargs)
+
+    assert service.jobs == {}
+    assert [e for e in os.listdir(service.jobs_dir) if not e.startswith(".")] == []
@@ -0,0 +1,65 @@
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from cleaning_engine import name_cache
+from cleaning_engine.name_cache import NameCache
+
+
+def _resolved(*names, review=False):
+    return pd.DataFrame(
+        {
+            "preclean": list(names),
+            "core": list(names),
+            "standardized": [f"{n} STD" for n in names],
+            "needs_review": review,
+        },
+        index=[f"{n} LTD" for n in names],
+    )
+
+
+def test_lookup_returns_added_resolutions(tmp_path):
+    cache = NameCache(str(tmp_path / "cache.db"), "v1")
+    assert cache.add(_resolved("ACME", "GLOBEX", review=True)) == 2
+
+    found = cache.lookup(["ACME LTD", "UNKNOWN", "GLOBEX LTD"])
+    assert sorted(found.index) == ["ACME LTD", "GLOBEX LTD"]
+    assert found.loc["ACME LTD", "standardized"] == "ACME STD"
+    assert found["needs_review"].dtype == bool
+    assert found["needs_review"].all()
+
+
+def test_versions_share_one_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+    old = NameCache(path, "v1")
+    old.add(_resolved("ACME"))
+
+    new = NameCache(path, "v2")
+    assert new.lookup(["ACME LTD"]).empty
+    new.add(_resolved("ACME"))
+
+    # opening v2 did not drop what v1 runs still use
+    assert list(NameCache(path, "v1").lookup(["ACME LTD"]).index) == ["ACME LTD"]
+
+
+def test_unused_versions_are_pruned(tmp_path):
+    path = str(tmp_path / "cache.db")
+    NameCache(path, "v1").add(_resolved("ACME"))
+
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute("UPDATE versions SET last_used = '2000-01-01T00:00:00' WHERE version = 'v1'")
+
+    NameCache(path, "v2")
+    with closing(sqlite3.connect(path)) as conn:
+        versions = [row[0] for row in conn.execute("SELECT version FROM versions")]
+        rows = conn.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+
+    assert versions == ["v2"]
+    assert rows == 0
+
+
+def test_rules_version_covers_accent_folds(monkeypatch):
+    before = name_cache.rules_version()
+    monkeypatch.setitem(name_cache.unicode_folding.FOLD_TABLE, ord("Ø"), "OE")
+    assert name_cache.rules_version() != before
@@ -0,0 +1,102 @@
+import os
+import time
+
+import pytest
+
+from cleaning_engine.output_store import MB, OutputStore, QuotaExceeded
+
+
+HOUR = 3600
+
+
+def _artifact(store, sid, name, size=1024, age_hours=0.0):
+    """A file of `size` bytes in session `sid`, last used `age_hours` ago."""
+    path = os.path.join(store.session_dir(sid), name)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    used = time.time() - age_hours * HOUR
+    os.utime(path, (used, used))
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OutputStore(
+        str(tmp_path / "sessions"), session_quota_mb=4, total_quota_mb=4,
+        ttl_hours=72, compress_after_hours=24
+    )
+
+
+def test_sweep_expires_idle_artifacts_and_empty_sessions(store):
+    old = _artifact(store, "a", "cleaned_file.csv", age_hours=80)
+    fresh = _artifact(store, "b", "cleaned_file.csv")
+
+    report = store.sweep()
+
+    assert report["expired"] == [old]
+    assert not os.path.exists(os.path.dirname(old))
+    assert os.path.exists(fresh)
+
+
+def test_sweep_counts_recent_use_not_just_the_write(store):
+    path = _artifact(store, "a", "cleaned_file.csv", age_hours=80)
+    store.touch(path)
+
+    assert store.sweep()["expired"] == []
+    assert store.sweep(now=time.time() + 73 * HOUR)["expired"] == [path]
+
+
+def test_sweep_compresses_large_idle_files(store):
+    big = _artifact(store, "a", "comparison_report.csv", size=MB, age_hours=30)
+    small = _artifact(store, "a", "cleaned_for_powerbi.csv", age_hours=30)
+
+    report = store.sweep()
+
+    assert report["compressed"] == [big + ".gz"]
+    assert store.resolve(big) == big + ".gz"
+    assert store.resolve(small) == small
+
+
+def test_sweep_evicts_least_recently_used_over_quota(store):
+    oldest = _artifact(store, "a", "cleaned_file.csv", size=MB + 1, age_hours=3)
+    older = _artifact(store, "b", "cleaned_file.csv", size=MB + 1, age_hours=2)
+    newer = _artifact(store, "c", "cleaned_file.csv", size=MB + 1, age_hours=1)
+
+    # 3 MB used; 2 MB more must fit in the 4 MB quota
+    report = store.sweep(reserve_bytes=2 * MB)
+
+    assert report["evicted"] == [oldest, older]
+    assert os.path.exists(newer)
+
+
+def test_sweep_skips_leased_sessions(store):
+    running = _artifact(store, "a", "cleaned_file.csv", age_hours=80)
+    with store.lease("a"):
+        assert store.sweep()["expired"] == []
+    assert store.sweep()["expired"] == [running]
+
+
+def test_dataset_directory_is_one_artifact(store):
+    dataset = os.path.join(store.session_dir("a"), "cleaned_file.parquet")
+    os.makedirs(dataset)
+    for part in ("part-0.parquet", "part-1.parquet"):
+        with open(os.path.join(dataset, part), "wb") as f:
+            f.write(b"x" * 1000)
+
+    [artifact] = store.artifacts()
+    assert artifact["path"] == dataset
+    assert artifact["bytes"] >= 2000
+
+    assert store.sweep(now=time.time() + 80 * HOUR)["expired"] == [dataset]
+    assert not os.path.exists(dataset)
+
+
+def test_check_quota_refuses_what_a_sweep_cannot_free(store):
+    _artifact(store, "a", "cleaned_file.csv", size=3 * MB)
+
+    with pytest.raises(QuotaExceeded):
+        store.check_quota("a", 2 * MB)
+
+    # another session's upload evicts the idle artifact instead
+    store.check_quota("b", 2 * MB)
+    assert store.usage()["total_bytes"] == 0
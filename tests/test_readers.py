@@ -0,0 +1,63 @@
+import gzip
+import zipfile
+
+import pandas as pd
+import pytest
+
+from cleaning_engine.readers import detect_format, read_input
+
+
+FRAME = pd.DataFrame({
+    "No": ["1", "2", "3"],
+    "Importer Name": ["ACME LTD", "Globex S.A.", ""],
+    "USD CIF": ["10.50", "NA", "203.30"],
+})
+
+
+def _csv_bytes(frame=FRAME):
+    return frame.to_csv(index=False).encode("utf-8")
+
+
+def _write(tmp_path, fmt, name):
+    """FRAME written as `fmt` under a name that does not tell the format."""
+    path = tmp_path / name
+    if fmt == "csv":
+        path.write_bytes(_csv_bytes())
+    elif fmt == "csv.gz":
+        path.write_bytes(gzip.compress(_csv_bytes()))
+    elif fmt == "zip":
+        with zipfile.ZipFile(path, "w") as zf:
+            zf.writestr("b.csv", _csv_bytes(FRAME.iloc[2:]))
+            zf.writestr("a.csv", _csv_bytes(FRAME.iloc[:2]))
+            zf.writestr("__MACOSX/._a.csv", b"\x00\x05")
+    elif fmt == "xlsx":
+        FRAME.to_excel(path, index=False, engine="openpyxl")
+    elif fmt == "parquet":
+        FRAME.to_parquet(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "csv.gz", "zip", "xlsx", "parquet"])
+def test_detect_format_ignores_the_extension(tmp_path, fmt):
+    assert detect_format(_write(tmp_path, fmt, "upload.bin")) == fmt
+
+
+def test_workbook_is_not_a_zip_of_csvs(tmp_path):
+    path = _write(tmp_path, "xlsx", "trade.zip")
+    assert detect_format(path) == "xlsx"
+
+
+@pytest.mark.parametrize("fmt", ["csv", "csv.gz", "zip", "parquet"])
+def test_read_input_reads_every_format_alike(tmp_path, fmt):
+    df = read_input(_write(tmp_path, fmt, "upload.bin"))
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), FRAME, check_dtype=False)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "zip", "parquet"])
+def test_chunks_add_up_to_the_whole_file(tmp_path, fmt):
+    path = _write(tmp_path, fmt, "upload.bin")
+    chunks = list(read_input(path, chunksize=2))
+    assert sum(len(chunk) for chunk in chunks) == len(FRAME)
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True), FRAME, check_dtype=False
+    )
@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+import pytest
+
+from cleaning_engine import reference_store
+
+
+def _counts(**names):
+    return pd.DataFrame(
+        [(name, n, n * 10.0) for name, n in names.items()],
+        columns=["core_name", "rows", "cif_usd"],
+    )
+
+
+def _queue(path):
+    queue = reference_store.review_queue(path)
+    return {row.core_name: (row.rows, row.cif_usd, row.runs) for row in queue.itertuples()}
+
+
+@pytest.fixture
+def store(tmp_path):
+    # a folder without CSVs: the store starts empty
+    return str(tmp_path / "reference.db")
+
+
+def test_runs_without_source_add_up(store):
+    reference_store.add_review(_counts(ACME=3), store)
+    reference_store.add_review(_counts(ACME=2, GLOBEX=1), store)
+
+    assert _queue(store) == {"ACME": (5, 50.0, 2), "GLOBEX": (1, 10.0, 1)}
+
+
+def test_same_source_replaces_its_contribution(store):
+    reference_store.add_review(_counts(ACME=3, GLOBEX=1), store, source="a")
+    reference_store.add_review(_counts(ACME=3, GLOBEX=1), store, source="a")
+    assert _queue(store) == {"ACME": (3, 30.0, 1), "GLOBEX": (1, 10.0, 1)}
+
+    # the file grew and GLOBEX was fixed at the source
+    reference_store.add_review(_counts(ACME=4), store, source="a")
+    assert _queue(store) == {"ACME": (4, 40.0, 1)}
+
+
+def test_sources_add_up_and_drop_separately(store):
+    reference_store.add_review(_counts(ACME=3), store, source="a")
+    reference_store.add_review(_counts(ACME=2, GLOBEX=1), store, source="b")
+    assert _queue(store) == {"ACME": (5, 50.0, 2), "GLOBEX": (1, 10.0, 1)}
+
+    reference_store.add_review(_counts(GLOBEX=1), store, source="a")
+    assert _queue(store) == {"ACME": (2, 20.0, 1), "GLOBEX": (2, 20.0, 2)}
+
+
+def test_replace_false_adds_to_the_contribution(store):
+    reference_store.add_review(_counts(ACME=3), store, source="a")
+    reference_store.add_review(_counts(ACME=1, GLOBEX=2), store, source="a", replace=False)
+    assert _queue(store) == {"ACME": (4, 40.0, 1), "GLOBEX": (2, 20.0, 1)}
+
+    # a full rerun of the grown file replaces both increments
+    reference_store.add_review(_counts(ACME=4, GLOBEX=2), store, source="a")
+    assert _queue(store) == {"ACME": (4, 40.0, 1), "GLOBEX": (2, 20.0, 1)}
+
+
+def test_removed_name_starts_from_zero(store):
+    reference_store.add_review(_counts(ACME=3), store, source="a")
+    reference_store.remove("review", ["ACME"], store)
+    assert _queue(store) == {}
+
+    reference_store.add_review(_counts(ACME=3), store, source="a")
+    assert _queue(store) == {"ACME": (3, 30.0, 1)}
+
+
+def test_source_key_prefers_the_caller_id(tmp_path, monkeypatch):
+    path = tmp_path / "trade.csv"
+    path.write_bytes(b"a,b\n1,2\n")
+
+    assert reference_store.source_key(str(path), "upload-1") == "upload-1"
+    assert reference_store.source_key(str(path)) == "path:" + os.path.realpath(path)
+    # the same file reached another way is the same source
+    monkeypatch.chdir(tmp_path)
+    assert reference_store.source_key("trade.csv") == reference_store.source_key(str(path))
+    with pytest.raises(ValueError):
+        reference_store.source_key()
+
+
+def test_content_key_hashes_the_whole_file(tmp_path):
+    head = b"x" * reference_store.HASH_BLOCK
+    a, b = tmp_path / "a.csv", tmp_path / "b.csv"
+    a.write_bytes(head + b"1")
+    b.write_bytes(head + b"2")
+
+    assert reference_store.content_key(str(a)) != reference_store.content_key(str(b))
+    b.write_bytes(head + b"1")
+    assert reference_store.content_key(str(a)) == reference_store.content_key(str(b))
@@ -0,0 +1,33 @@
+import os
+
+import pandas as pd
+
+from cleaning_engine import service
+from tests.conftest import write_trade_csv
+
+
+def _run(tmp_path, config, name, **kwargs):
+    output_dir = str(tmp_path / name)
+    service.run_cleaning_job(
+        str(tmp_path / "trade.csv"), output_dir, config=dict(config),
+        requested_outputs=["cleaned_file", "powerbi_file", "comparison_report"],
+        history_path=None, **kwargs
+    )
+    return {
+        key: pd.read_csv(os.path.join(output_dir, file), dtype=str, keep_default_na=False)
+        for key, file in service.OUTPUT_FILES.items()
+        if key != "powerbi_star"
+    }
+
+
+def test_chunked_run_matches_in_memory(tmp_path, config, monkeypatch):
+    write_trade_csv(tmp_path / "trade.csv")
+    in_memory = _run(tmp_path, config, "in_memory")
+
+    monkeypatch.setattr(service, "chunk_rows_for_budget", lambda path, budget: 37)
+    chunked = _run(tmp_path, config, "chunked", memory_budget_mb=0.001)
+
+    # rows were dropped, so the chunks really shift against the raw rows
+    assert (in_memory["comparison_report"]["change_type"] == "row_removed").any()
+    for name, frame in in_memory.items():
+        pd.testing.assert_frame_equal(chunked[name], frame, obj=name)